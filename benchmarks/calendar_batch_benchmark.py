@@ -0,0 +1,145 @@
+# benchmarks/calendar_batch_benchmark.py
+
+"""
+Benchmark: sequential vs batched Calendar inserts for one study plan.
+
+Runs against the local fake Calendar server, so no Google account is needed.
+
+Then the write scheduler's priorities: --bulk-writers threads resync plans
+(BULK writes) through a small global quota until their batches queue up,
+and one user creates a plan (INTERACTIVE). Reports how long that user's
+batches waited with and without priorities.
+
+Usage:
+    python benchmarks/calendar_batch_benchmark.py --weeks 12 --sessions 3 --latency-ms 40
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar_server import start_server, build_fake_service
+from sub_agents.calendar_batch import execute_batched
+from sub_agents.calendar_quota import (
+    BULK,
+    INTERACTIVE,
+    CalendarWriteScheduler,
+    get_calendar_quota_metrics,
+    set_write_scheduler,
+)
+
+
+def make_payloads(weeks: int, sessions: int) -> list:
+    """Two events (reminder + study session) per session per week."""
+    payloads = []
+    for week in range(weeks):
+        for session in range(sessions):
+            for kind in ("Reminder", "Study"):
+                payloads.append({
+                    "summary": f"{kind}: Benchmark course - Week {week + 1}",
+                    "start": {"dateTime": "2025-01-04T09:00:00", "timeZone": "UTC"},
+                    "end": {"dateTime": "2025-01-04T11:00:00", "timeZone": "UTC"},
+                })
+    return payloads
+
+
+def run_sequential(service, payloads: list):
+    events = service.events()
+    for body in payloads:
+        events.insert(calendarId="primary", body=body).execute(num_retries=5)
+
+
+def run_batched(service, payloads: list, batch_size: int):
+    events = service.events()
+    requests = [events.insert(calendarId="primary", body=body) for body in payloads]
+    results = execute_batched(service, requests, batch_size=batch_size)
+    errors = [r["error"] for r in results if r["error"]]
+    if errors:
+        raise RuntimeError(f"{len(errors)} batched inserts failed, e.g. {errors[0]}")
+
+
+def run_priority(root_url: str, payloads: list, bulk_writers: int, prioritize: bool) -> tuple:
+    """
+    Returns (interactive seconds, bulk seconds): one plan's batched inserts
+    sent while bulk_writers resyncs queue for the global quota.
+    """
+    # Global quota of 10 batches a second, so the queue builds up
+    set_write_scheduler(CalendarWriteScheduler(global_rate=500, global_burst=50, user_rate=1e9, user_burst=1e9))
+    bulk_priority = BULK if prioritize else INTERACTIVE
+
+    def bulk():
+        # httplib2 connections aren't thread-safe: one service per writer
+        service = build_fake_service(root_url)
+        events = service.events()
+        execute_batched(service, [events.insert(calendarId="primary", body=body) for body in payloads],
+                        priority=bulk_priority)
+
+    started = time.perf_counter()
+    writers = [threading.Thread(target=bulk) for _ in range(bulk_writers)]
+    for writer in writers:
+        writer.start()
+    while get_calendar_quota_metrics()["queue_depth"] < bulk_writers - 1:
+        time.sleep(0.001)
+
+    service = build_fake_service(root_url)
+    events = service.events()
+    arrived = time.perf_counter()
+    execute_batched(service, [events.insert(calendarId="primary", body=body) for body in payloads],
+                    priority=INTERACTIVE)
+    interactive = time.perf_counter() - arrived
+    for writer in writers:
+        writer.join()
+    return interactive, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0,
+                        help="fraction of calls the fake server rejects with 403 rateLimitExceeded")
+    parser.add_argument("--bulk-writers", type=int, default=8, help="concurrent bulk resyncs in the priority run")
+    args = parser.parse_args()
+
+    # Measure round trips, not Calendar's quotas
+    set_write_scheduler(CalendarWriteScheduler(global_rate=1e9, global_burst=1e9, user_rate=1e9, user_burst=1e9, base_delay=0.05))
+
+    server, calendar, root_url = start_server(latency_ms=args.latency_ms, rate_limit_ratio=args.rate_limit_ratio)
+    try:
+        service = build_fake_service(root_url)
+        payloads = make_payloads(args.weeks, args.sessions)
+
+        print(f"Plan: {args.weeks} weeks x {args.sessions} sessions = {len(payloads)} events")
+        print(f"Simulated network latency: {args.latency_ms} ms per round trip\n")
+
+        for label, run in (
+            ("sequential", lambda: run_sequential(service, payloads)),
+            (f"batched ({args.batch_size}/batch)", lambda: run_batched(service, payloads, args.batch_size)),
+        ):
+            calendar.reset_counters()
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            print(f"{label:<24} {elapsed * 1000:9.1f} ms   {calendar.round_trips:4d} round trips   {calendar.api_calls:4d} API calls")
+
+        if args.rate_limit_ratio:
+            print(f"\nWrite scheduler: {get_calendar_quota_metrics()}")
+
+        print(f"\nOne interactive plan arriving behind {args.bulk_writers} queued bulk resyncs "
+              f"(global quota 500 calls/s):")
+        for label, prioritize in (("no priorities (FIFO)", False), ("interactive before bulk", True)):
+            interactive, total = run_priority(root_url, payloads, args.bulk_writers, prioritize)
+            print(f"{label:<24} interactive plan {interactive * 1000:7.1f} ms   all writes {total * 1000:7.1f} ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
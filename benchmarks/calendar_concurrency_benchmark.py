@@ -0,0 +1,122 @@
+# benchmarks/calendar_concurrency_benchmark.py
+
+"""
+Concurrency benchmark: many simulated users creating study plans at once.
+
+Runs every user's create_study_reminders call on ONE asyncio event loop,
+the way ADK serves sessions, against the local fake Calendar server:
+
+- "blocking": the synchronous tool is called directly from the coroutine
+  (what a sync FunctionTool does), so each call stalls the loop.
+- "async": the calendar_async tool, which offloads I/O to a bounded pool.
+
+All users arrive at once; latency is measured from arrival to result.
+Reports p50/p99 tool latency, total wall time and the worst event-loop
+stall (measured by a 10 ms heartbeat task). The fake server runs in its
+own process so its CPU work does not compete with the client.
+
+Usage:
+    python benchmarks/calendar_concurrency_benchmark.py --users 50 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar_server import start_server_process, build_fake_service
+from sub_agents import calendar_async, calendar_tool
+from sub_agents.calendar_quota import CalendarWriteScheduler, set_write_scheduler
+
+SCHEDULE = [
+    {"day": "Monday", "start_time": "7:00 PM", "duration_hours": 1.5},
+    {"day": "Wednesday", "start_time": "7:00 PM", "duration_hours": 1.5},
+    {"day": "Saturday", "start_time": "9:00 AM", "duration_hours": 2},
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def heartbeat(stop: asyncio.Event, stalls: list, interval: float = 0.01):
+    """Records how late the loop wakes us up - i.e. how long it was blocked."""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        stalls.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run_scenario(mode: str, users: int, weeks: int) -> dict:
+    latencies = []
+    stalls = []
+    stop = asyncio.Event()
+
+    async def user(idx: int, arrived: float):
+        kwargs = dict(
+            course_name=f"Benchmark course {idx}",
+            total_weeks=weeks,
+            study_schedule=SCHEDULE,
+            start_date="2025-01-06",
+        )
+        if mode == "blocking":
+            result = calendar_tool.create_study_reminders(**kwargs)
+        else:
+            result = await calendar_async.create_study_reminders(**kwargs)
+        latencies.append(time.perf_counter() - arrived)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+
+    beat = asyncio.create_task(heartbeat(stop, stalls))
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i, started) for i in range(users)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await beat
+
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies),
+        "wall": wall,
+        "max_stall": max(stalls) if stalls else wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    # Measure the I/O path, not Calendar's quotas
+    set_write_scheduler(CalendarWriteScheduler(global_rate=1e9, global_burst=1e9, user_rate=1e9, user_burst=1e9))
+
+    server, root_url = start_server_process(latency_ms=args.latency_ms)
+    service = build_fake_service(root_url)
+    calendar_tool.get_calendar_service = lambda: service
+
+    print(f"{args.users} concurrent users, {args.weeks} weeks x {len(SCHEDULE)} sessions each, "
+          f"{args.latency_ms} ms per Calendar round trip\n")
+    print(f"{'mode':<10} {'p50':>9} {'p99':>9} {'wall':>9} {'max loop stall':>15}")
+    try:
+        for mode in ("blocking", "async"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = asyncio.run(run_scenario(mode, args.users, args.weeks))
+            print(f"{mode:<10} {stats['p50'] * 1000:7.0f}ms {stats['p99'] * 1000:7.0f}ms "
+                  f"{stats['wall'] * 1000:7.0f}ms {stats['max_stall'] * 1000:13.0f}ms")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
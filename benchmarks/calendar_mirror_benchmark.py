@@ -0,0 +1,170 @@
+# benchmarks/calendar_mirror_benchmark.py
+
+"""
+Benchmark: reading a user's calendar through the local SQLite mirror vs the API.
+
+Seeds the local fake Calendar server with --events existing events and a
+year-long study plan. Then it reads the calendar the way the calendar tool
+does: the plan's events (list_plan_events) and a week of events
+(list_events_between). Each read is made directly against the API, and
+through the mirror in four states:
+
+- cold: first full sync
+- warm: incremental sync with nothing changed
+- a few changes: incremental sync after some events were edited
+- expired token: Calendar answers 410, so the mirror does a full sync
+
+Each read reports round trips, response bytes and wall time, and checks
+that the mirror returns the same events as the API. The last table times
+local range queries alone (no sync).
+
+Usage:
+    python benchmarks/calendar_mirror_benchmark.py --events 5000 --latency-ms 40
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar_server import build_fake_service, start_server
+from sub_agents import calendar_tool
+from sub_agents.calendar_batch import execute_batched
+from sub_agents.calendar_mirror import CalendarMirror, get_calendar_mirror, set_calendar_mirror
+from sub_agents.calendar_quota import CalendarWriteScheduler, set_write_scheduler
+from sub_agents.study_planner import build_plan
+
+START_DATE = "2025-01-04"  # a Saturday
+TIMEZONE = "America/New_York"
+SCHEDULE = [
+    {"day": "Saturday", "start_time": "9:00 AM", "duration_hours": 2.0},
+    {"day": "Sunday", "start_time": "10:00 AM", "duration_hours": 2.0},
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def seed_calendar(service, count: int, seed: int):
+    """`count` meetings over the plan's year, plus the plan itself as separate events."""
+    rng = random.Random(seed)
+    start = datetime.strptime(START_DATE, "%Y-%m-%d")
+    inserts = service.events()
+    requests = []
+    for _ in range(count):
+        begin = start + timedelta(days=rng.randrange(364), hours=rng.randrange(8, 20), minutes=rng.choice([0, 30]))
+        requests.append(inserts.insert(calendarId="primary", body={
+            "summary": "Meeting",
+            "start": {"dateTime": begin.isoformat(), "timeZone": TIMEZONE},
+            "end": {"dateTime": (begin + timedelta(minutes=rng.choice([30, 60, 90]))).isoformat(), "timeZone": TIMEZONE},
+        }))
+    execute_batched(service, requests)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = calendar_tool.create_study_reminders("Mirror course", 52, SCHEDULE, START_DATE, "20:00", TIMEZONE)
+    return result
+
+
+def edit_events(service, plan_id: str, count: int):
+    """Moves `count` of the plan's events by an hour and deletes one, like a user tidying up."""
+    calendar_tool.CALENDAR_MIRROR = False
+    events = calendar_tool.list_plan_events(service, plan_id)
+    resource = service.events()
+    requests = [resource.patch(calendarId="primary", eventId=e["id"], body={"summary": e["summary"] + " (edited)"})
+                for e in events[:count]]
+    requests.append(resource.delete(calendarId="primary", eventId=events[-1]["id"]))
+    execute_batched(service, requests)
+
+
+def measure(calendar, read) -> tuple:
+    calendar.reset_counters()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = read()
+    return result, calendar.round_trips, calendar.response_bytes, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000, help="Existing events on the user's calendar")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--queries", type=int, default=2000, help="Local range queries to time")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    set_write_scheduler(CalendarWriteScheduler(global_rate=1e9, global_burst=1e9, user_rate=1e9, user_burst=1e9))
+    server, calendar, root_url = start_server(latency_ms=args.latency_ms)
+    service = build_fake_service(root_url)
+    calendar_tool.get_calendar_service = lambda: service
+    directory = tempfile.mkdtemp(prefix="calendar_mirror_")
+    set_calendar_mirror(CalendarMirror(path=os.path.join(directory, "mirror.sqlite3")))
+
+    try:
+        calendar_tool.CALENDAR_MIRROR = False
+        seed_calendar(service, args.events, args.seed)
+        plan_id = build_plan("Mirror course", 52, SCHEDULE, START_DATE, "20:00", TIMEZONE).plan_id
+        zone = ZoneInfo(TIMEZONE)
+        week = (datetime(2025, 6, 2, tzinfo=zone), datetime(2025, 6, 9, tzinfo=zone))
+
+        reads = {
+            "plan events": lambda: calendar_tool.list_plan_events(service, plan_id),
+            "one week": lambda: calendar_tool.list_events_between(service, *week),
+        }
+        print(f"{args.events} events + a 52-week plan, {args.latency_ms:g}ms per round trip\n")
+        print(f"{'read':<12} {'source':<20} {'events':>7} {'round trips':>12} {'KB':>9} {'wall':>9}  same as API")
+
+        def run(label: str, source: str, expected=None):
+            events, round_trips, size, seconds = measure(calendar, reads[label])
+            ids = sorted(e["id"] for e in events)
+            same = "" if expected is None else ("yes" if ids == expected else "NO")
+            print(f"{label:<12} {source:<20} {len(events):>7} {round_trips:>12} {size / 1024:9.1f} "
+                  f"{1000 * seconds:7.0f}ms  {same}")
+            return ids
+
+        for label in reads:
+            calendar_tool.CALENDAR_MIRROR = False
+            expected = run(label, "API")
+            calendar_tool.CALENDAR_MIRROR = True
+            get_calendar_mirror().invalidate()
+            run(label, "mirror, cold", expected)
+            run(label, "mirror, warm", expected)
+
+            edit_events(service, plan_id, 10)
+            calendar_tool.CALENDAR_MIRROR = False
+            expected = run(label, "API, after edits")
+            calendar_tool.CALENDAR_MIRROR = True
+            run(label, "mirror, 11 changes", expected)
+
+            calendar.expire_sync_tokens()
+            run(label, "mirror, token 410", expected)
+            print()
+
+        mirror = get_calendar_mirror()
+        rng = random.Random(args.seed)
+        timings = {"1 day": [], "1 week": [], "1 month": []}
+        for label, days in (("1 day", 1), ("1 week", 7), ("1 month", 30)):
+            for _ in range(args.queries):
+                start = datetime(2025, 1, 4, tzinfo=zone) + timedelta(days=rng.randrange(330))
+                started = time.perf_counter()
+                mirror.events_between(start, start + timedelta(days=days))
+                timings[label].append(time.perf_counter() - started)
+        print(f"{'local range query':<18} {'p50':>9} {'p99':>9}")
+        for label, values in timings.items():
+            print(f"{label:<18} {percentile(values, 50) * 1e6:7.0f}us {percentile(values, 99) * 1e6:7.0f}us")
+        print(f"\nmirror stats: {mirror.get_stats()}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/course_catalog_benchmark.py
+
+"""
+Benchmark: local course catalog search on a large synthetic catalog.
+
+Writes a synthetic JSONL snapshot (random topics, platforms, levels,
+prices and tags), compiles it with build_catalog_index, then runs topic
+queries with and without level/budget/platform filters and reports
+p50/p99 query latency and the time to fetch the top records.
+
+Usage:
+    python benchmarks/course_catalog_benchmark.py --courses 1000000 --queries 500
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sub_agents.course_catalog import CourseCatalog, build_catalog_index, search_catalog, set_catalog
+
+SUBJECTS = [
+    "python", "javascript", "machine learning", "data analysis", "web development", "sql", "statistics",
+    "react", "deep learning", "excel", "digital marketing", "graphic design", "photography", "spanish",
+    "guitar", "calculus", "physics", "cloud computing", "cybersecurity", "project management",
+]
+MODIFIERS = ["fundamentals", "bootcamp", "for beginners", "masterclass", "in practice", "advanced topics",
+             "crash course", "specialization", "hands-on projects", "certificate"]
+PLATFORMS = ["Coursera", "edX", "Udemy", "YouTube", "MIT OpenCourseWare", "Khan Academy", "freeCodeCamp",
+             "Pluralsight", "LinkedIn Learning", "Skillshare", "DataCamp", "Codecademy"]
+LEVELS = ["beginner", "intermediate", "advanced", "all levels", None]
+FILLER = ("learn build practice real world examples exercises quizzes lectures projects skills career "
+          "tools techniques concepts theory applied industry experts step by step").split()
+
+QUERIES = [
+    {"query": "python"},
+    {"query": "machine learning", "level": "beginner"},
+    {"query": "data analysis", "budget": "free"},
+    {"query": "web development react", "budget": "$0-50"},
+    {"query": "sql statistics", "platform": "Coursera"},
+    {"query": "deep learning", "level": "advanced", "budget": "free"},
+    {"query": "spanish guitar photography"},
+]
+
+
+def write_snapshot(path: str, count: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            subject = rng.choice(SUBJECTS)
+            other = rng.choice(SUBJECTS)
+            platform = rng.choice(PLATFORMS)
+            price = rng.choice(["free", "free", None, 999, 1999, 4999, 8999, 19999])
+            record = {
+                "name": f"{subject.title()} {rng.choice(MODIFIERS)} {i}",
+                "platform": platform,
+                "url": f"https://www.{platform.lower().replace(' ', '')}.com/course/{i}",
+                "duration_hours": rng.choice([None, 4, 12, 30, 60]),
+                "price_cents": None if price in ("free", None) else price,
+                "is_free": price == "free",
+                "level": rng.choice(LEVELS),
+                "description": f"{subject} with {other}: " + " ".join(rng.sample(FILLER, 12)),
+                "tags": [subject, other],
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "courses.jsonl")
+        index_dir = os.path.join(tmp, "index")
+
+        started = time.perf_counter()
+        write_snapshot(snapshot, args.courses, args.seed)
+        print(f"snapshot: {args.courses} courses, {os.path.getsize(snapshot) / 1e6:.0f} MB "
+              f"({time.perf_counter() - started:.1f}s to generate)")
+
+        meta = build_catalog_index(snapshot, index_dir)
+        print(f"index:    {meta['terms']} terms, {meta['postings']} postings, built in {meta['build_seconds']}s")
+
+        started = time.perf_counter()
+        catalog = CourseCatalog(index_dir)
+        set_catalog(catalog)
+        print(f"load:     {(time.perf_counter() - started) * 1000:.1f}ms (memory-mapped)\n")
+
+        rng = random.Random(args.seed)
+        search_catalog(**QUERIES[0])  # warm up
+        per_query = {i: [] for i in range(len(QUERIES))}
+        for _ in range(args.queries):
+            idx = rng.randrange(len(QUERIES))
+            started = time.perf_counter()
+            result = search_catalog(**QUERIES[idx])
+            per_query[idx].append((time.perf_counter() - started, len(result["courses"]), result["full_matches"]))
+
+        print(f"{'query':<58} {'p50':>8} {'p99':>8} {'matches':>9}")
+        everything = []
+        for idx, samples in per_query.items():
+            if not samples:
+                continue
+            latencies = [s[0] for s in samples]
+            everything.extend(latencies)
+            label = ", ".join(f"{k}={v}" for k, v in QUERIES[idx].items())
+            print(f"{label:<58} {percentile(latencies, 50) * 1000:6.1f}ms {percentile(latencies, 99) * 1000:6.1f}ms "
+                  f"{samples[0][2]:>9}")
+        print(f"\nall queries: p50 {percentile(everything, 50) * 1000:.1f}ms, "
+              f"p99 {percentile(everything, 99) * 1000:.1f}ms, mean {statistics.mean(everything) * 1000:.1f}ms")
+        catalog.close()
+        set_catalog(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# benchmarks/e2e_benchmark.py
+
+"""
+Offline end-to-end benchmark of the real agent graph.
+
+Runs root_agent with CourseFinderPipeline, learning_path_generator and
+calendar_agent through an ADK runner, with no network access:
+
+- every LlmAgent's model is a CassetteLlm (fake_llm.py) answering from a
+  cassette (default: fixtures/e2e_cassette.json) with injected latency
+- google_search is a function tool answering from fixtures/search_results.json
+- Calendar calls go to the local fake Calendar server (fake_calendar_server.py)
+- link checks go to the link_check_benchmark stub server
+- the local catalog is off and the search cache is cold, unless --warm-search-cache
+
+Scenarios (one session each, run --iterations times, --concurrency at once):
+    search_rank        "find courses" -> search -> link check -> rank
+    plan_calendar      "I'll take X" -> learning path -> 52-week calendar (recurring events)
+    plan_calendar_sessions   same, with a separate event for every session
+    full               search_rank, then plan_calendar in the same session
+
+Reports p50/p95/p99 per stage (from the agents' telemetry), per turn and
+end to end, plus throughput and peak RSS.
+
+--record PATH records a new cassette from the real model (needs Gemini
+credentials); search and Calendar stay fake.
+
+Usage:
+    python benchmarks/e2e_benchmark.py --iterations 20 --concurrency 5
+    python benchmarks/e2e_benchmark.py --scenario search_rank --latency-scale 0
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar_server import build_fake_service, start_server_process
+from fake_llm import Cassette, CassetteLlm, current_turn
+from link_check_benchmark import StubAdapter, start_stub_server
+from google.adk.agents import LlmAgent
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import FunctionTool
+from google.genai import types
+from sub_agents import calendar_tool
+from sub_agents.agent import app, root_agent
+from sub_agents.calendar_mirror import CalendarMirror, set_calendar_mirror
+from sub_agents.calendar_quota import CalendarWriteScheduler, set_write_scheduler
+from sub_agents.course_catalog import set_catalog
+from sub_agents.link_checker import LinkChecker, set_link_checker
+from sub_agents.plan_registry import PlanRegistry, set_plan_registry
+from sub_agents.search_cache import SearchCache, set_search_cache
+from sub_agents.telemetry import AgentTelemetry, set_telemetry
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+FIND = "Find me free beginner Python courses"
+SELECT = "I'll take Python for Everybody, 3 hours a week on Saturdays and Sundays at 9am"
+CALENDAR = "Yes, add it to my calendar starting this Saturday, Eastern time, reminders at 8pm"
+CALENDAR_SESSIONS = CALENDAR + ", as separate events for every session"
+
+SCENARIOS = {
+    "search_rank": [FIND],
+    "plan_calendar": [SELECT, CALENDAR],
+    "plan_calendar_sessions": [SELECT, CALENDAR_SESSIONS],
+    "full": [FIND, SELECT, CALENDAR],
+}
+
+# Reported stages, in pipeline order
+STAGES = ["root_agent", "CourseFinderPipeline", "PreferenceCollector", "search_agent", "link_checker",
+          "CourseRanker", "learning_path_generator", "calendar_agent"]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_fake_search(results_path: str, latency_ms: float) -> FunctionTool:
+    with open(results_path, encoding="utf-8") as f:
+        results = json.load(f)
+
+    async def google_search(query: str) -> dict:
+        """Searches the web. Returns the top results with title, url and snippet."""
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000.0)
+        return {"results": [r for site, site_results in results.items() if site in query for r in site_results]}
+
+    return FunctionTool(google_search)
+
+
+def patch_agent_tree(agent, cassette: Cassette, search_tool: FunctionTool, latency_ms: float,
+                     latency_scale: float, record: bool):
+    """Gives every LlmAgent a CassetteLlm and the fake google_search, in place."""
+    if isinstance(agent, LlmAgent):
+        model_name = agent.model if isinstance(agent.model, str) else agent.model.model
+        agent.model = CassetteLlm(
+            model=model_name,
+            agent_name=agent.name,
+            cassette=cassette,
+            latency_ms=latency_ms,
+            latency_scale=latency_scale,
+            inner=LLMRegistry.new_llm(model_name) if record else None,
+        )
+        agent.tools = [search_tool if getattr(tool, "name", None) == "google_search" else tool
+                       for tool in agent.tools]
+    for sub_agent in agent.sub_agents:
+        patch_agent_tree(sub_agent, cassette, search_tool, latency_ms, latency_scale, record)
+
+
+async def run_scenario(name: str, iterations: int, concurrency: int) -> dict:
+    runner = InMemoryRunner(app=app, app_name="course_recommender_benchmark")
+    stage_seconds = {}
+    turn_seconds = {}
+    scenario_seconds = []
+
+    def on_record(record: dict):
+        if record["type"] == "agent" and record["outcome"] != "incomplete":
+            # Turns an agent only hands to another agent are reported apart from its real work
+            stage = record["agent"] + (" (routing)" if record["outcome"] == "transferred" else "")
+            stage_seconds.setdefault(stage, []).append(record["duration_ms"] / 1000)
+
+    telemetry = AgentTelemetry(jsonl_path=os.getenv("TELEMETRY_JSONL", ""))
+    telemetry.add_listener(on_record)
+    set_telemetry(telemetry)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_session(i: int):
+        user_id = f"bench-{name}-{i}"
+        async with semaphore:
+            session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+            started = time.perf_counter()
+            for turn, message in enumerate(SCENARIOS[name]):
+                token = current_turn.set({"message": message, "user_id": user_id})
+                turn_started = time.perf_counter()
+                try:
+                    content = types.Content(role="user", parts=[types.Part(text=message)])
+                    async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=content):
+                        pass
+                finally:
+                    current_turn.reset(token)
+                turn_seconds.setdefault(turn, []).append(time.perf_counter() - turn_started)
+            scenario_seconds.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_session(i) for i in range(iterations)))
+    wall = time.perf_counter() - started
+    # Saves the queued memories through the app's MemoryFlushPlugin, as a server shutdown does
+    await runner.close()
+    return {
+        "stages": stage_seconds,
+        "turns": turn_seconds,
+        "end_to_end": scenario_seconds,
+        "wall": wall,
+        "throughput": iterations / wall,
+        "agent_stats": telemetry.get_stats(),
+    }
+
+
+def _row(label: str, values: list) -> str:
+    return (f"{label:<34} {len(values):>5} {percentile(values, 50) * 1000:9.0f}ms "
+            f"{percentile(values, 95) * 1000:9.0f}ms {percentile(values, 99) * 1000:9.0f}ms")
+
+
+def print_report(name: str, result: dict, iterations: int, concurrency: int):
+    print(f"\n== {name}: {iterations} sessions, {concurrency} at a time ==")
+    print(f"{'stage':<34} {'n':>5} {'p50':>11} {'p95':>11} {'p99':>11}")
+    stages = [name for stage in STAGES for name in (f"{stage} (routing)", stage)]
+    for stage in stages + sorted(name for name in result["stages"] if name.endswith("_search")):
+        values = result["stages"].get(stage)
+        if values:
+            print(_row(stage, values))
+    for turn, values in sorted(result["turns"].items()):
+        print(_row(f"turn {turn + 1}: {SCENARIOS[name][turn][:18]}...", values))
+    print(_row("end to end", result["end_to_end"]))
+    stats = result["agent_stats"]
+    model_calls = sum(s["model_calls"] for s in stats.values())
+    tokens = sum(s["prompt_tokens"] + s["output_tokens"] for s in stats.values())
+    print(f"throughput: {result['throughput']:.2f} sessions/s   wall: {result['wall']:.2f}s   "
+          f"model calls/session: {model_calls / iterations:.1f}   tokens/session: {tokens / iterations:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Scenario to run (repeatable; default: search_rank, plan_calendar)")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--cassette", default=os.path.join(FIXTURES, "e2e_cassette.json"))
+    parser.add_argument("--search-results", default=os.path.join(FIXTURES, "search_results.json"))
+    parser.add_argument("--record", metavar="PATH", help="Record a cassette from the real model into PATH")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded model latency")
+    parser.add_argument("--llm-latency-ms", type=float, help="Fixed model latency (overrides the cassette's)")
+    parser.add_argument("--search-latency-ms", type=float, default=300.0)
+    parser.add_argument("--link-latency-ms", type=float, default=80.0)
+    parser.add_argument("--calendar-latency-ms", type=float, default=50.0)
+    parser.add_argument("--warm-search-cache", action="store_true")
+    parser.add_argument("--json", metavar="PATH", help="Also write the raw results as JSON")
+    args = parser.parse_args()
+    scenarios = args.scenario or ["search_rank", "plan_calendar"]
+
+    cassette = Cassette() if args.record else Cassette.load(args.cassette)
+    patch_agent_tree(root_agent, cassette, make_fake_search(args.search_results, args.search_latency_ms),
+                     args.llm_latency_ms, args.latency_scale, bool(args.record))
+
+    # Local stand-ins for every network dependency
+    set_catalog(None)
+    cache_dir = tempfile.mkdtemp(prefix="e2e_benchmark_")
+    search_cache_ttl = 3600 if args.warm_search_cache else 0
+    set_search_cache(SearchCache(path=os.path.join(cache_dir, "search_cache.sqlite3"),
+                                 ttl=search_cache_ttl, stale_ttl=search_cache_ttl))
+    set_calendar_mirror(CalendarMirror(path=os.path.join(cache_dir, "calendar_mirror.sqlite3")))
+    set_plan_registry(PlanRegistry(path=os.path.join(cache_dir, "plan_registry.sqlite3")))
+
+    link_server, link_url = start_stub_server(args.link_latency_ms, slow_seconds=0)
+    link_session = requests.Session()
+    adapter = StubAdapter(link_url, pool_connections=16, pool_maxsize=16, max_retries=0)
+    link_session.mount("https://", adapter)
+    link_session.mount("http://", adapter)
+    set_link_checker(LinkChecker(session=link_session))
+
+    calendar_server, calendar_url = start_server_process(latency_ms=args.calendar_latency_ms)
+    service = build_fake_service(calendar_url)
+    calendar_tool.get_calendar_service = lambda: service
+    # Measure the I/O path, not Calendar's quotas
+    set_write_scheduler(CalendarWriteScheduler(global_rate=1e9, global_burst=1e9, user_rate=1e9, user_burst=1e9))
+
+    results = {}
+    baseline_rss = peak_rss_mb()
+    try:
+        for name in scenarios:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = asyncio.run(run_scenario(name, args.iterations, args.concurrency))
+            print_report(name, results[name], args.iterations, args.concurrency)
+    finally:
+        calendar_server.terminate()
+        link_server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"\npeak RSS: {peak_rss_mb():.0f} MB (after imports and setup: {baseline_rss:.0f} MB)")
+    if args.record:
+        cassette.save(args.record)
+        print(f"recorded {len(cassette.interactions)} interactions to {args.record}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({name: {k: v for k, v in result.items()} for name, result in results.items()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
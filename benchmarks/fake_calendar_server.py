@@ -0,0 +1,374 @@
+# benchmarks/fake_calendar_server.py
+
+"""
+Local fake Google Calendar HTTP endpoint for benchmarks.
+
+Speaks enough of the Calendar v3 REST API (including multipart batch
+requests, freebusy queries and incremental sync with syncToken) for
+googleapiclient to talk to it, keeps events in memory and counts HTTP
+round trips and response bytes. An optional per-round-trip latency simulates the
+network distance to Google.
+"""
+
+import email.parser
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from zoneinfo import ZoneInfo
+
+EVENTS_PREFIX = "/calendar/v3/calendars/"
+FREEBUSY_PATH = "/calendar/v3/freeBusy"
+BATCH_PATH = "/batch/calendar/v3"
+
+
+class FakeCalendar:
+    """In-memory calendar state shared by all request handlers."""
+
+    def __init__(self, latency_ms: float = 0.0, rate_limit_ratio: float = 0.0):
+        self.latency_ms = latency_ms
+        # Fraction of API calls rejected with 403 rateLimitExceeded
+        self.rate_limit_ratio = rate_limit_ratio
+        self._random = random.Random(42)
+        self.lock = threading.Lock()
+        self.calendars = {}
+        self.round_trips = 0
+        self.api_calls = 0
+        self.response_bytes = 0
+        # Change log for incremental sync: calendar_id -> {event_id: sequence}
+        self.sequence = 0
+        self.changed = {}
+        self.deleted = {}
+        # Sync tokens from an older epoch are rejected with 410 Gone
+        self.token_epoch = 0
+
+    def reset_counters(self):
+        with self.lock:
+            self.round_trips = 0
+            self.api_calls = 0
+            self.response_bytes = 0
+
+    def expire_sync_tokens(self):
+        """Invalidates every sync token handed out so far (the next incremental sync gets 410)."""
+        with self.lock:
+            self.token_epoch += 1
+
+    def _touch(self, calendar_id: str, event_id: str, deleted: bool = False):
+        self.sequence += 1
+        self.changed.setdefault(calendar_id, {}).pop(event_id, None)
+        self.deleted.setdefault(calendar_id, {}).pop(event_id, None)
+        (self.deleted if deleted else self.changed)[calendar_id][event_id] = self.sequence
+
+    def dispatch(self, method: str, path: str, query: dict, body: bytes) -> tuple:
+        """
+        Handles one Calendar API call.
+
+        Returns:
+            tuple: (http_status, json_dict or None)
+        """
+        with self.lock:
+            self.api_calls += 1
+            rate_limited = self._random.random() < self.rate_limit_ratio
+
+        if rate_limited:
+            return 403, {"error": {
+                "code": 403,
+                "message": "Rate Limit Exceeded",
+                "errors": [{"domain": "usageLimits", "reason": "rateLimitExceeded", "message": "Rate Limit Exceeded"}],
+            }}
+
+        if method == "POST" and path == FREEBUSY_PATH:
+            return 200, self._freebusy(json.loads(body or b"{}"))
+
+        if not path.startswith(EVENTS_PREFIX):
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+
+        parts = [unquote(p) for p in path[len(EVENTS_PREFIX):].split("/")]
+        if len(parts) < 2 or parts[1] != "events":
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+
+        calendar_id = parts[0]
+        event_id = parts[2] if len(parts) > 2 else None
+
+        with self.lock:
+            events = self.calendars.setdefault(calendar_id, {})
+
+            if method == "POST" and event_id is None:
+                event = json.loads(body or b"{}")
+                event["id"] = uuid.uuid4().hex
+                event["htmlLink"] = f"https://calendar.google.com/event?eid={event['id']}"
+                event["status"] = "confirmed"
+                events[event["id"]] = event
+                self._touch(calendar_id, event["id"])
+                return 200, event
+
+            if method == "GET" and event_id is None:
+                return self._list(calendar_id, events, query)
+
+            if event_id not in events:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+            if method == "GET":
+                return 200, events[event_id]
+            if method == "PATCH":
+                events[event_id].update(json.loads(body or b"{}"))
+                self._touch(calendar_id, event_id)
+                return 200, events[event_id]
+            if method == "DELETE":
+                del events[event_id]
+                self._touch(calendar_id, event_id, deleted=True)
+                return 204, None
+
+        return 405, {"error": {"code": 405, "message": f"{method} not supported"}}
+
+
+    def _list(self, calendar_id: str, events: dict, query: dict) -> tuple:
+        """
+        events.list with privateExtendedProperty and timeMin/timeMax filters,
+        paging and syncToken.
+
+        An incremental sync returns every event changed since the token,
+        deleted ones as {"id", "status": "cancelled"}. The last page of any
+        listing carries a nextSyncToken. timeMin/timeMax compare against an
+        event's first instance only (recurring events are not expanded).
+        """
+        sync_token = query.get("syncToken", [None])[0]
+        if sync_token is not None:
+            epoch, _, since = sync_token.partition(":")
+            if int(epoch) != self.token_epoch:
+                message = "Sync token is no longer valid, a full sync is required."
+                return 410, {"error": {"code": 410, "message": message, "errors": [
+                    {"domain": "global", "reason": "fullSyncRequired", "message": message}]}}
+            since = int(since)
+            items = [events[i] for i, seq in self.changed.get(calendar_id, {}).items() if seq > since]
+            items += [{"kind": "calendar#event", "id": i, "status": "cancelled"}
+                      for i, seq in self.deleted.get(calendar_id, {}).items() if seq > since]
+        else:
+            items = list(events.values())
+            for condition in query.get("privateExtendedProperty", []):
+                name, _, value = condition.partition("=")
+                items = [
+                    e for e in items
+                    if e.get("extendedProperties", {}).get("private", {}).get(name) == value
+                ]
+            if "timeMin" in query or "timeMax" in query:
+                time_min = datetime.fromisoformat(query.get("timeMin", ["0001-01-01T00:00:00+00:00"])[0])
+                time_max = datetime.fromisoformat(query.get("timeMax", ["9999-12-31T00:00:00+00:00"])[0])
+                items = [e for e in items if "dateTime" in e.get("start", {})
+                         and _aware(e["start"]) < time_max and _aware(e["end"]) > time_min]
+
+        offset = int(query.get("pageToken", ["0"])[0])
+        page_size = int(query.get("maxResults", ["250"])[0])
+        page = {"kind": "calendar#events", "items": items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            page["nextPageToken"] = str(offset + page_size)
+        else:
+            page["nextSyncToken"] = f"{self.token_epoch}:{self.sequence}"
+        return 200, page
+
+
+    def _freebusy(self, query: dict) -> dict:
+        """
+        freebusy.query over single (non-recurring) opaque events.
+
+        Naive event times are read in their own timeZone; busy times come
+        back in the query's timeZone, overlapping ones merged.
+        """
+        zone = ZoneInfo(query.get("timeZone", "UTC"))
+        time_min = datetime.fromisoformat(query["timeMin"])
+        time_max = datetime.fromisoformat(query["timeMax"])
+
+        calendars = {}
+        for item in query.get("items", []):
+            with self.lock:
+                events = list(self.calendars.get(item["id"], {}).values())
+            intervals = sorted(
+                (max(_aware(e["start"]), time_min), min(_aware(e["end"]), time_max)) for e in events
+                if e.get("transparency") != "transparent" and "dateTime" in e.get("start", {})
+                and _aware(e["start"]) < time_max and _aware(e["end"]) > time_min
+            )
+            busy = []
+            for start, end in intervals:
+                if busy and start <= busy[-1][1]:
+                    busy[-1][1] = max(busy[-1][1], end)
+                else:
+                    busy.append([start, end])
+            calendars[item["id"]] = {"busy": [
+                {"start": start.astimezone(zone).isoformat(), "end": end.astimezone(zone).isoformat()}
+                for start, end in busy
+            ]}
+        return {"kind": "calendar#freeBusy", "timeMin": query["timeMin"], "timeMax": query["timeMax"],
+                "calendars": calendars}
+
+
+def _aware(value: dict) -> datetime:
+    """An event's start/end as an aware datetime; naive times are read in their own timeZone."""
+    parsed = datetime.fromisoformat(value["dateTime"])
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=ZoneInfo(value.get("timeZone", "UTC")))
+
+
+def _split_http_message(raw: str) -> tuple:
+    """Splits an embedded HTTP request into (request_line, headers, body)."""
+    raw = raw.replace("\r\n", "\n")
+    head, _, body = raw.partition("\n\n")
+    lines = head.strip("\n").split("\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers, body
+
+
+def _make_handler(calendar: FakeCalendar):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: bytes, content_type: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            with calendar.lock:
+                calendar.response_bytes += len(payload)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _handle(self):
+            with calendar.lock:
+                calendar.round_trips += 1
+            if calendar.latency_ms:
+                time.sleep(calendar.latency_ms / 1000.0)
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            url = urlsplit(self.path)
+
+            if url.path == BATCH_PATH:
+                return self._handle_batch(body)
+
+            status, result = calendar.dispatch(self.command, url.path, parse_qs(url.query), body)
+            self._send(status, json.dumps(result).encode() if result is not None else b"")
+
+        def _handle_batch(self, body: bytes):
+            content_type = self.headers.get("Content-Type")
+            message = email.parser.BytesParser().parsebytes(
+                b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+            )
+
+            boundary = f"batch_{uuid.uuid4().hex}"
+            out = []
+            for part in message.get_payload():
+                request_line, _, part_body = _split_http_message(part.get_payload())
+                method, target = request_line.split(" ")[:2]
+                url = urlsplit(target)
+                status, result = calendar.dispatch(
+                    method, url.path, parse_qs(url.query), part_body.encode()
+                )
+
+                content_id = part["Content-ID"].strip("<>")
+                response_body = json.dumps(result) if result is not None else ""
+                out.append(
+                    f"--{boundary}\r\n"
+                    f"Content-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}\r\n"
+                    f"Content-Type: application/json; charset=UTF-8\r\n"
+                    f"Content-Length: {len(response_body)}\r\n\r\n"
+                    f"{response_body}\r\n"
+                )
+            out.append(f"--{boundary}--\r\n")
+
+            self._send(200, "".join(out).encode(), f"multipart/mixed; boundary={boundary}")
+
+        do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _handle
+
+    return Handler
+
+
+def start_server(latency_ms: float = 0.0, rate_limit_ratio: float = 0.0) -> tuple:
+    """
+    Starts the fake Calendar server on a free local port in a background thread.
+
+    Returns:
+        tuple: (server, calendar, root_url) - call server.shutdown() when done
+    """
+    calendar = FakeCalendar(latency_ms=latency_ms, rate_limit_ratio=rate_limit_ratio)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(calendar))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    root_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    return server, calendar, root_url
+
+
+def build_fake_service(root_url: str):
+    """
+    Builds a googleapiclient Calendar service that points at the fake server.
+
+    Uses the discovery document bundled with googleapiclient, with its
+    rootUrl rewritten so both single and batch requests hit the fake server.
+    Like the real client, each thread gets its own httplib2 connection, so
+    the service can be shared by concurrent benchmark users.
+    """
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.http import HttpRequest
+    from sub_agents.calendar_client import load_discovery_document
+
+    local = threading.local()
+
+    def thread_http():
+        if not hasattr(local, "http"):
+            local.http = httplib2.Http()
+        return local.http
+
+    def build_request(http, *args, **kwargs):
+        return HttpRequest(thread_http(), *args, **kwargs)
+
+    document = dict(load_discovery_document())
+    document["rootUrl"] = root_url
+    return build_from_document(document, http=thread_http(), requestBuilder=build_request)
+
+
+def start_server_process(latency_ms: float = 0.0) -> tuple:
+    """
+    Starts the fake Calendar server in a separate Python process.
+
+    Keeps the server's CPU work off the benchmark process (and its GIL), which
+    matters when measuring client-side concurrency.
+
+    Returns:
+        tuple: (process, root_url) - call process.terminate() when done
+    """
+    import subprocess
+    import sys
+
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--latency-ms", str(latency_ms)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    root_url = process.stdout.readline().strip()
+    return process, root_url
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake Calendar server")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, _, url = start_server(latency_ms=args.latency_ms)
+    print(url, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,185 @@
+# benchmarks/fake_llm.py
+
+"""
+Scripted stand-in for Gemini, with record/replay cassettes, for benchmarks.
+
+A cassette is a JSON file of interactions. Each one says how one agent
+answers in one situation:
+
+    {"agent": "CourseRanker", "trigger": "tool:rank_found_courses", "match": "(?i)python",
+     "latency_ms": 3500, "usage": {"prompt_tokens": 2400, "output_tokens": 420},
+     "response": {"text": "Great news! ..."}}
+
+- trigger is "message" when the request ends with the user's message, or
+  "tool:<name>" when it ends with that tool's result.
+- match is an optional regex searched in the user's message for this turn.
+- response is {"text": ...}, {"json": <value>} (sent as JSON text) or
+  {"function_calls": [{"name": ..., "args": {...}}]}.
+- "{user_id}" in response strings becomes the benchmark user's ID. That
+  keeps per-user resources apart, such as calendar plans keyed by course
+  name.
+
+The first interaction that fits wins. Replay sleeps for the recorded
+latency_ms, scaled (or replaced) as configured. It reports the recorded
+token usage, so telemetry counts tokens as if a real model had answered.
+
+Record mode sends requests to a real model instead and appends what it
+answered, with the measured latency, to the cassette. The match is the
+exact message.
+
+The harness sets current_turn (message, user_id) before running a turn.
+"""
+
+import asyncio
+import contextvars
+import json
+import re
+import time
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+# {"message": str, "user_id": str} of the turn being run
+current_turn = contextvars.ContextVar("current_turn", default={"message": "", "user_id": ""})
+
+
+class Cassette:
+    """Interactions shared by all agents' CassetteLlms."""
+
+    def __init__(self, interactions: list = None):
+        self.interactions = interactions or []
+        self._patterns = {}
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["interactions"])
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "interactions": self.interactions}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    def find(self, agent: str, trigger: str, message: str) -> dict:
+        """
+        Returns the first interaction for agent/trigger whose match fits message.
+
+        Raises:
+            KeyError: If the cassette has no answer (re-record it)
+        """
+        for interaction in self.interactions:
+            if interaction["agent"] != agent or interaction["trigger"] != trigger:
+                continue
+            pattern = interaction.get("match")
+            if pattern:
+                if pattern not in self._patterns:
+                    self._patterns[pattern] = re.compile(pattern)
+                if not self._patterns[pattern].search(message):
+                    continue
+            return interaction
+        raise KeyError(f"Cassette has no answer for {agent} on {trigger} (message: {message!r})")
+
+
+def request_trigger(llm_request: LlmRequest) -> str:
+    """ "tool:<name>" if the request ends with a tool result, else "message"."""
+    if llm_request.contents:
+        for part in llm_request.contents[-1].parts or []:
+            if part.function_response is not None:
+                return f"tool:{part.function_response.name}"
+    return "message"
+
+
+def _fill_user(value, user_id: str):
+    if isinstance(value, str):
+        return value.replace("{user_id}", user_id)
+    if isinstance(value, list):
+        return [_fill_user(v, user_id) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill_user(v, user_id) for k, v in value.items()}
+    return value
+
+
+def _strip_user(value, user_id: str):
+    if isinstance(value, str):
+        return value.replace(user_id, "{user_id}") if user_id else value
+    if isinstance(value, list):
+        return [_strip_user(v, user_id) for v in value]
+    if isinstance(value, dict):
+        return {k: _strip_user(v, user_id) for k, v in value.items()}
+    return value
+
+
+def _to_content(response: dict) -> types.Content:
+    if "function_calls" in response:
+        parts = [types.Part(function_call=types.FunctionCall(name=call["name"], args=call.get("args", {})))
+                 for call in response["function_calls"]]
+    elif "json" in response:
+        parts = [types.Part(text=json.dumps(response["json"]))]
+    else:
+        parts = [types.Part(text=response["text"])]
+    return types.Content(role="model", parts=parts)
+
+
+def _from_content(content: types.Content) -> dict:
+    calls = [{"name": part.function_call.name, "args": dict(part.function_call.args or {})}
+             for part in content.parts or [] if part.function_call]
+    if calls:
+        return {"function_calls": calls}
+    return {"text": "".join(part.text or "" for part in content.parts or [])}
+
+
+class CassetteLlm(BaseLlm):
+    """One agent's model: replays that agent's cassette interactions, or records them from `inner`."""
+
+    agent_name: str
+    cassette: Cassette
+    # Replay latency = latency_ms if set, else the recorded latency x latency_scale
+    latency_ms: Optional[float] = None
+    latency_scale: float = 1.0
+    inner: Optional[BaseLlm] = None  # set to record
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False
+                                     ) -> AsyncGenerator[LlmResponse, None]:
+        turn = current_turn.get()
+        trigger = request_trigger(llm_request)
+        if self.inner is not None:
+            async for response in self._record(llm_request, trigger, turn):
+                yield response
+            return
+
+        interaction = self.cassette.find(self.agent_name, trigger, turn["message"])
+        latency = self.latency_ms if self.latency_ms is not None else interaction.get("latency_ms", 0) * self.latency_scale
+        if latency:
+            await asyncio.sleep(latency / 1000.0)
+        usage = interaction.get("usage", {})
+        yield LlmResponse(
+            content=_to_content(_fill_user(interaction["response"], turn["user_id"])),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=usage.get("prompt_tokens", 0),
+                candidates_token_count=usage.get("output_tokens", 0),
+            ),
+        )
+
+    async def _record(self, llm_request: LlmRequest, trigger: str, turn: dict):
+        started = time.perf_counter()
+        final = None
+        async for response in self.inner.generate_content_async(llm_request, stream=False):
+            final = response
+            yield response
+        if final is None or final.content is None:
+            return
+        usage = final.usage_metadata
+        self.cassette.interactions.append({
+            "agent": self.agent_name,
+            "trigger": trigger,
+            "match": "^" + re.escape(turn["message"]) + "$",
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+            "usage": {
+                "prompt_tokens": (usage.prompt_token_count or 0) if usage else 0,
+                "output_tokens": (usage.candidates_token_count or 0) if usage else 0,
+            },
+            "response": _strip_user(_from_content(final.content), turn["user_id"]),
+        })
@@ -0,0 +1,153 @@
+# benchmarks/intent_router_benchmark.py
+
+"""
+Accuracy and latency of the local intent router on labeled fixture sets.
+
+Two fixtures of labeled turns (message, intent, and optional last_reply /
+course_names context):
+
+- fixtures/intent_labels_heldout.jsonl: the held-out set. Its numbers are
+  the ones to quote. It is never tuned against: a miss here is not fixed
+  by editing the rules or TRAINING_EXAMPLES to match its phrasings.
+- fixtures/intent_labels_dev.jsonl: the set the rules were tuned on.
+  Expect it to score higher than the held-out set.
+
+Rows matching a TRAINING_EXAMPLES phrasing (ignoring case and punctuation)
+are skipped, so no score includes training data. Every message is
+classified with classify_intent(). For each fixture the benchmark reports:
+
+- accuracy, plus precision and recall per intent
+- routed precision: how often a turn the router would handle itself
+  (greeting, course request, course selection, calendar confirm at or
+  above the confidence threshold) had the right intent. A wrong one sends
+  the user to the wrong agent.
+- coverage: the share of those routable turns it handles without the LLM
+- classification latency p50/p99, split by rule and model
+
+Usage:
+    python benchmarks/intent_router_benchmark.py
+    python benchmarks/intent_router_benchmark.py --min-confidence 0.8 --show-errors
+    python benchmarks/intent_router_benchmark.py --fixture benchmarks/fixtures/intent_labels_heldout.jsonl
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sub_agents.intent_router import (
+    CALENDAR_CONFIRM,
+    COURSE_REQUEST,
+    COURSE_SELECTION,
+    GREETING,
+    INTENT_ROUTER_MIN_CONFIDENCE,
+    INTENTS,
+    TRAINING_EXAMPLES,
+    classify_intent,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ROUTABLE = (GREETING, COURSE_REQUEST, COURSE_SELECTION, CALENDAR_CONFIRM)
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def normalized(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+TRAINING_MESSAGES = {normalized(text) for _, text in TRAINING_EXAMPLES}
+
+
+def load_labels(path: str) -> tuple:
+    """Returns (examples, number of rows skipped for matching a training example)."""
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    examples = [row for row in rows if normalized(row["message"]) not in TRAINING_MESSAGES]
+    return examples, len(rows) - len(examples)
+
+
+def classify(example: dict):
+    return classify_intent(example["message"], example.get("last_reply", ""), example.get("course_names", ()))
+
+
+def report(path: str, args):
+    examples, skipped = load_labels(path)
+    results = [classify(example) for example in examples]
+
+    correct = sum(r.intent == e["intent"] for r, e in zip(results, examples))
+    routed = [(r, e) for r, e in zip(results, examples)
+              if r.intent in ROUTABLE and r.confidence >= args.min_confidence]
+    routed_correct = sum(r.intent == e["intent"] for r, e in routed)
+    routable = [e for e in examples if e["intent"] in ROUTABLE]
+    covered = sum(r.intent == e["intent"] for r, e in routed)
+
+    print(f"== {os.path.basename(path)}: {len(examples)} labeled turns, min confidence {args.min_confidence}")
+    if skipped:
+        print(f"   ({skipped} rows skipped: also in TRAINING_EXAMPLES)")
+    print(f"accuracy:          {correct / len(examples):6.1%}")
+    print(f"routed precision:  {routed_correct / len(routed) if routed else 0:6.1%}  ({routed_correct}/{len(routed)})")
+    print(f"coverage:          {covered / len(routable) if routable else 0:6.1%}  "
+          f"({covered}/{len(routable)} routable turns without the LLM)")
+    print(f"handled locally:   {len(routed) / len(examples):6.1%}  of all turns\n")
+
+    print(f"{'intent':<18} {'n':>4} {'precision':>10} {'recall':>8}")
+    for intent in INTENTS:
+        labeled = sum(e["intent"] == intent for e in examples)
+        predicted = sum(r.intent == intent for r in results)
+        hits = sum(r.intent == intent and e["intent"] == intent for r, e in zip(results, examples))
+        print(f"{intent:<18} {labeled:>4} {hits / predicted if predicted else 0:>10.1%} "
+              f"{hits / labeled if labeled else 0:>8.1%}")
+
+    confusion = {}
+    for r, e in zip(results, examples):
+        if r.intent != e["intent"]:
+            confusion[(e["intent"], r.intent)] = confusion.get((e["intent"], r.intent), 0) + 1
+    if confusion:
+        print("\nconfusions (labeled -> predicted):")
+        for (labeled, predicted), count in sorted(confusion.items(), key=lambda item: -item[1]):
+            print(f"  {labeled} -> {predicted}: {count}")
+    if args.show_errors:
+        print("\nerrors:")
+        for r, e in zip(results, examples):
+            if r.intent != e["intent"]:
+                print(f"  [{e['intent']} -> {r.intent} {r.source} {r.confidence:.2f}] {e['message']}")
+
+    timings = {"rule": [], "model": []}
+    for _ in range(args.repeat):
+        for example, result in zip(examples, results):
+            started = time.perf_counter()
+            classify(example)
+            timings[result.source].append(time.perf_counter() - started)
+    print(f"\n{'latency':<18} {'n':>4} {'p50':>9} {'p99':>9}")
+    for source, values in [("all", timings["rule"] + timings["model"]), *timings.items()]:
+        if values:
+            print(f"{source:<18} {len(values) // args.repeat:>4} {percentile(values, 50) * 1e6:7.1f}us "
+                  f"{percentile(values, 99) * 1e6:7.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixture", action="append",
+                        help="Labeled fixture (repeatable; default: the held-out set, then the dev set)")
+    parser.add_argument("--min-confidence", type=float, default=INTENT_ROUTER_MIN_CONFIDENCE)
+    parser.add_argument("--repeat", type=int, default=200, help="Timed passes over each fixture")
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = args.fixture or [os.path.join(FIXTURES, "intent_labels_heldout.jsonl"),
+                                os.path.join(FIXTURES, "intent_labels_dev.jsonl")]
+    for i, path in enumerate(fixtures):
+        if i:
+            print()
+        report(path, args)
+
+if __name__ == "__main__":
+    main()
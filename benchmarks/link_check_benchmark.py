@@ -0,0 +1,156 @@
+# benchmarks/link_check_benchmark.py
+
+"""
+Benchmark: the link_checker stage against a local stub HTTP server.
+
+The stub answers by path keyword - "ok" (200), "gone" (404), "moved"
+(redirect to the homepage), "nohead" (405 to HEAD, 200 to GET), "blocked"
+(403) and "slow" (answers after the read timeout) - with a simulated
+network latency. Course URLs keep their real https hosts; a transport
+adapter sends every request to the stub instead.
+
+Runs the DeadLinkFilter stage on a batch of found courses twice (cold and
+warm cache) and reports which courses were kept and how long it took,
+compared with checking the links one after another.
+
+Usage:
+    python benchmarks/link_check_benchmark.py --courses 40 --latency-ms 150
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from sub_agents.course_records import FOUND_COURSES_KEY
+from sub_agents.link_checker import LinkChecker, link_checker, set_link_checker
+
+KINDS = ["ok", "ok", "ok", "gone", "moved", "nohead", "blocked", "slow"]
+EXPECTED_KEPT = {"ok", "nohead", "blocked", "slow"}
+
+
+def start_stub_server(latency_ms: float, slow_seconds: float) -> tuple:
+    """Starts the stub server on a free local port. Returns (server, root_url)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def log_message(self, format, *args):
+            pass
+
+        def _answer(self, head: bool):
+            time.sleep(latency_ms / 1000.0)
+            if "slow" in self.path:
+                time.sleep(slow_seconds)
+            if "gone" in self.path:
+                status, location = 404, None
+            elif "moved" in self.path:
+                status, location = 302, "/"
+            elif "nohead" in self.path and head:
+                status, location = 405, None
+            elif "blocked" in self.path:
+                status, location = 403, None
+            else:
+                status, location = 200, None
+            self.send_response(status)
+            if location:
+                self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_HEAD(self):
+            self._answer(head=True)
+
+        def do_GET(self):
+            self._answer(head=False)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class StubAdapter(HTTPAdapter):
+    """Sends every request to the stub server, keeping the original path."""
+
+    def __init__(self, root_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = urlsplit(root_url)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.netloc != self.root.netloc:
+            request.url = urlunsplit((self.root.scheme, self.root.netloc, parts.path, parts.query, ""))
+        return super().send(request, **kwargs)
+
+
+def make_courses(count: int) -> list:
+    return [
+        {"name": f"Course {i} ({KINDS[i % len(KINDS)]})", "platform": "Coursera",
+         "url": f"https://www.coursera.org/learn/{KINDS[i % len(KINDS)]}-{i}", "is_free": True}
+        for i in range(count)
+    ]
+
+
+async def run_stage(courses: list) -> tuple:
+    runner = InMemoryRunner(agent=link_checker, app_name="link_check_benchmark")
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="bench", state={FOUND_COURSES_KEY: courses}
+    )
+    started = time.perf_counter()
+    message = types.Content(role="user", parts=[types.Part(text="check")])
+    async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+        pass
+    elapsed = time.perf_counter() - started
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id="bench", session_id=session.id
+    )
+    return session.state[FOUND_COURSES_KEY], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    read_timeout = 1.0
+    server, root_url = start_stub_server(args.latency_ms, slow_seconds=read_timeout * 2)
+    session = requests.Session()
+    adapter = StubAdapter(root_url, pool_connections=args.concurrency, pool_maxsize=args.concurrency, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    checker = LinkChecker(concurrency=args.concurrency, connect_timeout=1.0, read_timeout=read_timeout,
+                          session=session)
+    set_link_checker(checker)
+
+    courses = make_courses(args.courses)
+    kept, cold = asyncio.run(run_stage(courses))
+    kept_kinds = {course["url"].rsplit("/", 1)[1].rsplit("-", 1)[0] for course in kept}
+    _, warm = asyncio.run(run_stage(courses))
+
+    slow = sum(1 for course in courses if "slow" in course["url"])
+    serial = (args.courses * args.latency_ms / 1000.0) + slow * read_timeout
+    print(f"courses: {args.courses}, kept {len(kept)} ({', '.join(sorted(kept_kinds))}), "
+          f"correct: {kept_kinds == EXPECTED_KEPT}")
+    print(f"one after another (estimate): {serial:.2f}s")
+    print(f"stage, cold cache:  {cold:.2f}s")
+    print(f"stage, warm cache:  {warm * 1000:.1f}ms")
+    print(f"checker stats: {checker.get_stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# benchmarks/plan_operations_benchmark.py
+
+"""
+Benchmark: changing a study plan through the plan registry vs re-creating it.
+
+Puts a --weeks plan on the local fake Calendar server, started
+--weeks-done weeks ago, then changes it in three ways:
+
+- shift: push every session back a week
+- change slot: move the Saturday sessions to Monday at 6 PM
+- cancel: remove the plan
+
+Each change is made with calendar_plans (batched deletes and patches on
+the event IDs in the plan registry), and with what the agent had before.
+For shift and change slot that is re-running create_study_reminders with
+sync=True (from the Sunday, since the plan no longer has Saturdays); for
+cancel it is listing the plan's events and deleting them.
+Both plan shapes are measured: separate events and recurring series.
+
+Reports round trips, API calls and wall time, and checks that the
+sessions already studied stay where they were and that every plan event
+left on the calendar is one the registry knows about.
+
+Usage:
+    python benchmarks/plan_operations_benchmark.py --weeks 52 --weeks-done 10 --latency-ms 40
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar_server import build_fake_service, start_server
+from sub_agents import calendar_plans, calendar_tool
+from sub_agents.calendar_batch import execute_batched
+from sub_agents.calendar_mirror import CalendarMirror, set_calendar_mirror
+from sub_agents.calendar_quota import CalendarWriteScheduler, set_write_scheduler
+from sub_agents.plan_registry import PlanRegistry, get_plan_registry, set_plan_registry
+from sub_agents.study_planner import make_plan_id
+
+COURSE = "Benchmark course"
+TIMEZONE = "America/New_York"
+SCHEDULE = [
+    {"day": "Wednesday", "start_time": "7:00 PM", "duration_hours": 1.5},
+    {"day": "Saturday", "start_time": "9:00 AM", "duration_hours": 2.0},
+    {"day": "Sunday", "start_time": "2:00 PM", "duration_hours": 2.0},
+]
+MOVED_SCHEDULE = [SCHEDULE[0], {"day": "Monday", "start_time": "6:00 PM", "duration_hours": 2.0}, SCHEDULE[2]]
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def first_saturday(weeks_done: int) -> date:
+    today = date.today()
+    return today - timedelta(days=(today.weekday() - 5) % 7) - timedelta(weeks=weeks_done)
+
+
+def plan_events(calendar) -> list:
+    return [event for event in calendar.calendars.get("primary", {}).values()
+            if event.get("extendedProperties", {}).get("private", {}).get("planId") == make_plan_id(COURSE)]
+
+
+def study_starts(calendar) -> set:
+    """Start times of every study session on the calendar, with recurring series expanded."""
+    starts = set()
+    for event in plan_events(calendar):
+        if event["extendedProperties"]["private"].get("kind") != "study":
+            continue
+        first = datetime.fromisoformat(event["start"]["dateTime"])
+        count = 1
+        for rule in event.get("recurrence", []):
+            count = int(rule.split("COUNT=")[1].split(";")[0])
+        starts.update(first + timedelta(weeks=i) for i in range(count))
+    return starts
+
+
+def orphans(calendar) -> int:
+    """Plan events on the calendar that the registry has no ID for."""
+    record = get_plan_registry().get_plan(make_plan_id(COURSE))
+    known = set()
+    for entry in record.entries if record else []:
+        known.update((entry.reminder_event_id, entry.study_event_id))
+    return sum(event["id"] not in known for event in plan_events(calendar))
+
+
+def resync(start: date, schedule: list, shift_days: int, weeks: int, recurring: bool):
+    def change():
+        return calendar_tool.create_study_reminders(
+            COURSE, weeks, schedule, (start + timedelta(days=shift_days)).isoformat(), "20:00", TIMEZONE,
+            recurring=recurring, sync=True,
+        )
+    return change
+
+
+def delete_all(service):
+    def change():
+        events = calendar_tool.list_plan_events(service, make_plan_id(COURSE))
+        resource = service.events()
+        execute_batched(service, [resource.delete(calendarId="primary", eventId=e["id"]) for e in events])
+        return {"status": "success"}
+    return change
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--weeks-done", type=int, default=10, help="Weeks of the plan already in the past")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    set_write_scheduler(CalendarWriteScheduler(global_rate=1e9, global_burst=1e9, user_rate=1e9, user_burst=1e9))
+    directory = tempfile.mkdtemp(prefix="plan_operations_")
+    start = first_saturday(args.weeks_done)
+    now = datetime.now(ZoneInfo(TIMEZONE)).replace(tzinfo=None)
+
+    changes = {
+        "shift +7 days": (lambda service: lambda: calendar_plans.shift_plan(COURSE, 7),
+                          lambda service, recurring: resync(start, SCHEDULE, 7, args.weeks, recurring)),
+        "change slot": (lambda service: lambda: calendar_plans.change_slot(COURSE, "Saturday", "Monday", "6:00 PM"),
+                        lambda service, recurring: resync(start, MOVED_SCHEDULE, 1, args.weeks, recurring)),
+        "cancel": (lambda service: lambda: calendar_plans.cancel_plan(COURSE),
+                   lambda service, recurring: delete_all(service)),
+    }
+
+    print(f"{args.weeks}-week plan, {len(SCHEDULE)} sessions a week, {args.weeks_done} weeks done, "
+          f"{args.latency_ms:g}ms per round trip\n")
+    print(f"{'change':<14} {'shape':<10} {'method':<12} {'round trips':>12} {'API calls':>10} {'wall':>9} "
+          f"{'past kept':>10} {'orphans':>8}")
+    for label, (registry_change, baseline_change) in changes.items():
+        for recurring in (False, True):
+            for method in ("registry", "re-create"):
+                # A fresh calendar and registry per run, so runs can't see each other's events
+                server, calendar, root_url = start_server(latency_ms=args.latency_ms)
+                service = build_fake_service(root_url)
+                calendar_tool.get_calendar_service = lambda: service
+                run = f"{label}-{recurring}-{method}".replace(" ", "_")
+                set_calendar_mirror(CalendarMirror(path=os.path.join(directory, f"{run}.mirror.sqlite3")))
+                set_plan_registry(PlanRegistry(path=os.path.join(directory, f"{run}.registry.sqlite3")))
+                try:
+                    created = quiet(calendar_tool.create_study_reminders, COURSE, args.weeks, SCHEDULE,
+                                    start.isoformat(), "20:00", TIMEZONE, recurring=recurring)
+                    if created["status"] != "success":
+                        raise RuntimeError(created["message"])
+                    past = {s for s in study_starts(calendar) if s.replace(tzinfo=None) < now}
+
+                    change = registry_change(service) if method == "registry" else baseline_change(service, recurring)
+                    calendar.reset_counters()
+                    started = time.perf_counter()
+                    result = quiet(change)
+                    wall = time.perf_counter() - started
+                    if result["status"] != "success":
+                        raise RuntimeError(f"{label} ({method}): {result['message']}")
+
+                    kept = len(past & study_starts(calendar))
+                    shape = "recurring" if recurring else "separate"
+                    print(f"{label:<14} {shape:<10} {method:<12} {calendar.round_trips:>12} {calendar.api_calls:>10} "
+                          f"{1000 * wall:7.0f}ms {f'{kept}/{len(past)}':>10} {orphans(calendar):>8}")
+                finally:
+                    server.shutdown()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/search_cache_benchmark.py
+
+"""
+Workload benchmark: search-result cache hit rate and latency saved.
+
+Replays simulated preference_collector outputs (Zipf-distributed topics,
+random level/budget/format, varied phrasing) against a SearchCache on a
+temporary SQLite file. A miss "runs" the search, charged at a simulated
+search latency instead of sleeping; a hit saves that latency. Halfway
+through, the process-local tier is dropped to simulate a restart, so the
+second half also exercises the disk tier.
+
+Usage:
+    python benchmarks/search_cache_benchmark.py --requests 20000 --topics 300
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sub_agents.search_cache import SearchCache, normalize_preferences
+
+LEVELS = ["beginner", "Beginner", "intermediate", "advanced"]
+BUDGETS = ["free", "Free (remembered)", "any", "paid", "$0-50"]
+FORMATS = ["any", "Any", "video", "interactive"]
+TOPIC_SUFFIXES = ["", " courses", " online course"]
+
+
+def preference_text(rng: random.Random, topics: list, zipf_s: float) -> str:
+    weights = [1.0 / (rank ** zipf_s) for rank in range(1, len(topics) + 1)]
+    topic = rng.choices(topics, weights)[0]
+    return (
+        f"Looking for: {topic}{rng.choice(TOPIC_SUFFIXES)}, Level: {rng.choice(LEVELS)}, "
+        f"Budget: {rng.choice(BUDGETS)}, Format: {rng.choice(FORMATS)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--search-seconds", type=float, default=6.0, help="mean simulated search latency")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    topics = [f"topic {i}" for i in range(args.topics)]
+    records = [{"name": f"Course {i}", "platform": "Coursera", "url": f"https://www.coursera.org/learn/c{i}"}
+               for i in range(8)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search_cache.sqlite3")
+        cache = SearchCache(path=path, max_entries=500)
+        lookup_time = 0.0
+        simulated_total = 0.0
+
+        for i in range(args.requests):
+            if i == args.requests // 2:
+                cache._memory.clear()  # restart: the disk tier keeps its entries
+
+            key = normalize_preferences(preference_text(rng, topics, args.zipf))
+            started = time.perf_counter()
+            cached, _ = cache.get(key)
+            lookup_time += time.perf_counter() - started
+            search = rng.uniform(0.5, 1.5) * args.search_seconds
+            simulated_total += search
+            if cached is None:
+                cache.put(key, records, search_seconds=search)
+
+        stats = cache.get_stats()
+
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    print(f"{args.requests} requests over {args.topics} topics (zipf s={args.zipf}), "
+          f"simulated search ~{args.search_seconds}s\n")
+    print(f"hit rate          {stats['hit_rate']:.1%}  ({stats['memory_hits']} memory, "
+          f"{stats['disk_hits']} disk, {stats['misses']} misses)")
+    print(f"evictions         {stats['evictions']} (memory tier capped at 500 entries)")
+    print(f"latency saved     {stats['latency_saved_seconds']:.0f}s of {simulated_total:.0f}s searching "
+          f"({stats['latency_saved_seconds'] / simulated_total:.1%}), "
+          f"~{stats['latency_saved_seconds'] / max(hits, 1):.1f}s per hit")
+    print(f"lookup cost       {lookup_time / args.requests * 1e6:.0f}us mean per lookup")
+
+
+if __name__ == "__main__":
+    main()
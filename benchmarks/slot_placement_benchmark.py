@@ -0,0 +1,201 @@
+# benchmarks/slot_placement_benchmark.py
+
+"""
+Benchmark: free/busy-aware placement of a study plan around existing events.
+
+1. In process: builds the BusyIndex from --events random meetings, then
+   places a year-long plan. The results are checked against a brute-force
+   scan of every event for every candidate start. Then index build and
+   placement time are measured for growing plans and calendars.
+2. Against the local fake Calendar server: seeds the calendar with the
+   same events, then creates the plan with and without avoid_conflicts.
+   Reports the sessions still overlapping a meeting, the HTTP round trips
+   and the wall time.
+
+Usage:
+    python benchmarks/slot_placement_benchmark.py --events 5000 --weeks 52
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar_server import build_fake_service, start_server
+from sub_agents import calendar_tool
+from sub_agents.calendar_batch import execute_batched
+from sub_agents.calendar_quota import CalendarWriteScheduler, set_write_scheduler
+from sub_agents.slot_placement import (
+    PLACEMENT_STEP_MINUTES,
+    PLACEMENT_WINDOW_HOURS,
+    BusyIndex,
+    place_occurrences,
+)
+from sub_agents.study_planner import build_plan, iter_occurrences
+
+START_DATE = "2025-01-04"  # a Saturday
+TIMEZONE = "America/New_York"
+SCHEDULE = [
+    {"day": "Wednesday", "start_time": "7:00 PM", "duration_hours": 1.5},
+    {"day": "Saturday", "start_time": "9:00 AM", "duration_hours": 2.0},
+    {"day": "Sunday", "start_time": "10:00 AM", "duration_hours": 2.0},
+]
+
+
+def make_events(count: int, weeks: int, seed: int) -> list:
+    """Random meetings: weekday work hours, evenings and weekend mornings, 15 minutes to 3 hours."""
+    rng = random.Random(seed)
+    start = datetime.strptime(START_DATE, "%Y-%m-%d")
+    events = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(weeks * 7))
+        hour = rng.choice([8, 9, 10, 11, 13, 14, 15, 16, 17, 18, 19, 20]) if day.weekday() < 5 else rng.randrange(8, 20)
+        begin = day + timedelta(hours=hour, minutes=rng.choice([0, 15, 30, 45]))
+        events.append((begin, begin + timedelta(minutes=rng.choice([15, 30, 30, 45, 60, 60, 90, 120, 180]))))
+    return events
+
+
+def make_occurrences(weeks: int) -> list:
+    return list(iter_occurrences(build_plan("Benchmark course", weeks, SCHEDULE, START_DATE, "20:00", TIMEZONE)))
+
+
+def naive_place(occurrences: list, events: list) -> list:
+    """Brute force: every grid start by distance, each checked against every event. O(n x m)."""
+    window = timedelta(hours=PLACEMENT_WINDOW_HOURS)
+    step = timedelta(minutes=PLACEMENT_STEP_MINUTES)
+    offsets = sorted(range(-int(window / step), int(window / step) + 1), key=lambda k: (abs(k), k < 0))
+    placed = []
+    for occurrence in occurrences:
+        duration = occurrence.study_end - occurrence.study_start
+        day = occurrence.study_start.replace(hour=0, minute=0)
+        best = None
+        for k in offsets:
+            start = occurrence.study_start + k * step
+            if start < day or start + duration > day + timedelta(days=1):
+                continue
+            if all(end <= start or begin >= start + duration for begin, end in events):
+                best = start
+                break
+        placed.append(best)
+    return placed
+
+
+def count_conflicts(occurrences: list, index: BusyIndex) -> int:
+    return sum(not index.is_free(o.study_start, o.study_end) for o in occurrences)
+
+
+def run_in_process(args):
+    events = make_events(args.events, args.weeks, args.seed)
+    occurrences = make_occurrences(args.weeks)
+
+    started = time.perf_counter()
+    index = BusyIndex(events)
+    built = time.perf_counter()
+    placement = place_occurrences(occurrences, index)
+    placed = time.perf_counter()
+
+    print(f"== in process: {len(occurrences)} sessions ({args.weeks} weeks), {args.events} events "
+          f"({len(index)} merged busy intervals) ==")
+    print(f"index build {1000 * (built - started):.2f}ms   placement {1000 * (placed - built):.2f}ms   "
+          f"({1e6 * (placed - built) / len(occurrences):.1f}us per session)")
+    print(f"conflicts: {count_conflicts(occurrences, index)} before, "
+          f"{count_conflicts(placement.occurrences, index)} after "
+          f"({len(placement.moved_from)} moved, {len(placement.unresolved)} unresolved)")
+
+    if not args.skip_naive:
+        started = time.perf_counter()
+        expected = naive_place(occurrences, events)
+        naive_seconds = time.perf_counter() - started
+        actual = [None if i in placement.unresolved else o.study_start for i, o in enumerate(placement.occurrences)]
+        mismatches = sum(a != e for a, e in zip(actual, expected))
+        print(f"brute force O(n x m): {1000 * naive_seconds:.0f}ms   "
+              f"same placement: {'yes' if not mismatches else f'NO ({mismatches} differ)'}")
+
+    print(f"\n{'sessions':>9} {'events':>8} {'build':>10} {'place':>10} {'per session':>12}")
+    for weeks in (13, 52, 520):
+        for count in (1000, 10000, 100000):
+            sample_events = make_events(count, weeks, args.seed)
+            sample = make_occurrences(weeks)
+            started = time.perf_counter()
+            sample_index = BusyIndex(sample_events)
+            built = time.perf_counter()
+            place_occurrences(sample, sample_index)
+            done = time.perf_counter()
+            print(f"{len(sample):>9} {count:>8} {1000 * (built - started):8.1f}ms {1000 * (done - built):8.2f}ms "
+                  f"{1e6 * (done - built) / len(sample):10.1f}us")
+
+
+def seed_calendar(service, events: list):
+    inserts = service.events()
+    execute_batched(service, [inserts.insert(calendarId="primary", body={
+        "summary": "Meeting",
+        "start": {"dateTime": begin.isoformat(), "timeZone": TIMEZONE},
+        "end": {"dateTime": end.isoformat(), "timeZone": TIMEZONE},
+    }) for begin, end in events])
+
+
+def run_api(args):
+    set_write_scheduler(CalendarWriteScheduler(global_rate=1e9, global_burst=1e9, user_rate=1e9, user_burst=1e9))
+    events = make_events(args.events, args.weeks, args.seed)
+    index = BusyIndex(events)
+
+    print(f"\n== fake Calendar API ({args.latency_ms:g}ms per round trip), {args.events} existing events ==")
+    print(f"{'mode':<22} {'conflicts':>9} {'moved':>6} {'round trips':>12} {'wall':>9}")
+    for avoid_conflicts in (False, True):
+        # A fresh calendar per mode, so one run's sessions don't block the other's
+        server, calendar, root_url = start_server(latency_ms=args.latency_ms)
+        service = build_fake_service(root_url)
+        calendar_tool.get_calendar_service = lambda: service
+        try:
+            seed_calendar(service, events)
+            calendar.reset_counters()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = calendar_tool.create_study_reminders(
+                    "Benchmark course", args.weeks, SCHEDULE, START_DATE, "20:00", TIMEZONE,
+                    recurring=True, sync=True, avoid_conflicts=avoid_conflicts,
+                )
+            wall = time.perf_counter() - started
+        finally:
+            server.shutdown()
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+
+        occurrences = make_occurrences(args.weeks)
+        if not result["summary"].get("recurring"):
+            occurrences = [o._replace(study_start=parse_entry(e, "study_start_time"), study_end=parse_entry(e, "study_end_time"))
+                           for o, e in zip(occurrences, result["events"])]
+        moved = result["summary"].get("placement", {}).get("moved_sessions", 0)
+        print(f"{'avoid_conflicts=' + str(avoid_conflicts):<22} {count_conflicts(occurrences, index):>9} "
+              f"{moved:>6} {calendar.round_trips:>12} {1000 * wall:7.0f}ms")
+
+
+def parse_entry(entry: dict, field: str) -> datetime:
+    """Wall-clock datetime of an occurrence_entry() time field."""
+    return datetime.strptime(f"{entry['study_date']} {entry[field]}", "%Y-%m-%d %I:%M %p")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000, help="Existing events on the user's calendar")
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-naive", action="store_true", help="Skip the brute-force comparison")
+    parser.add_argument("--skip-api", action="store_true", help="Skip the fake Calendar API run")
+    args = parser.parse_args()
+
+    run_in_process(args)
+    if not args.skip_api:
+        run_api(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/study_planner_benchmark.py
+
+"""
+Micro-benchmark: expanding study plans with the pure study_planner engine.
+
+Compares study_planner (parse once, timedelta additions per occurrence)
+against the old inline expansion from create_study_reminders (day_map
+lookups, parse_time and strftime per occurrence).
+
+Usage:
+    python benchmarks/study_planner_benchmark.py --users 2000 --weeks 52 --sessions 7
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sub_agents.study_planner import DAY_NAMES, build_plan, iter_occurrences, parse_time
+
+
+def legacy_expand(total_weeks: int, study_schedule: list, start_date: str, reminder_time: str) -> list:
+    """The date math create_study_reminders used to do inline, without the API calls."""
+    day_map = {name: idx for idx, name in enumerate(DAY_NAMES)}
+    start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
+    reminder_hour, reminder_minute = map(int, reminder_time.split(":"))
+    start_day_name = list(day_map.keys())[start_datetime.weekday()]
+    matching = next(i for i, s in enumerate(study_schedule) if s["day"] == start_day_name)
+
+    out = []
+    current_date = start_datetime
+    for week_num in range(total_weeks):
+        for i in range(len(study_schedule)):
+            session = study_schedule[(matching + i) % len(study_schedule)]
+            if week_num == 0 and i == 0:
+                study_date = start_datetime
+            else:
+                days_ahead = (day_map[session["day"]] - current_date.weekday()) % 7 or 7
+                study_date = current_date + timedelta(days=days_ahead)
+            current_date = study_date
+
+            study_hour, study_minute = parse_time(session["start_time"])
+            reminder = (study_date - timedelta(days=1)).replace(hour=reminder_hour, minute=reminder_minute)
+            study = study_date.replace(hour=study_hour, minute=study_minute)
+            study_end = study + timedelta(hours=session["duration_hours"])
+            out.append((
+                week_num + 1,
+                list(day_map.keys())[reminder.weekday()],
+                reminder.strftime("%Y-%m-%d"),
+                study.strftime("%Y-%m-%d"),
+                study.strftime("%I:%M %p"),
+                study_end.strftime("%I:%M %p"),
+            ))
+    return out
+
+
+def make_users(count: int, max_weeks: int, max_sessions: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    users = []
+    for _ in range(count):
+        sessions = rng.randint(1, max_sessions)
+        days = sorted(rng.sample(range(7), sessions))
+        schedule = [
+            {"day": DAY_NAMES[d], "start_time": f"{rng.randint(6, 21)}:{rng.choice(['00', '30'])}", "duration_hours": rng.choice([1, 1.5, 2, 2.75])}
+            for d in days
+        ]
+        start = datetime(2025, 1, 6) + timedelta(days=days[0] + 7 * rng.randint(0, 20))
+        users.append((rng.randint(1, max_weeks), schedule, start.strftime("%Y-%m-%d"), f"{rng.randint(17, 22)}:00"))
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--sessions", type=int, default=7)
+    parser.add_argument("--worst-case", action="store_true",
+                        help="every user gets the full --weeks x --sessions plan")
+    args = parser.parse_args()
+
+    if args.worst_case:
+        schedule = [{"day": d, "start_time": "7:00 PM", "duration_hours": 1.5} for d in DAY_NAMES[:args.sessions]]
+        users = [(args.weeks, schedule, "2025-01-06", "20:00")] * args.users
+    else:
+        users = make_users(args.users, args.weeks, args.sessions)
+
+    started = time.perf_counter()
+    legacy_total = sum(len(legacy_expand(*user)) for user in users)
+    legacy_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    planner_total = 0
+    for total_weeks, schedule, start_date, reminder_time in users:
+        plan = build_plan("Benchmark", total_weeks, schedule, start_date, reminder_time)
+        for _ in iter_occurrences(plan):
+            planner_total += 1
+    planner_elapsed = time.perf_counter() - started
+
+    print(f"{len(users)} users, {planner_total} occurrences\n")
+    for label, total, elapsed in (
+        ("legacy inline", legacy_total, legacy_elapsed),
+        ("study_planner", planner_total, planner_elapsed),
+    ):
+        print(f"{label:<15} {elapsed * 1000:9.1f} ms   {total / elapsed / 1e6:6.2f} M occurrences/s   "
+              f"{elapsed / len(users) * 1e6:8.1f} µs/user")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,22 @@ Architecture:
 - CalendarAgent (LlmAgent): Sets up Google Calendar reminders and study sessions
 """
 
+import os
+
 from google.adk.agents import LlmAgent, SequentialAgent
-from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from google.adk.apps import App
 
 # Import sub-agents
 from sub_agents.preference_collector import preference_collector
 from sub_agents.search_agent import search_agent
+from sub_agents.link_checker import link_checker
 from sub_agents.ranking_agent import ranking_agent
 from sub_agents.learning_path_generator import learning_path_generator
 from sub_agents.calendar_agent import calendar_agent  # ← NEW
+from sub_agents.intent_router import route_turn
+from sub_agents.memory_cache import prefetch_memories, preload_memory_tool
+from sub_agents.memory_writer import MemoryFlushPlugin, get_memory_writer
+from sub_agents.telemetry import instrument_agent_tree
 
 
 # ===== Course Finder Pipeline =====
@@ -28,6 +35,7 @@ course_finder_pipeline = SequentialAgent(
     sub_agents=[
         preference_collector,
         search_agent,
+        link_checker,
         ranking_agent,
     ],
 )
@@ -35,14 +43,13 @@ course_finder_pipeline = SequentialAgent(
 
 # ===== Memory Callback =====
 async def auto_save_to_memory(callback_context):
-    """Save session to Memory Bank after interaction."""
+    """Queue the session for a background Memory Bank save (doesn't delay the reply)."""
     try:
         session = callback_context._invocation_context.session
         memory_service = callback_context._invocation_context.memory_service
 
-        if hasattr(session, "events") and len(session.events) >= 2:
-            await memory_service.add_session_to_memory(session)
-            print("💾 Memories saved!")
+        if memory_service is not None and hasattr(session, "events") and len(session.events) >= 2:
+            get_memory_writer().schedule(memory_service, session)
     except Exception as e:
         print(f"⚠️ Memory save failed: {e}")
 
@@ -87,6 +94,8 @@ HOW TO RESPOND:
 4️⃣ CALENDAR SETUP (yes, add to calendar, set up reminders):
    → Delegate to calendar_agent
    → It will handle all calendar setup questions
+   → Also delegate changes to a plan already on the calendar
+     (push it back, move a study day, cancel it)
    → Celebrate when done: "🎉 All set! You're ready to start learning!"
 
 5️⃣ PROGRESS UPDATES (I completed week 1, I finished module 3):
@@ -97,7 +106,8 @@ HOW TO RESPOND:
 
 6️⃣ CHALLENGES (I'm stuck, this is hard, I'm falling behind):
    → Be encouraging and supportive
-   → Offer to adjust their schedule if needed
+   → Offer to adjust their schedule if needed - if they say yes, delegate
+     to calendar_agent (it can push sessions back or move a study day)
    → Suggest resources (course forums, review material)
    → Example: "That's totally normal! Learning takes time. Want to 
      slow down the pace a bit?"
@@ -140,11 +150,29 @@ ERROR HANDLING:
 - Don't mention technical details
 - Example: "Hmm, I had a small hiccup. Let me try another way!"
 """,
-    tools=[PreloadMemoryTool()],
+    tools=[preload_memory_tool],
     sub_agents=[
         course_finder_pipeline, 
         learning_path_generator,
         calendar_agent  # ← NEW
     ],
+    before_agent_callback=prefetch_memories,
+    # Greetings and clear-cut turns are answered/routed locally (see sub_agents/intent_router.py)
+    before_model_callback=route_turn,
     after_agent_callback=auto_save_to_memory,
-)
\ No newline at end of file
+)
+
+
+# ===== Telemetry =====
+# Per-agent latency, token and tool metrics (see sub_agents/telemetry.py)
+instrument_agent_tree(root_agent)
+
+
+# ===== App =====
+# adk web / api_server load `app` ahead of root_agent; its plugin saves queued
+# memories when a session ends and when the server shuts down
+app = App(
+    name=os.path.basename(os.path.dirname(os.path.abspath(__file__))),
+    root_agent=root_agent,
+    plugins=[MemoryFlushPlugin()],
+)
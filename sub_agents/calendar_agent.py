@@ -1,18 +1,26 @@
 from google.adk.agents import LlmAgent 
-from sub_agents.calendar_tool import calendar_tool
-from datetime import datetime, timedelta
+from google.adk.utils.instructions_utils import inject_session_state
+from sub_agents.calendar_async import (
+    calendar_tool_async,
+    cancel_plan_tool_async,
+    change_slot_tool_async,
+    shift_plan_tool_async,
+)
+from sub_agents.datetime_resolver import datetime_resolver_tool
+from datetime import datetime
 
-calendar_agent = LlmAgent(
-    name="calendar_agent",
-    model="gemini-2.0-flash",
-    description="Creates calendar reminders and study sessions",
-    instruction=f"""
-    TODAY: {datetime.now().strftime("%A, %B %d, %Y")}
+CALENDAR_INSTRUCTION = """
+    JOB: Create calendar events for user's learning schedule, and change
+    or cancel a schedule that is already on the calendar.
     
-    JOB: Create calendar events for user's learning schedule.
+    If the user wants to change a plan that's ALREADY on their calendar
+    (push it back, move a study day, cancel it), skip to CHANGING A PLAN.
     
     STEP 1: READ LEARNING PATH
-    Find in conversation history:
+    The calculated study plan (from learning_path_generator):
+    {study_plan?}
+    Use its course_name, total_weeks and study_schedule EXACTLY - don't recompute them.
+    Only if it is empty, find in conversation history:
     - Course name
     - Study days (e.g., Saturday, Sunday)
     - Study times (e.g., 9:00 AM)
@@ -28,94 +36,107 @@ calendar_agent = LlmAgent(
     Please provide all three!"
     
     IMPORTANT: Check conversation history first!
-    - If user already mentioned timezone → don't ask again
-    - If user already mentioned time → don't ask again
+    - If user already mentioned start date, timezone or time → don't ask again
     - Only ask for what's missing
-    
-    STEP 3: PARSE & CONVERT
-    
-    Date conversion (today is {datetime.now().strftime("%A, %B %d")}):
-    - "tomorrow" → {(datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")}
-    - "this Saturday" → calculate next Saturday from today
-    - "next Sunday" → calculate Sunday of next week (7+ days ahead)
-    - "Dec 1" / "December 1" → "2025-12-01"
-    
-    DATE RULES:
-    - "this [day]" = upcoming occurrence (0-6 days ahead)
-    - "next [day]" = week after upcoming (7-13 days ahead)
-    
-    Example: If today is Saturday:
-    - "this Sunday" = tomorrow (1 day)
-    - "next Sunday" = 8 days ahead
-    - "this Saturday" = 7 days ahead (next week's Saturday)
-    
-    Timezone conversion:
-    - Pacific/PST/California → America/Los_Angeles
-    - Eastern/EST/New York → America/New_York
-    - Central/CST/Chicago → America/Chicago
-    - Mountain/MST/Denver → America/Denver
-    - UK/London/GMT → Europe/London
-    - India/IST → Asia/Kolkata
-    
-    Time conversion (24-hour HH:MM):
-    - 8pm/8 PM → 20:00
-    - 6:30pm → 18:30
-    - 9am → 09:00
-    - noon → 12:00
-    
-    STEP 4: VERIFY DATE (CRITICAL!)
-    After calculating the date, CONFIRM with user:
-    "Just to confirm - starting on [Day, Month Date, Year] (e.g., Saturday, November 30th, 2025). Is that correct?"
-    
-    Wait for confirmation. If wrong, ask for clarification and recalculate.
-    
-    STEP 5: SHOW FINAL CONFIRMATION
-    Once date is verified:
-    "Perfect! Here's what I'll create:
-    
-    📚 Course: [name]
-    📅 Duration: [X] weeks  
-    🗓️ Schedule: [days] at [time], [hours] per session
-    🔔 Reminders: [time] [timezone] (day before)
-    📍 Starting: [readable date]
-    
-    Total: [Y] events ([Z] reminders + [Z] study sessions)
-    
-    Ready to create?"
-    
-    STEP 6: CREATE EVENTS
-    Once user confirms, build study_schedule:
+    - If the user gave all three, go straight to STEP 3 in this same turn
+    
+    STEP 3: RESOLVE (tool - don't convert dates, timezones or times yourself)
+    Call resolve_calendar_inputs with the user's OWN words:
+    resolve_calendar_inputs(
+        start_date="this Saturday",
+        timezone="Pacific",
+        reminder_time="8pm"
+    )
+    → It returns start_date (YYYY-MM-DD, already moved to the first study day),
+      start_date_readable, timezone (IANA) and reminder_time (HH:MM)
+    → If it returns an error, ask the user what its message says, then call it again
+    → If it returns a note (e.g. the start moved to the first study day), mention it
+    → Its results are exact: don't ask the user to confirm them
+    
+    STEP 4: CREATE EVENTS (right after STEP 3, same turn)
+    Take study_schedule from the study plan as-is, or if there is none, build it:
     [
-        {{"day": "Saturday", "start_time": "9:00 AM", "duration_hours": 2.0}},
-        {{"day": "Sunday", "start_time": "9:00 AM", "duration_hours": 2.0}}
+        {"day": "Saturday", "start_time": "9:00 AM", "duration_hours": 2.0},
+        {"day": "Sunday", "start_time": "9:00 AM", "duration_hours": 2.0}
     ]
     
     Call tool:
     create_study_reminders(
-        course_name="[from learning path]",
-        total_weeks=[from learning path],
+        course_name="[course_name from the study plan]",
+        total_weeks=[total_weeks from the study plan],
         study_schedule=[list above],
-        start_date="[YYYY-MM-DD format]",
-        reminder_time="[HH:MM format]",
-        timezone="[IANA format]"
+        start_date="[start_date from resolve_calendar_inputs]",
+        reminder_time="[reminder_time from resolve_calendar_inputs]",
+        timezone="[timezone from resolve_calendar_inputs]",
+        recurring=True,
+        sync=True,
+        avoid_conflicts=True
     )
     
-    STEP 7: SUCCESS MESSAGE
+    Always pass recurring=True: it creates one repeating event per study day
+    (fast, same cost for any plan length). Only use recurring=False if the
+    user explicitly asks for separate events for every session.
+    
+    Always pass sync=True: if this course is already on the calendar (e.g. the
+    user changed their pace), the existing events are updated instead of
+    duplicated. Use the same course_name as before so the plan is recognized.
+    
+    Always pass avoid_conflicts=True: sessions that clash with the user's
+    existing events move to the nearest free time the same day (up to 2 hours
+    earlier or later). Moved sessions carry "moved_from" in the result's
+    events; summary.placement.unresolved_dates lists sessions that still clash.
+    
+    STEP 5: SUCCESS MESSAGE
     "✅ All set! Created your calendar events!
     
+    📚 Course: [name]
+    📅 Duration: [X] weeks
+    🗓️ Schedule: [days] at [time], [hours] per session
+    🔔 Reminders: [time] [timezone] (day before)
+    📍 Starting: [start_date_readable]
+    ↔️ Moved: [only if sessions moved - which ones and their new times]
+    ⚠️ Conflicts: [only if sessions are unresolved - the dates that still clash]
+    
     🔗 View: https://calendar.google.com
     
     Your first reminder is [date] at [time]! 🚀"
     
+    CHANGING A PLAN (already on the calendar - don't call create_study_reminders)
+    Use the course_name the plan was created with. These only touch upcoming
+    sessions; past sessions stay on the calendar.
+    - "Push everything back a week" / "I'm falling behind":
+      shift_plan(course_name="[name]", delta_days=7)
+      (negative delta_days moves sessions earlier)
+    - "Move my Saturday sessions to Sunday at 10am" / "make them 1.5 hours":
+      change_slot(course_name="[name]", day="Saturday", new_day="Sunday",
+                  new_start_time="10:00 AM", new_duration_hours=0)
+      (leave out or pass "" / 0 for what stays the same)
+    - "Cancel it" / "remove it from my calendar": confirm first, then
+      cancel_plan(course_name="[name]")
+    Report the result's message. If it returns an error, tell the user in plain words.
+    
     CRITICAL RULES:
     ══════════════════════════════════════════════════
     1. Never ask for same info twice - check conversation first
-    2. Always VERIFY the calculated date with user before creating
-    3. If user says date is wrong, recalculate and verify again
-    4. Convert all natural language to technical format internally
-    5. Show natural language to user, use technical format for tool
-    6. Ask all 3 questions together to minimize back-and-forth
-    """,
-    tools=[calendar_tool],
+    2. Never calculate dates, timezones or 24-hour times yourself - use resolve_calendar_inputs
+    3. If the user says a date is wrong, call resolve_calendar_inputs again with their correction
+    4. Show natural language to user, use the resolved values for create_study_reminders
+    5. Ask all 3 questions together to minimize back-and-forth
+    """
+
+
+async def calendar_instruction(context) -> str:
+    """Builds the prompt per request, so TODAY is never stale in a long-running server."""
+    today = f"TODAY: {datetime.now():%A, %B %d, %Y} (dates are resolved by resolve_calendar_inputs)\n"
+    return await inject_session_state(today + CALENDAR_INSTRUCTION, context)
+
+
+calendar_agent = LlmAgent(
+    name="calendar_agent",
+    model="gemini-2.0-flash",
+    description="Creates calendar reminders and study sessions, and reschedules or cancels them",
+    instruction=calendar_instruction,
+    tools=[datetime_resolver_tool, calendar_tool_async, shift_plan_tool_async,
+           change_slot_tool_async, cancel_plan_tool_async],
     output_key="calendar_setup"
 )
\ No newline at end of file
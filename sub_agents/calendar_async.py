@@ -0,0 +1,147 @@
+# sub_agents/calendar_async.py
+
+"""
+Async, non-blocking variant of the calendar tool.
+
+ADK runs agents on asyncio, so the blocking googleapiclient calls inside
+create_study_reminders would freeze every other session on the worker.
+Here they run on a dedicated, bounded thread pool instead:
+
+- At most CALENDAR_IO_THREADS tool calls do Calendar I/O at once; further
+  callers wait on an asyncio semaphore, where they can still be cancelled.
+- Every call has a deadline (CALENDAR_TOOL_TIMEOUT seconds) on top of the
+  per-request socket timeout of the Calendar client.
+- Cancellation and timeouts reach the worker thread through
+  calendar_batch.cancel_event, so no further batches are sent.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from google.adk.tools import FunctionTool, ToolContext
+from sub_agents import calendar_plans, calendar_tool
+from sub_agents.calendar_batch import cancel_event
+from sub_agents.calendar_quota import calendar_user
+
+CALENDAR_IO_THREADS = int(os.getenv("CALENDAR_IO_THREADS", "16"))
+CALENDAR_TOOL_TIMEOUT = float(os.getenv("CALENDAR_TOOL_TIMEOUT", "60"))
+
+_executor = ThreadPoolExecutor(max_workers=CALENDAR_IO_THREADS, thread_name_prefix="calendar-io")
+
+# asyncio.Semaphore is bound to one event loop, so keep one per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _loop_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(CALENDAR_IO_THREADS)
+    return semaphore
+
+
+async def run_calendar_io(func, *args, timeout: float = CALENDAR_TOOL_TIMEOUT, **kwargs):
+    """
+    Runs a blocking Calendar function on the calendar I/O thread pool.
+
+    Args:
+        func: Blocking function to run
+        timeout: Deadline in seconds, including time spent waiting for a slot
+
+    Raises:
+        asyncio.TimeoutError: If the deadline passes
+        asyncio.CancelledError: If the caller is cancelled
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+
+    # The worker sees this context, so execute_batched can notice the cancellation
+    context = contextvars.copy_context()
+    context.run(cancel_event.set, cancelled)
+
+    async def _run():
+        async with _loop_semaphore():
+            return await loop.run_in_executor(
+                _executor, functools.partial(context.run, func, *args, **kwargs)
+            )
+
+    try:
+        return await asyncio.wait_for(_run(), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        cancelled.set()
+        raise
+
+
+async def create_study_reminders(
+    course_name: str,
+    total_weeks: int,
+    study_schedule: list,
+    start_date: str,
+    reminder_time: str = "20:00",
+    timezone: str = "America/Los_Angeles",
+    recurring: bool = False,
+    sync: bool = False,
+    avoid_conflicts: bool = False,
+    tool_context: ToolContext = None
+) -> dict:
+    # Same name, parameters and docstring as the blocking tool, so the
+    # calendar_agent prompt works unchanged with either one
+    return await _run_as_user(
+        tool_context,
+        "Google Calendar took too long to respond. Some events may not have been created - try again with sync=True to fill in the rest.",
+        calendar_tool.create_study_reminders,
+        course_name, total_weeks, study_schedule, start_date,
+        reminder_time, timezone, recurring, sync, avoid_conflicts
+    )
+
+
+async def cancel_plan(course_name: str, tool_context: ToolContext = None) -> dict:
+    return await _run_as_user(
+        tool_context, "Google Calendar took too long to respond. Run cancel_plan again to finish.",
+        calendar_plans.cancel_plan, course_name
+    )
+
+
+async def shift_plan(course_name: str, delta_days: int, tool_context: ToolContext = None) -> dict:
+    return await _run_as_user(
+        tool_context, "Google Calendar took too long to respond. Check the calendar before shifting again.",
+        calendar_plans.shift_plan, course_name, delta_days
+    )
+
+
+async def change_slot(course_name: str, day: str, new_day: str = "", new_start_time: str = "",
+                      new_duration_hours: float = 0, tool_context: ToolContext = None) -> dict:
+    return await _run_as_user(
+        tool_context, "Google Calendar took too long to respond. Check the calendar before changing it again.",
+        calendar_plans.change_slot, course_name, day, new_day, new_start_time, new_duration_hours
+    )
+
+
+async def _run_as_user(tool_context, timeout_message: str, func, *args) -> dict:
+    """Runs a blocking calendar tool on the I/O pool, on behalf of the session's user."""
+    user_token = calendar_user.set(tool_context.user_id if tool_context else "default")
+    try:
+        return await run_calendar_io(func, *args)
+    except asyncio.TimeoutError:
+        print(f"\n❌ ERROR: {func.__name__} timed out after {CALENDAR_TOOL_TIMEOUT}s\n")
+        return {"status": "error", "message": timeout_message}
+    finally:
+        calendar_user.reset(user_token)
+
+
+create_study_reminders.__doc__ = calendar_tool.create_study_reminders.__doc__
+cancel_plan.__doc__ = calendar_plans.cancel_plan.__doc__
+shift_plan.__doc__ = calendar_plans.shift_plan.__doc__
+change_slot.__doc__ = calendar_plans.change_slot.__doc__
+
+
+# Create the ADK FunctionTools
+calendar_tool_async = FunctionTool(create_study_reminders)
+cancel_plan_tool_async = FunctionTool(cancel_plan)
+shift_plan_tool_async = FunctionTool(shift_plan)
+change_slot_tool_async = FunctionTool(change_slot)
@@ -0,0 +1,112 @@
+# sub_agents/calendar_batch.py
+
+"""
+Batched Google Calendar writes.
+
+Groups many Calendar API requests into batch HTTP requests so a whole
+study plan costs a handful of round trips instead of one per event.
+Every batch is admitted by the Calendar write scheduler (rate limits,
+priorities) and calls rejected with retryable errors are sent again.
+"""
+
+import contextvars
+import time
+
+from sub_agents.calendar_quota import INTERACTIVE, get_write_scheduler, is_retryable
+
+# The Calendar API rejects batches with more than 50 calls
+CALENDAR_BATCH_LIMIT = 50
+DEFAULT_BATCH_SIZE = 50
+
+# threading.Event set by async callers (see calendar_async) when the tool call
+# is cancelled or times out; no further batches are sent once it is set
+cancel_event = contextvars.ContextVar("calendar_cancel_event", default=None)
+
+
+def execute_batched(
+    service,
+    requests: list,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    priority: int = INTERACTIVE,
+    scheduler=None
+) -> list:
+    """
+    Executes Calendar API requests using batch HTTP requests.
+
+    A failed call never aborts the rest of the batch: its error is recorded
+    and the remaining calls still run. Calls that fail with rate-limit, 429,
+    5xx or network errors are retried with backoff, up to the scheduler's
+    max_retries.
+
+    Args:
+        service: Authenticated Google Calendar service
+        requests: List of HttpRequest objects, e.g.
+            [service.events().insert(calendarId='primary', body=event), ...]
+        batch_size: Max calls per batch request (1-50, default 50)
+        priority: calendar_quota.INTERACTIVE (default) or BULK
+        scheduler: CalendarWriteScheduler to use (default: process-wide one)
+
+    Returns:
+        list: One {"response": dict or None, "error": str or None} per request,
+            in the same order as `requests`
+    """
+    batch_size = max(1, min(int(batch_size), CALENDAR_BATCH_LIMIT))
+    scheduler = scheduler or get_write_scheduler()
+    results = [{"response": None, "error": None} for _ in requests]
+    cancelled = cancel_event.get()
+
+    retry = []
+
+    def _on_response(request_id, response, exception):
+        idx = int(request_id)
+        if exception is None:
+            results[idx]["response"] = response
+            results[idx]["error"] = None
+        else:
+            results[idx]["error"] = str(exception)
+            if is_retryable(exception):
+                retry.append(idx)
+
+    pending = list(range(len(requests)))
+    attempt = 0
+
+    while pending:
+        for chunk_start in range(0, len(pending), batch_size):
+            chunk = pending[chunk_start:chunk_start + batch_size]
+
+            if cancelled is not None and cancelled.is_set():
+                for idx in pending[chunk_start:]:
+                    results[idx]["error"] = "Cancelled before the request was sent"
+                return results
+
+            scheduler.acquire(len(chunk), priority=priority)
+
+            batch = service.new_batch_http_request(callback=_on_response)
+            for idx in chunk:
+                batch.add(requests[idx], request_id=str(idx))
+
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole batch failed (network, auth, ...) - mark its calls and keep going
+                for idx in chunk:
+                    if results[idx]["response"] is None:
+                        results[idx]["error"] = f"Batch request failed: {e}"
+                        if is_retryable(e) and idx not in retry:
+                            retry.append(idx)
+
+        if not retry or attempt >= scheduler.max_retries:
+            break
+
+        delay = scheduler.backoff_delay(attempt)
+        print(f"⏳ Calendar rate limited/unavailable - retrying {len(retry)} calls in {delay:.1f}s")
+        if cancelled is not None:
+            cancelled.wait(delay)
+        else:
+            time.sleep(delay)
+
+        pending = sorted(retry)
+        retry.clear()
+        attempt += 1
+
+    return results
@@ -0,0 +1,196 @@
+# sub_agents/calendar_client.py
+
+"""
+Process-wide cached Google Calendar client.
+
+The Calendar service is built once per process from the discovery document
+bundled with googleapiclient (no network fetch, parsed once) and reused by
+every tool call. Credentials are loaded from token.pickle once and only
+refreshed when they are close to expiring; the refresh is single-flight, so
+concurrent sessions never race on it or on rewriting token.pickle.
+"""
+
+import json
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+
+# If modifying these scopes, delete the file token.pickle.
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# Refresh the access token when it expires within this window
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Socket timeout (seconds) for every Calendar HTTP request
+CALENDAR_HTTP_TIMEOUT = float(os.getenv("CALENDAR_HTTP_TIMEOUT", "20"))
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_PATH = os.path.join(_PROJECT_ROOT, 'token.pickle')
+CREDENTIALS_PATH = os.path.join(_PROJECT_ROOT, 'credentials.json')
+
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+
+def load_discovery_document() -> dict:
+    """
+    Returns the parsed Calendar v3 discovery document bundled with googleapiclient.
+
+    Parsed once per process; callers must not modify the returned dict.
+    """
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                document = get_static_doc('calendar', 'v3')
+                if document is None:
+                    raise RuntimeError("googleapiclient has no bundled Calendar v3 discovery document")
+                _discovery_document = json.loads(document)
+    return _discovery_document
+
+
+class CalendarServiceProvider:
+    """
+    Thread-safe, cached Calendar service and credential provider.
+
+    httplib2 connections are not thread-safe, so the service object is shared
+    but every thread sends its requests through its own authorized connection.
+    """
+
+    def __init__(
+        self,
+        token_path: str = TOKEN_PATH,
+        credentials_path: str = CREDENTIALS_PATH,
+        scopes: list = SCOPES,
+        refresh_margin: timedelta = REFRESH_MARGIN
+    ):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.scopes = scopes
+        self.refresh_margin = refresh_margin
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._service = None
+        self._stats = {
+            "cache_hits": 0,
+            "service_builds": 0,
+            "token_file_reads": 0,
+            "token_refreshes": 0,
+            "oauth_flows": 0,
+        }
+
+    def get_service(self):
+        """Returns the cached Calendar service, refreshing credentials if needed."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load_credentials()
+
+            if self._needs_refresh(self._creds):
+                self._creds = self._refresh_credentials(self._creds)
+                self._local = threading.local()
+
+            if self._service is None:
+                self._service = build_from_document(
+                    load_discovery_document(),
+                    http=self._thread_http(),
+                    requestBuilder=self._build_request,
+                )
+                self._stats["service_builds"] += 1
+            else:
+                self._stats["cache_hits"] += 1
+
+            return self._service
+
+    def get_stats(self) -> dict:
+        """Returns a snapshot of the cache and refresh counters."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        """Drops the cached service and credentials (e.g. after revoking access)."""
+        with self._lock:
+            self._creds = None
+            self._service = None
+            self._local = threading.local()
+
+    def _needs_refresh(self, creds) -> bool:
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as naive UTC
+        return creds.expiry - datetime.utcnow() < self.refresh_margin
+
+    def _load_credentials(self):
+        # The file token.pickle stores the user's access and refresh tokens
+        if os.path.exists(self.token_path):
+            with open(self.token_path, 'rb') as token:
+                creds = pickle.load(token)
+            self._stats["token_file_reads"] += 1
+            return creds
+        return self._run_oauth_flow()
+
+    def _refresh_credentials(self, creds):
+        if creds and creds.refresh_token:
+            creds.refresh(Request())
+            self._stats["token_refreshes"] += 1
+        else:
+            creds = self._run_oauth_flow()
+        self._save_credentials(creds)
+        return creds
+
+    def _run_oauth_flow(self):
+        """Opens a browser window for OAuth (first run only)."""
+        if not os.path.exists(self.credentials_path):
+            raise FileNotFoundError(
+                f"credentials.json not found at {self.credentials_path}. Please download OAuth credentials from Google Cloud Console."
+            )
+        flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, self.scopes)
+        creds = flow.run_local_server(port=0)
+        self._stats["oauth_flows"] += 1
+        self._save_credentials(creds)
+        return creds
+
+    def _save_credentials(self, creds):
+        # Write to a temp file and swap it in so readers never see a partial pickle
+        tmp_path = f"{self.token_path}.tmp"
+        with open(tmp_path, 'wb') as token:
+            pickle.dump(creds, token)
+        os.replace(tmp_path, self.token_path)
+
+    def _thread_http(self):
+        """Returns this thread's authorized HTTP connection."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self._creds, http=httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT)
+            )
+            self._local.http = http
+        return http
+
+    def _build_request(self, http, *args, **kwargs):
+        return HttpRequest(self._thread_http(), *args, **kwargs)
+
+
+_provider = CalendarServiceProvider()
+
+
+def get_cached_calendar_service():
+    """Returns the process-wide cached Calendar service."""
+    return _provider.get_service()
+
+
+def get_calendar_client_stats() -> dict:
+    """Returns cache hit / refresh counters of the process-wide provider."""
+    return _provider.get_stats()
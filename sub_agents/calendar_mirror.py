@@ -0,0 +1,326 @@
+# sub_agents/calendar_mirror.py
+
+"""
+Per-user local mirror of Google Calendar events in SQLite.
+
+Reading a user's calendar (the plan's existing events before a sync,
+conflicts, progress) would otherwise page through events.list every time.
+The mirror keeps each user's events on disk, indexed by time range and by
+plan ID, and keeps them current with Calendar's incremental sync:
+
+- The first sync for a user lists every event and keeps the nextSyncToken.
+- Later syncs send that token and get only what changed since then
+  (deleted events come back with status "cancelled"). That is usually
+  one small round trip.
+- When Calendar answers 410 Gone (the token expired or was invalidated),
+  the user's mirror is dropped and synced in full again.
+
+Queries (events_between, plan_events) are local SQLite lookups. Sync first
+(calendar_tool does) to see the calendar as it is now.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sub_agents.calendar_quota import calendar_user
+
+CALENDAR_MIRROR = os.getenv("CALENDAR_MIRROR", "1").lower() not in ("0", "false", "no")
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALENDAR_MIRROR_PATH = os.getenv("CALENDAR_MIRROR_PATH", os.path.join(_PROJECT_ROOT, "calendar_mirror.sqlite3"))
+
+# events.list page size for syncs (the API maximum)
+SYNC_PAGE_SIZE = 2500
+
+# Longest possible gap between two instances of a recurring event, per FREQ
+_PERIODS = {
+    "DAILY": timedelta(days=1),
+    "WEEKLY": timedelta(weeks=1),
+    "MONTHLY": timedelta(days=31),
+    "YEARLY": timedelta(days=366),
+}
+_FOREVER = float("inf")
+
+
+def event_timestamp(value: dict) -> float:
+    """
+    Epoch seconds of an event's start or end.
+
+    Naive dateTimes are read in their own timeZone. All-day dates count
+    from midnight UTC.
+    """
+    if "dateTime" in value:
+        parsed = datetime.fromisoformat(value["dateTime"])
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=ZoneInfo(value.get("timeZone") or "UTC"))
+        return parsed.timestamp()
+    return datetime.fromisoformat(value["date"]).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _series_end(event: dict, start: float, end: float) -> float:
+    """
+    Returns when a recurring event's last instance ends, or `end` for a single event.
+
+    This is an upper bound. Unbounded rules return infinity.
+    """
+    rules = [line[len("RRULE:"):] for line in event.get("recurrence", []) if line.startswith("RRULE:")]
+    last = end
+    for rule in rules:
+        parts = dict(part.split("=", 1) for part in rule.split(";") if "=" in part)
+        if "UNTIL" in parts:
+            # UNTIL may be a local date; two extra days cover any UTC offset
+            until = datetime.strptime(parts["UNTIL"][:8], "%Y%m%d").replace(tzinfo=timezone.utc)
+            last = max(last, (until + timedelta(days=2)).timestamp() + (end - start))
+        elif "COUNT" in parts and parts.get("FREQ") in _PERIODS:
+            period = _PERIODS[parts["FREQ"]] * int(parts.get("INTERVAL", "1"))
+            last = max(last, end + (period * int(parts["COUNT"])).total_seconds())
+        else:
+            return _FOREVER
+    return last
+
+
+def _row(user_id: str, calendar_id: str, event: dict) -> tuple:
+    start = event_timestamp(event["start"])
+    end = event_timestamp(event["end"])
+    recurring = bool(event.get("recurrence"))
+    plan_id = event.get("extendedProperties", {}).get("private", {}).get("planId")
+    return (user_id, calendar_id, event["id"], plan_id, int(recurring), start,
+            _series_end(event, start, end) if recurring else end, json.dumps(event))
+
+
+class CalendarMirror:
+    """
+    Thread-safe SQLite mirror of the users' calendars with incremental sync.
+
+    Rows hold the raw event resources. A recurring event is one row (its
+    series). It spans from its first instance to the end of its last one,
+    and is returned by range queries whose range it may touch.
+    """
+
+    def __init__(self, path: str = CALENDAR_MIRROR_PATH, page_size: int = SYNC_PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+
+        self._lock = threading.Lock()
+        self._sync_locks = {}  # (user_id, calendar_id) -> Lock, so each calendar syncs single-flight
+        self._db = None
+        self._stats = {
+            "full_syncs": 0,
+            "incremental_syncs": 0,
+            "expired_tokens": 0,
+            "sync_pages": 0,
+            "events_fetched": 0,
+            "queries": 0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_events ("
+                " user_id TEXT NOT NULL, calendar_id TEXT NOT NULL, event_id TEXT NOT NULL,"
+                " plan_id TEXT, recurring INTEGER NOT NULL, start_ts REAL NOT NULL, end_ts REAL NOT NULL,"
+                " body TEXT NOT NULL, PRIMARY KEY (user_id, calendar_id, event_id))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS mirror_events_time"
+                " ON mirror_events (user_id, calendar_id, recurring, start_ts)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS mirror_events_plan"
+                " ON mirror_events (user_id, calendar_id, plan_id) WHERE plan_id IS NOT NULL"
+            )
+            # max_span: longest single event, which bounds how far back a range query looks
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_sync ("
+                " user_id TEXT NOT NULL, calendar_id TEXT NOT NULL, sync_token TEXT,"
+                " max_span REAL NOT NULL, synced_at REAL NOT NULL, PRIMARY KEY (user_id, calendar_id))"
+            )
+        return self._db
+
+    def _sync_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._sync_locks.setdefault(key, threading.Lock())
+
+    def _sync_state(self, user_id: str, calendar_id: str) -> tuple:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT sync_token, max_span FROM mirror_sync WHERE user_id = ? AND calendar_id = ?",
+                (user_id, calendar_id)
+            ).fetchone()
+        return row if row is not None else (None, 0.0)
+
+    def _fetch(self, service, calendar_id: str, sync_token: str = None) -> tuple:
+        """Lists every event, or only the changes since sync_token. Returns (items, next_sync_token, pages)."""
+        events_resource = service.events()
+        items = []
+        page_token = None
+        pages = 0
+        while True:
+            response = events_resource.list(
+                calendarId=calendar_id,
+                syncToken=sync_token,
+                maxResults=self.page_size,
+                pageToken=page_token
+            ).execute(num_retries=3)
+            pages += 1
+            items.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return items, response.get('nextSyncToken'), pages
+
+    def sync(self, service, user_id: str = None, calendar_id: str = 'primary') -> dict:
+        """
+        Brings one user's mirror up to date with Calendar.
+
+        Args:
+            service: Authenticated Google Calendar service
+            user_id: Whose mirror (default: calendar_quota.calendar_user)
+            calendar_id: Calendar to mirror
+
+        Returns:
+            dict: {"mode": "full" or "incremental", "changes", "pages", "seconds"}
+        """
+        user_id = user_id or calendar_user.get()
+        started = time.perf_counter()
+        with self._sync_lock((user_id, calendar_id)):
+            sync_token, max_span = self._sync_state(user_id, calendar_id)
+            expired = False
+            try:
+                items, next_token, pages = self._fetch(service, calendar_id, sync_token)
+            except Exception as e:
+                # 410 Gone: the token is no longer valid, start over with a full sync
+                if sync_token is None or int(getattr(getattr(e, "resp", None), "status", 0)) != 410:
+                    raise
+                expired = True
+                sync_token = None
+                items, next_token, pages = self._fetch(service, calendar_id)
+
+            full = sync_token is None
+            self._apply(user_id, calendar_id, items, next_token, 0.0 if full else max_span, full)
+
+            with self._lock:
+                self._stats["full_syncs" if full else "incremental_syncs"] += 1
+                self._stats["expired_tokens"] += int(expired)
+                self._stats["sync_pages"] += pages
+                self._stats["events_fetched"] += len(items)
+
+        return {
+            "mode": "full" if full else "incremental",
+            "changes": len(items),
+            "pages": pages,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _apply(self, user_id: str, calendar_id: str, items: list, sync_token: str, max_span: float, full: bool):
+        """Writes a sync's results and its new token in one transaction."""
+        owner = (user_id, calendar_id)
+        removed = [owner + (item['id'],) for item in items if item.get('status') == 'cancelled']
+        rows = [_row(user_id, calendar_id, item) for item in items if item.get('status') != 'cancelled']
+        max_span = max([max_span] + [row[6] - row[5] for row in rows if not row[4]])
+
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if full:
+                    db.execute("DELETE FROM mirror_events WHERE user_id = ? AND calendar_id = ?", owner)
+                db.executemany(
+                    "DELETE FROM mirror_events WHERE user_id = ? AND calendar_id = ? AND event_id = ?", removed
+                )
+                db.executemany("INSERT OR REPLACE INTO mirror_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                db.execute(
+                    "INSERT OR REPLACE INTO mirror_sync VALUES (?, ?, ?, ?, ?)",
+                    owner + (sync_token, max_span, time.time())
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def events_between(self, time_min: datetime, time_max: datetime, user_id: str = None,
+                       calendar_id: str = 'primary') -> list:
+        """
+        Returns the mirrored events overlapping [time_min, time_max), ordered by start.
+
+        Naive datetimes are read as UTC. Recurring events are returned once,
+        as the series, if any of their instances may fall in the range.
+        """
+        user_id = user_id or calendar_user.get()
+        low = (time_min if time_min.tzinfo else time_min.replace(tzinfo=timezone.utc)).timestamp()
+        high = (time_max if time_max.tzinfo else time_max.replace(tzinfo=timezone.utc)).timestamp()
+        _, max_span = self._sync_state(user_id, calendar_id)
+
+        with self._lock:
+            self._stats["queries"] += 1
+            rows = self._connection().execute(
+                "SELECT start_ts, body FROM mirror_events"
+                " WHERE user_id = ? AND calendar_id = ? AND recurring = 0"
+                " AND start_ts >= ? AND start_ts < ? AND end_ts > ?"
+                " UNION ALL"
+                " SELECT start_ts, body FROM mirror_events"
+                " WHERE user_id = ? AND calendar_id = ? AND recurring = 1 AND start_ts < ? AND end_ts > ?"
+                " ORDER BY start_ts",
+                (user_id, calendar_id, low - max_span, high, low, user_id, calendar_id, high, low)
+            ).fetchall()
+        return [json.loads(body) for _, body in rows]
+
+    def plan_events(self, plan_id: str, user_id: str = None, calendar_id: str = 'primary') -> list:
+        """Returns the mirrored events tagged with plan_id (see calendar_tool._tag_event)."""
+        user_id = user_id or calendar_user.get()
+        with self._lock:
+            self._stats["queries"] += 1
+            rows = self._connection().execute(
+                "SELECT body FROM mirror_events WHERE user_id = ? AND calendar_id = ? AND plan_id = ?",
+                (user_id, calendar_id, plan_id)
+            ).fetchall()
+        return [json.loads(body) for body, in rows]
+
+    def invalidate(self, user_id: str = None, calendar_id: str = 'primary'):
+        """Drops one user's mirror (the next sync is a full one), or everything when user_id is None."""
+        with self._lock:
+            db = self._connection()
+            if user_id is None:
+                db.execute("DELETE FROM mirror_events")
+                db.execute("DELETE FROM mirror_sync")
+            else:
+                db.execute("DELETE FROM mirror_events WHERE user_id = ? AND calendar_id = ?", (user_id, calendar_id))
+                db.execute("DELETE FROM mirror_sync WHERE user_id = ? AND calendar_id = ?", (user_id, calendar_id))
+
+    def get_stats(self) -> dict:
+        """Returns sync and query counters, plus how many calendars and events are mirrored."""
+        with self._lock:
+            stats = dict(self._stats)
+            db = self._connection()
+            stats["calendars"] = db.execute("SELECT COUNT(*) FROM mirror_sync").fetchone()[0]
+            stats["events"] = db.execute("SELECT COUNT(*) FROM mirror_events").fetchone()[0]
+        return stats
+
+
+_mirror = CalendarMirror()
+
+
+def get_calendar_mirror() -> CalendarMirror:
+    """Returns the process-wide calendar mirror."""
+    return _mirror
+
+
+def set_calendar_mirror(mirror: CalendarMirror):
+    """Replaces the process-wide calendar mirror (e.g. a temporary one in benchmarks)."""
+    global _mirror
+    _mirror = mirror
+
+
+def get_calendar_mirror_stats() -> dict:
+    """Returns the process-wide calendar mirror's stats."""
+    return _mirror.get_stats()
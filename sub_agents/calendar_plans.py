@@ -0,0 +1,457 @@
+# sub_agents/calendar_plans.py
+
+"""
+Changes to a study plan that is already on the calendar.
+
+cancel_plan deletes a plan's remaining sessions. shift_plan moves them by
+a number of days. change_slot moves one weekly study day to another day,
+time or length.
+
+Each operation finds the plan's event IDs in the plan registry, without
+listing or re-creating the calendar. It only touches sessions that haven't
+started yet: past sessions stay as a record of what was studied. All
+deletes and patches go out in Calendar batch requests.
+
+A recurring series that hasn't started yet is patched in place. One that
+has started is cut short after its last started session, and if its
+remaining sessions have to move, they become a new repeating event: one
+repeating event can't move only some of its sessions.
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from google.adk.tools import FunctionTool
+from sub_agents import calendar_tool
+from sub_agents.calendar_batch import execute_batched
+from sub_agents.calendar_quota import BULK
+from sub_agents.calendar_tool import CALENDAR_BATCH_SIZE, plan_entry, recurring_event_pair, session_event_pair
+from sub_agents.plan_registry import ACTIVE, CANCELLED, get_plan_registry
+from sub_agents.study_planner import DAY_NAMES, Occurrence, build_plan, replace_slot, week_occurrence
+
+WEEK = timedelta(weeks=1)
+
+# Calendar's answer for an event that no longer exists (e.g. the user deleted it)
+_GONE = re.compile(r"HttpError (404|410) ")
+
+# What an operation does to one registry entry:
+# - writes: ("delete" or "patch", event_id, body) calls, sent in the first round of batches
+# - entry: the entry once they succeed (None when it's gone)
+# - inserts: (PlanEntry, (reminder_body, study_body)) sessions created in a second
+#   round, only if all of the step's writes succeeded
+# - sessions: how many sessions the step changes
+Step = namedtuple("Step", ["writes", "entry", "inserts", "sessions"])
+
+
+def _keep(entry) -> Step:
+    return Step([], entry, [], 0)
+
+
+def _both(action: str, entry, bodies: tuple = (None, None)) -> list:
+    """The same call on an entry's reminder and study events."""
+    return [(action, entry.reminder_event_id, bodies[0]), (action, entry.study_event_id, bodies[1])]
+
+
+def _plan_now(timezone: str) -> datetime:
+    """Current wall-clock time in the plan's timezone (how registry entries keep times)."""
+    return datetime.now(ZoneInfo(timezone)).replace(tzinfo=None)
+
+
+def _started(entry, now: datetime) -> int:
+    """How many of the entry's weekly sessions have started by `now`."""
+    if entry.study_start > now:
+        return 0
+    return min(entry.occurrences, (now - entry.study_start) // WEEK + 1)
+
+
+def _shifted(occurrence: Occurrence, shift: timedelta) -> Occurrence:
+    return occurrence._replace(study_start=occurrence.study_start + shift, study_end=occurrence.study_end + shift,
+                               reminder_start=occurrence.reminder_start + shift,
+                               reminder_end=occurrence.reminder_end + shift)
+
+
+def _instance(entry, i: int, slot_idx: int, shift: timedelta = timedelta()) -> Occurrence:
+    """The entry's i-th weekly session as an Occurrence, moved by `shift`."""
+    occurrence = Occurrence(entry.week + i, slot_idx, entry.study_start, entry.study_end,
+                            entry.reminder_start, entry.reminder_end)
+    return _shifted(occurrence, i * WEEK + shift)
+
+
+def _days_shifted(plan, slot_idx: int, entry) -> timedelta:
+    """Whole days the entry was moved by shift_plan, relative to its plan week."""
+    planned = week_occurrence(plan, entry.week, slot_idx).study_start
+    return timedelta(days=(entry.study_start.date() - planned.date()).days)
+
+
+def _series_events(plan, slot, first_study: datetime, weeks: int, first_week: int) -> tuple:
+    """
+    The (reminder, study) pair of `slot`'s weekly series of `weeks` sessions
+    from first_study (plan week first_week), named after first_study's weekday.
+    """
+    slot = slot._replace(day=DAY_NAMES[first_study.weekday()])
+    return recurring_event_pair(plan._replace(start=first_study - slot.study_offset), slot,
+                                weeks=weeks, first_week=first_week)
+
+
+def _cut_series(plan, slot_idx: int, entry, started: int) -> tuple:
+    """
+    Ends a series after its `started` sessions.
+
+    Returns:
+        tuple: (writes, entry left behind or None)
+    """
+    if started == 0:
+        return _both("delete", entry), None
+    bodies = _series_events(plan, plan.slots[slot_idx], entry.study_start, started, entry.week)
+    return _both("patch", entry, bodies), entry._replace(occurrences=started)
+
+
+def _moved_rest(plan, slot, slot_day: str, occurrences: list, first_week: int) -> list:
+    """Inserts for the moved remaining sessions of a series: a new series, or one session on its own."""
+    first = occurrences[0]
+    if len(occurrences) == 1:
+        return [(plan_entry(first, slot_day, {}), session_event_pair(plan, first, moved=True))]
+    bodies = _series_events(plan, slot, first.study_start, len(occurrences), first_week)
+    return [(plan_entry(first, slot_day, {}, len(occurrences)), bodies)]
+
+
+def _load_plan(course_name: str) -> tuple:
+    """
+    Returns (PlanRecord, StudyPlan) of the user's active plan for course_name,
+    or (None, error message).
+    """
+    registry = get_plan_registry()
+    record = registry.get_plan(registry.current_plan_id(course_name))
+    if record is None or record.status != ACTIVE:
+        active = [plan["course_name"] for plan in registry.list_plans() if plan["status"] == ACTIVE]
+        hint = f"Active plans: {', '.join(active)}." if active else "Create one with create_study_reminders first."
+        return None, f"No active study plan for '{course_name}' on the calendar. {hint}"
+
+    params = record.params
+    plan = build_plan(record.course_name, params["total_weeks"], params["study_schedule"],
+                      params["start_date"], params["reminder_time"], params["timezone"], plan_id=record.plan_id)
+    for day, session in params.get("slot_changes", []):
+        plan = replace_slot(plan, day, session, params["reminder_time"])
+    return record, plan
+
+
+def _apply(service, steps: list, originals: list) -> tuple:
+    """
+    Sends the steps' deletes and patches in batches, then the inserts of the
+    steps whose writes all succeeded. Both are BULK writes: they queue
+    behind interactive plan creation.
+
+    Events that are already gone count as deleted, and a patch on one drops
+    it from the entry. A failed step keeps its original entry, so running
+    the operation again retries it.
+
+    Returns:
+        tuple: (entries, failures, api_calls) - the registry entries
+            afterwards, [{"week", "day", "error"}], calls sent
+    """
+    resource = service.events()
+    requests = []
+    owners = []  # (step index, event id) of each request
+    for i, step in enumerate(steps):
+        for action, event_id, body in step.writes:
+            if event_id is None:
+                continue  # never created
+            if action == "delete":
+                requests.append(resource.delete(calendarId='primary', eventId=event_id))
+            else:
+                requests.append(resource.patch(calendarId='primary', eventId=event_id, body=body))
+            owners.append((i, event_id))
+    results = execute_batched(service, requests, batch_size=CALENDAR_BATCH_SIZE, priority=BULK) if requests else []
+
+    failed = {}
+    gone = set()
+    for (i, event_id), result in zip(owners, results):
+        if result["error"] and _GONE.search(result["error"]):
+            gone.add(event_id)
+        elif result["error"]:
+            failed.setdefault(i, result["error"])
+
+    inserts = []
+    pending = []  # PlanEntry of each inserted pair
+    for i, step in enumerate(steps):
+        if i not in failed:
+            for entry, bodies in step.inserts:
+                inserts.extend(resource.insert(calendarId='primary', body=body) for body in bodies)
+                pending.append(entry)
+    inserted = execute_batched(service, inserts, batch_size=CALENDAR_BATCH_SIZE, priority=BULK) if inserts else []
+
+    entries = []
+    failures = []
+    for i, (original, step) in enumerate(zip(originals, steps)):
+        if i in failed:
+            entries.append(original)
+            failures.append({"week": original.week, "day": original.slot, "error": failed[i]})
+            continue
+        entry = step.entry
+        if entry is not None:
+            entry = entry._replace(
+                reminder_event_id=None if entry.reminder_event_id in gone else entry.reminder_event_id,
+                study_event_id=None if entry.study_event_id in gone else entry.study_event_id,
+            )
+            if entry.reminder_event_id or entry.study_event_id:
+                entries.append(entry)
+
+    for j, entry in enumerate(pending):
+        reminder, study = inserted[2 * j], inserted[2 * j + 1]
+        ids = {f"{kind}_event_id": (result["response"] or {}).get('id')
+               for kind, result in (("reminder", reminder), ("study", study))}
+        if ids["reminder_event_id"] or ids["study_event_id"]:
+            entries.append(entry._replace(**ids))
+        for result in (reminder, study):
+            if result["error"]:
+                failures.append({"week": entry.week, "day": entry.slot, "error": result["error"]})
+
+    if failures:
+        print(f"⚠️ {len(failures)} calendar changes failed:")
+        for failure in failures:
+            print(f"   • {failure}")
+
+    entries.sort(key=lambda entry: entry.study_start)
+    return entries, failures, len(requests) + len(inserts)
+
+
+def _finish(record, entries: list, failures: list, api_calls: int, sessions: int,
+            done: str, params: dict = None, status: str = ACTIVE) -> dict:
+    """Saves the registry entries and builds the tool result."""
+    get_plan_registry().save_plan(record.plan_id, record.course_name, params or record.params, entries,
+                                  status=status if not failures else ACTIVE)
+    message = f"✅ {done}"
+    if failures:
+        message += f" ⚠️ {len(failures)} calendar changes failed - run it again to retry them."
+    return {
+        "status": "partial" if failures else "success",
+        "message": message,
+        "failed_changes": failures,
+        "summary": {
+            "plan_id": record.plan_id,
+            "course_name": record.course_name,
+            "sessions_changed": sessions,
+            "api_calls": api_calls,
+            "calendar_link": "https://calendar.google.com",
+        },
+    }
+
+
+def _run(course_name: str, operation) -> dict:
+    """Loads the plan, runs operation(record, plan, now) -> result dict, and reports errors like the other tools."""
+    try:
+        record, plan = _load_plan(course_name)
+        if record is None:
+            return {"status": "error", "message": plan}
+        return operation(record, plan, _plan_now(plan.timezone))
+    except FileNotFoundError as e:
+        print(f"\n❌ ERROR: {str(e)}\n")
+        return {"status": "error", "message": str(e)}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        print(f"\n❌ ERROR: {str(e)}\n")
+        import traceback
+        traceback.print_exc()
+        return {"status": "error", "message": f"Failed to update the calendar: {str(e)}"}
+
+
+def cancel_plan(course_name: str) -> dict:
+    """
+    Removes a study plan's remaining sessions from Google Calendar.
+
+    Sessions that already started stay on the calendar. Everything after
+    now is deleted: reminders and study sessions, separate or recurring.
+    Planning the course again later gets a new plan ID, so its calendar
+    sync leaves the sessions kept here alone.
+
+    Args:
+        course_name: Course name the plan was created with
+
+    Returns:
+        Dictionary with status, message and a summary of what changed
+    """
+    print(f"\n🗑️ cancel_plan: {course_name}")
+
+    def operation(record, plan, now):
+        slot_index = {slot.day: idx for idx, slot in enumerate(plan.slots)}
+        steps = []
+        for entry in record.entries:
+            started = _started(entry, now)
+            if started == entry.occurrences or (started and entry.slot not in slot_index):
+                steps.append(_keep(entry))
+            elif started == 0:
+                steps.append(Step(_both("delete", entry), None, [], entry.occurrences))
+            else:
+                writes, left = _cut_series(plan, slot_index[entry.slot], entry, started)
+                steps.append(Step(writes, left, [], entry.occurrences - started))
+
+        entries, failures, api_calls = _apply(calendar_tool.get_calendar_service(), steps, record.entries)
+        sessions = sum(step.sessions for step in steps)
+        return _finish(record, entries, failures, api_calls, sessions,
+                       f"Cancelled {record.course_name}: removed {sessions} upcoming sessions.", status=CANCELLED)
+
+    return _run(course_name, operation)
+
+
+def shift_plan(course_name: str, delta_days: int) -> dict:
+    """
+    Moves a study plan's remaining sessions by delta_days (e.g. 7 = push everything back a week).
+
+    Sessions that already started stay where they are; every later session
+    and its reminder move by the same number of days. Sessions can't be
+    moved into the past.
+
+    Args:
+        course_name: Course name the plan was created with
+        delta_days: Days to move by; negative moves sessions earlier
+
+    Returns:
+        Dictionary with status, message and a summary of what changed
+    """
+    print(f"\n📆 shift_plan: {course_name} by {delta_days} days")
+    delta_days = int(delta_days)
+    if delta_days == 0:
+        return {"status": "error", "message": "delta_days must not be 0."}
+    shift = timedelta(days=delta_days)
+
+    def operation(record, plan, now):
+        slot_index = {slot.day: idx for idx, slot in enumerate(plan.slots)}
+        steps = []
+        for entry in record.entries:
+            started = _started(entry, now)
+            if started == entry.occurrences or entry.slot not in slot_index:
+                steps.append(_keep(entry))
+                continue
+            if entry.study_start + started * WEEK + shift <= now:
+                raise ValueError(f"Moving by {delta_days} days would put sessions in the past.")
+
+            idx = slot_index[entry.slot]
+            slot = plan.slots[idx]
+            remaining = entry.occurrences - started
+            moved = entry._replace(**{field: getattr(entry, field) + shift for field in
+                                      ("study_start", "study_end", "reminder_start", "reminder_end")})
+            if entry.occurrences == 1:
+                bodies = session_event_pair(plan, _instance(entry, 0, idx, shift), moved=True)
+                steps.append(Step(_both("patch", entry, bodies), moved, [], 1))
+            elif started == 0:
+                # The whole series moves: it stays one repeating event
+                bodies = _series_events(plan, slot, moved.study_start, entry.occurrences, entry.week)
+                steps.append(Step(_both("patch", entry, bodies), moved, [], remaining))
+            else:
+                writes, left = _cut_series(plan, idx, entry, started)
+                rest = [_instance(entry, i, idx, shift) for i in range(started, entry.occurrences)]
+                steps.append(Step(writes, left, _moved_rest(plan, slot, entry.slot, rest, entry.week + started),
+                                  remaining))
+
+        entries, failures, api_calls = _apply(calendar_tool.get_calendar_service(), steps, record.entries)
+        sessions = sum(step.sessions for step in steps)
+        direction = "later" if delta_days > 0 else "earlier"
+        return _finish(record, entries, failures, api_calls, sessions,
+                       f"Moved {sessions} upcoming {record.course_name} sessions {abs(delta_days)} days {direction}.")
+
+    return _run(course_name, operation)
+
+
+def change_slot(course_name: str, day: str, new_day: str = "", new_start_time: str = "",
+                new_duration_hours: float = 0) -> dict:
+    """
+    Changes one weekly study day of a plan for all remaining sessions.
+
+    Each remaining session on `day` moves to new_day in the same plan week,
+    at new_start_time and for new_duration_hours. Empty values keep the
+    current ones. Sessions that already started, and sessions whose new
+    time this week has already passed, stay as they are.
+
+    Args:
+        course_name: Course name the plan was created with
+        day: Study day to change, e.g. "Saturday"
+        new_day: Day to move it to, e.g. "Sunday" (default: same day)
+        new_start_time: New start time, e.g. "10:00 AM" (default: same time)
+        new_duration_hours: New session length (default: same length)
+
+    Returns:
+        Dictionary with status, message and a summary of what changed
+    """
+    print(f"\n🔁 change_slot: {course_name} {day} → {new_day or day} {new_start_time} {new_duration_hours or ''}")
+
+    def operation(record, plan, now):
+        old_index = {slot.day: idx for idx, slot in enumerate(plan.slots)}
+        if day not in old_index:
+            raise ValueError(f"The plan has no {day} sessions. Study days: {list(old_index)}")
+        old_slot = plan.slots[old_index[day]]
+        session = {
+            "day": new_day or day,
+            "start_time": new_start_time or old_slot.start_time,
+            "duration_hours": float(new_duration_hours or old_slot.duration_hours),
+        }
+        if (session["day"], session["start_time"], session["duration_hours"]) == \
+                (day, old_slot.start_time, old_slot.duration_hours):
+            raise ValueError("Nothing to change: give a new day, start time or duration.")
+
+        new_plan = replace_slot(plan, day, session, record.params["reminder_time"])
+        new_idx = next(idx for idx, slot in enumerate(new_plan.slots) if slot.day == session["day"])
+        new_slot = new_plan.slots[new_idx]
+
+        steps = []
+        skipped = 0
+        for entry in record.entries:
+            started = _started(entry, now)
+            if entry.slot != day or started == entry.occurrences:
+                steps.append(_keep(entry))
+                continue
+
+            remaining = entry.occurrences - started
+            # Earlier shift_plan moves still apply; only the weekday and time change
+            shift = _days_shifted(plan, old_index[day], entry)
+            if entry.occurrences == 1:
+                occurrence = _shifted(week_occurrence(new_plan, entry.week, new_idx), shift)
+                if occurrence.study_start <= now:
+                    skipped += 1
+                    steps.append(_keep(entry))
+                    continue
+                bodies = session_event_pair(new_plan, occurrence)
+                changed = plan_entry(occurrence, new_slot.day, entry._asdict())
+                steps.append(Step(_both("patch", entry, bodies), changed, [], 1))
+            elif started == 0 and _shifted(week_occurrence(new_plan, entry.week, new_idx), shift).study_start > now:
+                # Every session of the series changes the same way: it stays one repeating event
+                first = _shifted(week_occurrence(new_plan, entry.week, new_idx), shift)
+                bodies = _series_events(new_plan, new_slot, first.study_start, entry.occurrences, entry.week)
+                changed = plan_entry(first, new_slot.day, entry._asdict(), entry.occurrences)
+                steps.append(Step(_both("patch", entry, bodies), changed, [], remaining))
+            else:
+                writes, left = _cut_series(plan, old_index[day], entry, started)
+                inserts = []
+                rest = []
+                for i in range(started, entry.occurrences):
+                    occurrence = _shifted(week_occurrence(new_plan, entry.week + i, new_idx), shift)
+                    if occurrence.study_start <= now:
+                        # Already past in its new spot: keep it where it was, as a session of the old slot
+                        occurrence = _instance(entry, i, old_index[day])
+                        skipped += 1
+                        inserts.append((plan_entry(occurrence, day, {}),
+                                        session_event_pair(plan, occurrence, moved=True)))
+                    else:
+                        rest.append(occurrence)
+                if rest:
+                    inserts += _moved_rest(new_plan, new_slot, new_slot.day, rest, rest[0].week)
+                steps.append(Step(writes, left, inserts, remaining))
+
+        entries, failures, api_calls = _apply(calendar_tool.get_calendar_service(), steps, record.entries)
+        sessions = sum(step.sessions for step in steps) - skipped
+        params = dict(record.params, slot_changes=record.params.get("slot_changes", []) + [[day, session]])
+        done = (f"{record.course_name}: {sessions} upcoming {day} sessions now on {new_slot.day} "
+                f"{new_slot.study_start_label} - {new_slot.study_end_label}.")
+        if skipped:
+            done += f" {skipped} sessions stayed put (their new time this week has already passed)."
+        return _finish(record, entries, failures, api_calls, sessions, done, params=params)
+
+    return _run(course_name, operation)
+
+
+# Create the ADK FunctionTools
+cancel_plan_tool = FunctionTool(cancel_plan)
+shift_plan_tool = FunctionTool(shift_plan)
+change_slot_tool = FunctionTool(change_slot)
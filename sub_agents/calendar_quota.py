@@ -0,0 +1,217 @@
+# sub_agents/calendar_quota.py
+
+"""
+Quota-aware rate limiting and retry scheduling for Calendar writes.
+
+Every batch of Calendar writes asks the process-wide CalendarWriteScheduler
+for permission first:
+
+1. The user's own token bucket (Calendar enforces per-user limits) - the
+   caller waits on its own, so a throttled user never blocks others.
+2. A priority queue in front of the global token bucket (per-project
+   limit) - interactive plan creation is admitted before bulk resyncs.
+
+Failed calls that Calendar marks as retryable (403 rate limits, 429, 5xx,
+network errors) are retried with exponential backoff and full jitter.
+"""
+
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+# Write priorities - lower is served first
+INTERACTIVE = 0
+BULK = 10
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# Calendar user whose quota a write counts against (set per tool call)
+calendar_user = contextvars.ContextVar("calendar_user", default="default")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self, cost: float) -> float:
+        """
+        Takes `cost` tokens if available.
+
+        Returns:
+            float: 0.0 if taken, otherwise seconds until they will be available
+        """
+        # A batch larger than the bucket can never fit; let it through once full
+        cost = min(cost, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return 0.0
+            return (cost - self._tokens) / self.rate
+
+    def take(self, cost: float) -> float:
+        """Blocks until `cost` tokens are taken. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            wait = self.try_take(cost)
+            if wait == 0.0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for Calendar errors worth retrying: rate limits, 429, 5xx and network errors."""
+    resp = getattr(error, "resp", None)
+    if resp is None:
+        # Not an HttpError: socket timeouts, connection resets, ...
+        return isinstance(error, (OSError, TimeoutError))
+
+    status = int(getattr(resp, "status", 0))
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status == 403:
+        try:
+            details = json.loads(error.content)["error"].get("errors", [])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return False
+        return any(detail.get("reason") in RATE_LIMIT_REASONS for detail in details)
+    return False
+
+
+class CalendarWriteScheduler:
+    """Per-user and global token buckets, a priority admission queue and retry backoff."""
+
+    def __init__(
+        self,
+        global_rate: float = 50.0,
+        global_burst: float = 200.0,
+        user_rate: float = 10.0,
+        user_burst: float = 100.0,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 32.0
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._user_buckets = {}
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._metrics = {
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "admitted_batches": 0,
+            "admitted_calls": 0,
+            "retries": 0,
+            "throttle_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def _user_bucket(self, user: str) -> TokenBucket:
+        with self._cond:
+            bucket = self._user_buckets.get(user)
+            if bucket is None:
+                bucket = self._user_buckets[user] = TokenBucket(self.user_rate, self.user_burst)
+            return bucket
+
+    def acquire(self, cost: int, user: str = None, priority: int = INTERACTIVE) -> float:
+        """
+        Blocks until a write of `cost` API calls may be sent.
+
+        Args:
+            cost: Number of API calls (a batch costs one per inner request)
+            user: Calendar user the calls count against (default: calendar_user)
+            priority: INTERACTIVE or BULK - lower values are admitted first
+
+        Returns:
+            float: Seconds spent throttled
+        """
+        user = user or calendar_user.get()
+        started = time.monotonic()
+
+        # Per-user limit first, outside the queue, so one user can't hold it up
+        self._user_bucket(user).take(cost)
+
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._metrics["queue_depth"] = len(self._waiting)
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], len(self._waiting))
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        wait = self.global_bucket.try_take(cost)
+                        if wait == 0.0:
+                            break
+                        self._cond.wait(timeout=wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._metrics["queue_depth"] = len(self._waiting)
+                self._cond.notify_all()
+
+            throttled = time.monotonic() - started
+            self._metrics["admitted_batches"] += 1
+            self._metrics["admitted_calls"] += cost
+            self._metrics["throttle_seconds"] += throttled
+        return throttled
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        with self._cond:
+            self._metrics["retries"] += 1
+            self._metrics["backoff_seconds"] += delay
+        return delay
+
+    def get_metrics(self) -> dict:
+        """Returns queue depth, retry and throttle-time counters."""
+        with self._cond:
+            return dict(self._metrics)
+
+
+_scheduler = CalendarWriteScheduler(
+    global_rate=float(os.getenv("CALENDAR_GLOBAL_QPS", "50")),
+    global_burst=float(os.getenv("CALENDAR_GLOBAL_BURST", "200")),
+    user_rate=float(os.getenv("CALENDAR_USER_QPS", "10")),
+    user_burst=float(os.getenv("CALENDAR_USER_BURST", "100")),
+    max_retries=int(os.getenv("CALENDAR_MAX_RETRIES", "5")),
+)
+
+
+def get_write_scheduler() -> CalendarWriteScheduler:
+    """Returns the process-wide Calendar write scheduler."""
+    return _scheduler
+
+
+def set_write_scheduler(scheduler: CalendarWriteScheduler):
+    """Replaces the process-wide Calendar write scheduler (e.g. other limits in benchmarks)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_calendar_quota_metrics() -> dict:
+    """Returns the process-wide scheduler's metrics."""
+    return _scheduler.get_metrics()
@@ -2,93 +2,472 @@
 
 from google.adk.tools import FunctionTool
 from datetime import datetime, timedelta
-import os.path
-import pickle
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from itertools import islice
+from zoneinfo import ZoneInfo
+import hashlib
+import json
+import os
+import re
+from sub_agents.calendar_batch import execute_batched, DEFAULT_BATCH_SIZE
+from sub_agents.calendar_client import get_cached_calendar_service
+from sub_agents.calendar_mirror import CALENDAR_MIRROR, event_timestamp, get_calendar_mirror
+from sub_agents.calendar_quota import BULK, INTERACTIVE
+from sub_agents.plan_registry import PlanEntry, get_plan_registry
+from sub_agents.slot_placement import PLACEMENT_WINDOW_HOURS, BusyIndex, place_occurrences
+from sub_agents.study_planner import DAY_NAMES, build_plan, iter_occurrences
 
-# If modifying these scopes, delete the file token.pickle.
-SCOPES = ['https://www.googleapis.com/auth/calendar']
+# How many event inserts go into one Calendar batch request (max 50)
+CALENDAR_BATCH_SIZE = int(os.getenv("CALENDAR_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
+REMINDER_OVERRIDES = [
+    {'method': 'popup', 'minutes': 0},
+    {'method': 'email', 'minutes': 0},
+]
+STUDY_OVERRIDES = [
+    {'method': 'popup', 'minutes': 15},
+]
+# Reminders are notifications, not blocked time: they don't show as busy
+REMINDER_TRANSPARENCY = 'transparent'
+
+# Longest range asked in one freebusy call; longer plans send several in one batch
+FREEBUSY_MAX_DAYS = int(os.getenv("CALENDAR_FREEBUSY_MAX_DAYS", "90"))
 
 def get_calendar_service():
     """
-    Authenticates and returns Google Calendar service.
-    This will open a browser window for OAuth the first time.
+    Returns the authenticated Google Calendar service.
+
+    The service is built once per process and cached (see calendar_client);
+    the first call may open a browser window for OAuth.
+    """
+    return get_cached_calendar_service()
+
+
+def _event_body(summary: str, description: str, start, end, timezone: str,
+                overrides: list, color_id: str, **extra) -> dict:
+    """Builds a Calendar event resource."""
+    body = {
+        'summary': summary,
+        'description': description,
+        'start': {
+            'dateTime': start.isoformat(),
+            'timeZone': timezone,
+        },
+        'end': {
+            'dateTime': end.isoformat(),
+            'timeZone': timezone,
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': overrides,
+        },
+        'colorId': color_id,
+    }
+    body.update(extra)
+    return body
+
+
+def _study_times(slot, occurrence, moved: bool) -> tuple:
+    """(start, end) labels of a session: the slot's, or the occurrence's own if placement moved it."""
+    if moved:
+        return occurrence.study_start.strftime("%I:%M %p"), occurrence.study_end.strftime("%I:%M %p")
+    return slot.start_time, slot.study_end_label
+
+
+def session_event_pair(plan, occurrence, moved: bool = False) -> tuple:
+    """Builds the (reminder, study session) event pair for one occurrence."""
+    slot = plan.slots[occurrence.slot]
+    course_name = plan.course_name
+    week = occurrence.week
+    study_start, study_end = _study_times(slot, occurrence, moved)
+    # The slot's day, unless the session was shifted to another one
+    study_day = DAY_NAMES[occurrence.study_start.weekday()]
+
+    reminder_event = _event_body(
+        f'📚 Reminder: Study {course_name} Tomorrow!',
+        f'Hey! Tomorrow is {study_day} - time for your Week {week} study session!\n\n📅 Study Time: {study_start} - {study_end}\n⏱️ Duration: {slot.duration_hours} hours\n\n🚀 Get ready to learn!',
+        occurrence.reminder_start, occurrence.reminder_end, plan.timezone,
+        REMINDER_OVERRIDES, '9', transparency=REMINDER_TRANSPARENCY
+    )
+    study_event = _event_body(
+        f'📖 Study: {course_name} - Week {week}',
+        f'Week {week} study session for {course_name}\n\n⏱️ {slot.duration_hours} hours\n\n🎯 Focus and learn! You\'ve got this! 💪',
+        occurrence.study_start, occurrence.study_end, plan.timezone,
+        STUDY_OVERRIDES, '10'
+    )
+    return (
+        _tag_event(reminder_event, plan, 'reminder', week, slot.day),
+        _tag_event(study_event, plan, 'study', week, slot.day),
+    )
+
+
+def recurring_event_pair(plan, slot, weeks: int = None, first_week: int = 1) -> tuple:
     """
-    creds = None
-    
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Go up one level to the project root
-    project_root = os.path.dirname(script_dir)
-    
-    token_path = os.path.join(project_root, 'token.pickle')
-    credentials_path = os.path.join(project_root, 'credentials.json')
-    
-    # The file token.pickle stores the user's access and refresh tokens
-    if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            creds = pickle.load(token)
-    
-    # If there are no (valid) credentials available, let the user log in
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(credentials_path):
-                raise FileNotFoundError(
-                    f"credentials.json not found at {credentials_path}. Please download OAuth credentials from Google Cloud Console."
-                )
-            flow = InstalledAppFlow.from_client_secrets_file(
-                credentials_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save the credentials for the next run
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
-    
-    return build('calendar', 'v3', credentials=creds)
-
-def parse_time(time_str: str) -> tuple:
+    Builds the (reminder, study session) recurring event pair for one study day.
+
+    The week number of an occurrence is not part of its title; it is the
+    number of weeks since `planStart` in the event's extended properties.
+    `weeks` cuts the series short (default: plan.total_weeks). A series that
+    takes over from plan week `first_week` (see calendar_plans) starts at
+    plan.start, counts weeks from `firstWeek` and gets its own eventKey.
     """
-    Parse time string like "9:00 AM", "11 AM", "19:30" to (hour, minute)
-    
-    Args:
-        time_str: Time string in various formats
-    
+    course_name = plan.course_name
+    weeks = weeks or plan.total_weeks
+    recurrence = [f"RRULE:FREQ=WEEKLY;COUNT={weeks}"]
+    study_start = plan.start + slot.study_offset
+    if first_week == 1:
+        weeks_text = f"Weeks 1-{weeks} (Week 1 starts {plan.start.strftime('%B %d, %Y')})"
+    else:
+        weeks_text = f"Weeks {first_week}-{first_week + weeks - 1} (from {study_start.strftime('%B %d, %Y')})"
+    plan_properties = {
+        'courseName': course_name,
+        'planStart': plan.start.date().isoformat(),
+        'totalWeeks': str(plan.total_weeks),
+    }
+    if first_week != 1:
+        plan_properties['firstWeek'] = str(first_week)
+
+    reminder_event = _event_body(
+        f'📚 Reminder: Study {course_name} Tomorrow!',
+        f'Hey! Tomorrow is {slot.day} - time for your weekly study session!\n\n📅 Study Time: {slot.start_time} - {slot.study_end_label}\n⏱️ Duration: {slot.duration_hours} hours\n🗓️ {weeks_text}\n\n🚀 Get ready to learn!',
+        plan.start + slot.reminder_offset, plan.start + slot.reminder_end_offset, plan.timezone,
+        REMINDER_OVERRIDES, '9', transparency=REMINDER_TRANSPARENCY,
+        recurrence=recurrence, extendedProperties={'private': dict(plan_properties)}
+    )
+    study_event = _event_body(
+        f'📖 Study: {course_name}',
+        f'Weekly {slot.day} study session for {course_name}\n\n🗓️ {weeks_text}\n⏱️ {slot.duration_hours} hours\n\n🎯 Focus and learn! You\'ve got this! 💪',
+        study_start, study_start + slot.study_duration, plan.timezone,
+        STUDY_OVERRIDES, '10',
+        recurrence=recurrence, extendedProperties={'private': dict(plan_properties)}
+    )
+    series_key = 'weekly' if first_week == 1 else f"weekly-{first_week}"
+    return (
+        _tag_event(reminder_event, plan, 'reminder', series_key, slot.day),
+        _tag_event(study_event, plan, 'study', series_key, slot.day),
+    )
+
+
+def _tag_event(body: dict, plan, kind: str, week, slot_day: str) -> dict:
+    """
+    Tags an event with private extended properties identifying it within its plan.
+
+    `planHash` fingerprints the event content, so sync can spot unchanged
+    events without comparing fields Calendar normalizes (e.g. dateTime offsets).
+    """
+    private = body.setdefault('extendedProperties', {}).setdefault('private', {})
+    private.update({
+        'planId': plan.plan_id,
+        'eventKey': f"{kind}:{week}:{slot_day}",
+        'kind': kind,
+        'week': str(week),
+        'slot': slot_day,
+    })
+    private['planHash'] = hashlib.sha1(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return body
+
+
+def _synced_mirror(service):
+    """Brings the current user's calendar mirror up to date. Returns it, or None if it's off or the sync failed."""
+    if not CALENDAR_MIRROR:
+        return None
+    mirror = get_calendar_mirror()
+    try:
+        mirror.sync(service)
+    except Exception as e:
+        print(f"⚠️ Calendar mirror sync failed, reading from the API: {e}")
+        return None
+    return mirror
+
+
+def list_plan_events(service, plan_id: str) -> list:
+    """
+    Lists every calendar event tagged with plan_id.
+
+    Served from the local calendar mirror after an incremental sync (usually
+    one small round trip). Without the mirror: one query, paged only past
+    2500 events.
+    """
+    mirror = _synced_mirror(service)
+    if mirror is not None:
+        return mirror.plan_events(plan_id)
+
+    events_resource = service.events()
+    events = []
+    page_token = None
+    while True:
+        response = events_resource.list(
+            calendarId='primary',
+            privateExtendedProperty=f"planId={plan_id}",
+            maxResults=2500,
+            pageToken=page_token
+        ).execute(num_retries=3)
+        events.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return events
+
+
+def list_events_between(service, time_min: datetime, time_max: datetime) -> list:
+    """
+    Lists the events overlapping [time_min, time_max), ordered by start.
+
+    Times are aware datetimes. A recurring event is returned once, as its
+    series, if any of its instances falls in the range. Served from the
+    calendar mirror like list_plan_events.
+    """
+    mirror = _synced_mirror(service)
+    if mirror is not None:
+        return mirror.events_between(time_min, time_max)
+
+    events_resource = service.events()
+    events = []
+    page_token = None
+    while True:
+        response = events_resource.list(
+            calendarId='primary',
+            timeMin=time_min.isoformat(),
+            timeMax=time_max.isoformat(),
+            maxResults=2500,
+            pageToken=page_token
+        ).execute(num_retries=3)
+        events.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return sorted(events, key=lambda event: event_timestamp(event['start']))
+
+
+def _wall_clock(value: str, zone: ZoneInfo) -> datetime:
+    """Parses an RFC 3339 dateTime to a naive wall-clock time in `zone` (how plans keep times)."""
+    parsed = datetime.fromisoformat(value)
+    return parsed.astimezone(zone).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def query_busy_intervals(service, plan, time_min: datetime, time_max: datetime) -> list:
+    """
+    Returns the user's busy (start, end) intervals between time_min and time_max.
+
+    One freebusy query per FREEBUSY_MAX_DAYS, all sent in a single batch
+    request. Times are naive wall-clock times in the plan's timezone.
+
+    Raises:
+        RuntimeError: If Calendar couldn't answer for some part of the range
+    """
+    zone = ZoneInfo(plan.timezone)
+    freebusy = service.freebusy()
+    requests = []
+    window_start = time_min
+    while window_start < time_max:
+        window_end = min(window_start + timedelta(days=FREEBUSY_MAX_DAYS), time_max)
+        requests.append(freebusy.query(body={
+            'timeMin': window_start.replace(tzinfo=zone).isoformat(),
+            'timeMax': window_end.replace(tzinfo=zone).isoformat(),
+            'timeZone': plan.timezone,
+            'items': [{'id': 'primary'}],
+        }))
+        window_start = window_end
+
+    busy = []
+    for result in execute_batched(service, requests, batch_size=CALENDAR_BATCH_SIZE):
+        calendar = (result["response"] or {}).get('calendars', {}).get('primary', {})
+        if result["error"] or calendar.get('errors'):
+            raise RuntimeError(f"Couldn't read free/busy times: {result['error'] or calendar['errors']}")
+        busy.extend((_wall_clock(b['start'], zone), _wall_clock(b['end'], zone)) for b in calendar.get('busy', []))
+    return busy
+
+
+def _plan_event_intervals(plan, events: list) -> list:
+    """(start, end) of every occurrence of the plan's own study events, recurring ones expanded."""
+    zone = ZoneInfo(plan.timezone)
+    intervals = []
+    for event in events:
+        if event.get('extendedProperties', {}).get('private', {}).get('kind') != 'study':
+            continue
+        start = _wall_clock(event['start']['dateTime'], zone)
+        end = _wall_clock(event['end']['dateTime'], zone)
+        count = re.search(r"COUNT=(\d+)", " ".join(event.get('recurrence', [])))
+        for week in range(int(count.group(1)) if count else 1):
+            intervals.append((start + timedelta(weeks=week), end + timedelta(weeks=week)))
+    return intervals
+
+
+def _place_sessions(service, plan, plan_events: list = None):
+    """
+    Places the plan's sessions around the user's busy time (see slot_placement).
+
+    The plan's own events (on a re-sync) count as free time, so they don't
+    push themselves away.
+
     Returns:
-        tuple: (hour, minute) in 24-hour format
+        Placement, or None if free/busy couldn't be read (sessions keep their times)
     """
+    occurrences = list(iter_occurrences(plan))
+    if not occurrences:
+        return None
+    window = timedelta(hours=PLACEMENT_WINDOW_HOURS)
     try:
-        time_clean = time_str.upper().replace(" ", "")
-        
-        if "AM" in time_clean or "PM" in time_clean:
-            # 12-hour format
-            time_part = time_clean.replace("AM", "").replace("PM", "")
-            if ":" in time_part:
-                hour, minute = map(int, time_part.split(":"))
+        busy = query_busy_intervals(service, plan, occurrences[0].study_start - window,
+                                    max(o.study_end for o in occurrences) + window)
+    except Exception as e:
+        print(f"⚠️ Conflict check skipped: {e}")
+        return None
+    placement = place_occurrences(occurrences, BusyIndex(busy, exclude=_plan_event_intervals(plan, plan_events or [])))
+    print(f"🔀 Placement: {len(placement.moved_from)} sessions moved, {len(placement.unresolved)} unresolved "
+          f"({placement.busy_intervals} busy intervals)")
+    return placement
+
+
+def _placement_summary(placement) -> dict:
+    return {
+        "busy_intervals": placement.busy_intervals,
+        "moved_sessions": len(placement.moved_from),
+        "unresolved_conflicts": len(placement.unresolved),
+        "unresolved_dates": [placement.occurrences[idx].study_start.date().isoformat() for idx in placement.unresolved],
+        "window_hours": PLACEMENT_WINDOW_HOURS,
+    }
+
+
+def _placement_message(placement) -> str:
+    message = ""
+    if placement.moved_from:
+        message += f" 🔀 Moved {len(placement.moved_from)} sessions to avoid your existing events."
+    if placement.unresolved:
+        message += (f" ⚠️ {len(placement.unresolved)} sessions still overlap existing events "
+                    f"(no free time within {PLACEMENT_WINDOW_HOURS:g} hours).")
+    return message
+
+
+def _record_event(entry: dict, kind: str, event: dict):
+    entry[f"{kind}_link"] = event.get('htmlLink')
+    entry[f"{kind}_event_id"] = event.get('id')
+
+
+def _write_event_pairs(service, plan, entries: list, event_pairs: list,
+                       failure_keys: tuple, sync: bool = False, plan_events: list = None) -> tuple:
+    """
+    Writes (reminder, study) event pairs in batches and records the results on `entries`.
+
+    Without sync every event is inserted. With sync, the plan's existing
+    events are listed in one query and diffed by eventKey: only new events
+    are inserted, changed ones patched and ones no longer in the plan deleted.
+    plan_events are the plan's events if the caller already listed them.
+    Resyncing a plan that's already on the calendar is a BULK write, so it
+    queues behind other users' interactive plan creation.
+
+    Returns:
+        tuple: (failed_events, stats) - failed writes with `failure_keys`
+            copied from their entry, and inserted/updated/deleted/unchanged counts
+    """
+    existing = {}
+    stale = []
+    if sync:
+        for event in plan_events if plan_events is not None else list_plan_events(service, plan.plan_id):
+            key = event.get('extendedProperties', {}).get('private', {}).get('eventKey')
+            if key in existing:
+                stale.append(event)  # duplicate of an event we already matched
             else:
-                hour = int(time_part)
-                minute = 0
-            
-            # Convert to 24-hour
-            if "PM" in time_clean and hour != 12:
-                hour += 12
-            elif "AM" in time_clean and hour == 12:
-                hour = 0
-        else:
-            # 24-hour format
-            if ":" in time_clean:
-                hour, minute = map(int, time_clean.split(":"))
+                existing[key] = event
+    # Events of the plan already on the calendar: this is a resync
+    priority = BULK if existing else INTERACTIVE
+
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    # service.events() rebuilds the whole resource every call, so build it once
+    events_resource = service.events()
+    requests = []
+    targets = []  # (entry index or None, kind) for each request
+
+    for idx, (entry, pair) in enumerate(zip(entries, event_pairs)):
+        for kind, body in zip(("reminder", "study"), pair):
+            private = body['extendedProperties']['private']
+            current = existing.pop(private['eventKey'], None)
+
+            if current is None:
+                requests.append(events_resource.insert(calendarId='primary', body=body))
+                stats["inserted"] += 1
+            elif current.get('extendedProperties', {}).get('private', {}).get('planHash') != private['planHash']:
+                requests.append(events_resource.patch(calendarId='primary', eventId=current['id'], body=body))
+                stats["updated"] += 1
             else:
-                hour = int(time_clean)
-                minute = 0
-        
-        return (hour, minute)
-    except:
-        # Default to 9 AM if parsing fails
-        return (9, 0)
+                _record_event(entry, kind, current)
+                stats["unchanged"] += 1
+                continue
+            targets.append((idx, kind))
+
+    # Whatever is left no longer belongs to the plan
+    for event in stale + list(existing.values()):
+        requests.append(events_resource.delete(calendarId='primary', eventId=event['id']))
+        targets.append((None, event['id']))
+        stats["deleted"] += 1
+
+    results = execute_batched(service, requests, batch_size=CALENDAR_BATCH_SIZE, priority=priority) if requests else []
+
+    failed_events = []
+    for (idx, kind), result in zip(targets, results):
+        if idx is None:
+            if result["error"]:
+                failed_events.append({"type": "delete", "event_id": kind, "error": result["error"]})
+            continue
+
+        entry = entries[idx]
+        _record_event(entry, kind, result["response"] or {})
+        if result["error"]:
+            failed = {key: entry[key] for key in failure_keys}
+            failed.update({"type": kind, "error": result["error"]})
+            failed_events.append(failed)
+
+    if failed_events:
+        print(f"⚠️ {len(failed_events)} calendar writes failed:")
+        for failed in failed_events:
+            print(f"   • {failed}")
+
+    return failed_events, stats
+
+
+def plan_entry(occurrence, slot_day: str, entry: dict, occurrences: int = 1) -> PlanEntry:
+    """The plan registry entry of a written session (or weekly series), with its event IDs from `entry`."""
+    return PlanEntry(
+        occurrence.week, slot_day, occurrences,
+        occurrence.study_start, occurrence.study_end, occurrence.reminder_start, occurrence.reminder_end,
+        entry.get("reminder_event_id"), entry.get("study_event_id"),
+    )
+
+
+def _current_plan_id(course_name: str):
+    """The course's plan ID in the plan registry (None for the default if the registry fails)."""
+    try:
+        return get_plan_registry().current_plan_id(course_name)
+    except Exception as e:
+        print(f"⚠️ Couldn't read the plan registry: {e}")
+        return None
+
+
+def _register_plan(plan, params: dict, entries: list):
+    """Records the plan and its event IDs in the plan registry (see calendar_plans); never fails the tool call."""
+    try:
+        get_plan_registry().save_plan(plan.plan_id, plan.course_name, params, entries)
+    except Exception as e:
+        print(f"⚠️ Couldn't save the plan to the plan registry: {e}")
+
+
+def occurrence_entry(plan, occurrence, moved_from: datetime = None) -> dict:
+    """Formats one occurrence the way create_study_reminders reports it."""
+    slot = plan.slots[occurrence.slot]
+    study_start, study_end = _study_times(slot, occurrence, moved_from is not None)
+    entry = {
+        "week": occurrence.week,
+        "study_day": slot.day,
+        "reminder_date": occurrence.reminder_start.date().isoformat(),
+        "reminder_day": slot.reminder_day,
+        "reminder_start_time": slot.reminder_start_label,
+        "reminder_end_time": slot.reminder_end_label,
+        "study_date": occurrence.study_start.date().isoformat(),
+        "study_start_time": study_start if moved_from is not None else slot.study_start_label,
+        "study_end_time": study_end,
+        "study_duration": f"{slot.duration_hours} hours",
+        "timezone": plan.timezone,
+    }
+    if moved_from is not None:
+        entry["moved_from"] = moved_from.strftime("%I:%M %p")
+    return entry
 
 
 def create_study_reminders(
@@ -97,13 +476,31 @@ def create_study_reminders(
     study_schedule: list,
     start_date: str,
     reminder_time: str = "20:00",
-    timezone: str = "America/Los_Angeles"
+    timezone: str = "America/Los_Angeles",
+    recurring: bool = False,
+    sync: bool = False,
+    avoid_conflicts: bool = False
 ) -> dict:
     """
     Creates Google Calendar reminders and study session events.
-    
+
     IMPORTANT: start_date should be the date of the FIRST study session.
-    
+
+    With recurring=True, each study day gets ONE repeating study event and
+    ONE repeating reminder (RRULE weekly, COUNT=total_weeks), so the number
+    of API calls stays the same no matter how many weeks the plan has.
+
+    Every event is tagged with the plan ID (derived from the course name),
+    its week and its study day. With sync=True, rerunning for the same course
+    updates the existing events in place: only new, changed or removed
+    sessions cost API calls, so nothing is ever created twice.
+
+    With avoid_conflicts=True, the user's calendar is checked once for the
+    whole plan, and every session that would overlap an existing event
+    moves to the nearest free time that day (at most
+    CALENDAR_PLACEMENT_WINDOW_HOURS earlier or later). If any session
+    moves, the plan is written as separate events even when recurring=True.
+
     Args:
         course_name: Name of the course
         total_weeks: How many weeks the course will take
@@ -116,11 +513,17 @@ def create_study_reminders(
         start_date: Date of the FIRST study session (YYYY-MM-DD format)
         reminder_time: When to send reminder (HH:MM format, default "20:00" = 8 PM)
         timezone: IANA timezone (default "America/Los_Angeles")
-    
+        recurring: Create repeating events per study day instead of one
+            event per session (default False)
+        sync: Update this course's existing calendar events instead of
+            adding a new set (default False)
+        avoid_conflicts: Move sessions that overlap the user's existing
+            events to nearby free time (default False)
+
     Returns:
         Dictionary with status and created calendar events
     """
-    
+
     # ═══════════════════════════════════════════════════════
     # 🔧 DEBUG: Print what the agent passed to this function
     # ═══════════════════════════════════════════════════════
@@ -133,185 +536,66 @@ def create_study_reminders(
     print(f"📍 start_date: {start_date}")
     print(f"⏰ reminder_time: {reminder_time}")
     print(f"🌍 timezone: {timezone}")
+    print(f"🔁 recurring: {recurring}")
+    print(f"🔄 sync: {sync}")
+    print(f"🔀 avoid_conflicts: {avoid_conflicts}")
     print("="*70 + "\n")
-    
+
     try:
+        # All date math happens here, once, without any I/O
+        plan = build_plan(course_name, total_weeks, study_schedule, start_date, reminder_time, timezone,
+                          plan_id=_current_plan_id(course_name))
+        print(f"✅ Start date: {plan.start.strftime('%A, %B %d, %Y')}")
+        print(f"✅ Study days: {[slot.day for slot in plan.slots]}\n")
+
         # Get authenticated Calendar service
         service = get_calendar_service()
-        
-        # Parse start date
-        start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-        print(f"✅ Start date: {start_datetime.strftime('%A, %B %d, %Y')}")
-        
-        # Parse reminder time (HH:MM format)
-        try:
-            reminder_hour, reminder_minute = map(int, reminder_time.split(":"))
-            if not (0 <= reminder_hour <= 23 and 0 <= reminder_minute <= 59):
-                raise ValueError("Invalid time")
-        except:
-            # Default to 8 PM if invalid format
-            reminder_hour, reminder_minute = 20, 0
-        
-        print(f"✅ Reminder time: {reminder_hour}:{reminder_minute:02d}\n")
-        
-        # Day name to number mapping (Monday=0, Sunday=6)
-        day_map = {
-            "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3,
-            "Friday": 4, "Saturday": 5, "Sunday": 6
+
+        plan_events = None
+        placement = None
+        if avoid_conflicts:
+            # Listed once here, for the placement and for the sync
+            plan_events = list_plan_events(service, plan.plan_id) if sync else []
+            placement = _place_sessions(service, plan, plan_events)
+            if placement is not None and placement.moved_from and recurring:
+                # A repeating event can't move single sessions
+                print(f"🔀 {len(placement.moved_from)} sessions moved: creating separate events")
+                recurring = False
+
+        params = {
+            "total_weeks": total_weeks,
+            "study_schedule": study_schedule,
+            "start_date": start_date,
+            "reminder_time": reminder_time,
+            "timezone": timezone,
+            "recurring": recurring,
         }
-        
-        # Get the day of week for the start date
-        start_day_of_week = start_datetime.weekday()
-        start_day_name = list(day_map.keys())[start_day_of_week]
-        
-        print(f"📌 Start date is a {start_day_name}")
-        print(f"📌 Study schedule has: {[s['day'] for s in study_schedule]}\n")
-        
-        # Find which session in the schedule matches the start date
-        matching_session_idx = None
-        for idx, session in enumerate(study_schedule):
-            if session['day'] == start_day_name:
-                matching_session_idx = idx
-                break
-        
-        if matching_session_idx is None:
-            raise ValueError(
-                f"Start date is {start_day_name}, but schedule doesn't include {start_day_name}. "
-                f"Schedule has: {[s['day'] for s in study_schedule]}"
-            )
-        
-        print(f"✅ Matched with session #{matching_session_idx + 1}: {start_day_name}\n")
-        
+
+        if recurring:
+            result = _create_recurring_reminders(service, plan, sync, plan_events if sync else None, placement)
+            if result["status"] != "error":
+                first_week = islice(iter_occurrences(plan), len(plan.slots))
+                _register_plan(plan, params, [
+                    plan_entry(occurrence, slot.day, event, plan.total_weeks)
+                    for occurrence, slot, event in zip(first_week, plan.slots, result["events"])
+                ])
+            return result
+
+        occurrences = placement.occurrences if placement is not None else list(iter_occurrences(plan))
+        moved_from = placement.moved_from if placement is not None else {}
+
         events_created = []
-        current_date = start_datetime
-        
-        # For each week
-        for week_num in range(total_weeks):
-            print(f"\n📆 Week {week_num + 1}:")
-            
-            # Process sessions starting from matching one, then continuing in order
-            for i in range(len(study_schedule)):
-                # Calculate which session to process
-                session_idx = (matching_session_idx + i) % len(study_schedule)
-                session = study_schedule[session_idx]
-                
-                study_day = session["day"]
-                study_time_str = session["start_time"]
-                duration_hours = session["duration_hours"]
-                
-                # For the very first session, use start_datetime
-                if week_num == 0 and i == 0:
-                    study_date = start_datetime
-                else:
-                    # Calculate next occurrence of this day
-                    target_day_num = day_map[study_day]
-                    current_day_num = current_date.weekday()
-                    
-                    # Days until next occurrence
-                    days_ahead = (target_day_num - current_day_num) % 7
-                    if days_ahead == 0:
-                        days_ahead = 7  # Next week, same day
-                    
-                    study_date = current_date + timedelta(days=days_ahead)
-                
-                # Update current_date for next iteration
-                current_date = study_date
-                
-                print(f"  📖 {study_day} study session:")
-                print(f"     Study date: {study_date.strftime('%Y-%m-%d (%A)')}")
-                print(f"     Study time: {study_time_str}")
-                print(f"     Duration: {duration_hours} hours")
-                
-                # Parse study time
-                study_hour, study_minute = parse_time(study_time_str)
-                
-                # CREATE REMINDER EVENT
-                reminder_datetime = study_date - timedelta(days=1)
-                reminder_datetime = reminder_datetime.replace(
-                    hour=reminder_hour,
-                    minute=reminder_minute,
-                    second=0
-                )
-                
-                study_datetime = study_date.replace(
-                    hour=study_hour,
-                    minute=study_minute,
-                    second=0
-                )
-                reminder_end = study_datetime - timedelta(hours=1)
-                
-                print(f"     Reminder: {reminder_datetime.strftime('%A, %b %d at %I:%M %p')} → {reminder_end.strftime('%I:%M %p')}")
-                
-                reminder_day_name = list(day_map.keys())[reminder_datetime.weekday()]
-                study_end = study_datetime + timedelta(hours=duration_hours)
-                
-                reminder_event = {
-                    'summary': f'📚 Reminder: Study {course_name} Tomorrow!',
-                    'description': f'Hey! Tomorrow is {study_day} - time for your Week {week_num + 1} study session!\n\n📅 Study Time: {study_time_str} - {study_end.strftime("%I:%M %p")}\n⏱️ Duration: {duration_hours} hours\n\n🚀 Get ready to learn!',
-                    'start': {
-                        'dateTime': reminder_datetime.isoformat(),
-                        'timeZone': timezone,
-                    },
-                    'end': {
-                        'dateTime': reminder_end.isoformat(),
-                        'timeZone': timezone,
-                    },
-                    'reminders': {
-                        'useDefault': False,
-                        'overrides': [
-                            {'method': 'popup', 'minutes': 0},
-                            {'method': 'email', 'minutes': 0},
-                        ],
-                    },
-                    'colorId': '9',
-                }
-                
-                created_reminder = service.events().insert(calendarId='primary', body=reminder_event).execute()
-                print(f"     ✅ Reminder created")
-                
-                # CREATE STUDY SESSION EVENT
-                study_event = {
-                    'summary': f'📖 Study: {course_name} - Week {week_num + 1}',
-                    'description': f'Week {week_num + 1} study session for {course_name}\n\n⏱️ {duration_hours} hours\n\n🎯 Focus and learn! You\'ve got this! 💪',
-                    'start': {
-                        'dateTime': study_datetime.isoformat(),
-                        'timeZone': timezone,
-                    },
-                    'end': {
-                        'dateTime': study_end.isoformat(),
-                        'timeZone': timezone,
-                    },
-                    'reminders': {
-                        'useDefault': False,
-                        'overrides': [
-                            {'method': 'popup', 'minutes': 15},
-                        ],
-                    },
-                    'colorId': '10',
-                }
-                
-                created_study = service.events().insert(calendarId='primary', body=study_event).execute()
-                print(f"     ✅ Study session created\n")
-                
-                # Store both events
-                events_created.append({
-                    "week": week_num + 1,
-                    "study_day": study_day,
-                    "reminder_date": reminder_datetime.strftime("%Y-%m-%d"),
-                    "reminder_day": reminder_day_name,
-                    "reminder_start_time": reminder_datetime.strftime("%I:%M %p"),
-                    "reminder_end_time": reminder_end.strftime("%I:%M %p"),
-                    "study_date": study_date.strftime("%Y-%m-%d"),
-                    "study_start_time": study_datetime.strftime("%I:%M %p"),
-                    "study_end_time": study_end.strftime("%I:%M %p"),
-                    "study_duration": f"{duration_hours} hours",
-                    "timezone": timezone,
-                    "reminder_link": created_reminder.get('htmlLink'),
-                    "study_link": created_study.get('htmlLink'),
-                    "reminder_event_id": created_reminder.get('id'),
-                    "study_event_id": created_study.get('id')
-                })
-        
+        event_pairs = []
+        for idx, occurrence in enumerate(occurrences):
+            events_created.append(occurrence_entry(plan, occurrence, moved_from.get(idx)))
+            event_pairs.append(session_event_pair(plan, occurrence, idx in moved_from))
+
+        # Write all events in batches (2 per session) instead of one request each
+        failed_events, sync_stats = _write_event_pairs(
+            service, plan, events_created, event_pairs, ("week", "study_date"), sync,
+            plan_events if sync else None
+        )
+
         # Format output
         schedule_by_week = {}
         for event in events_created:
@@ -323,36 +607,65 @@ def create_study_reminders(
                 f"    • Reminder: {event['reminder_day']} {event['reminder_start_time']} - {event['reminder_end_time']}\n"
                 f"    • Study: {event['study_start_time']} - {event['study_end_time']} ({event['study_duration']})"
             )
-        
+
         schedule_preview = "\n".join([
             f"Week {week}:\n" + "\n".join(details)
             for week, details in schedule_by_week.items()
         ])
-        
-        total_events = len(events_created) * 2
-        
+
+        total_reminders = sum(1 for event in events_created if event["reminder_event_id"])
+        total_study_sessions = sum(1 for event in events_created if event["study_event_id"])
+        total_events = total_reminders + total_study_sessions
+
+        if events_created and total_events == 0:
+            return {
+                "status": "error",
+                "message": f"Failed to create calendar events: {failed_events[0]['error']}",
+                "failed_events": failed_events
+            }
+        _register_plan(plan, params, [
+            plan_entry(occurrence, plan.slots[occurrence.slot].day, entry)
+            for occurrence, entry in zip(occurrences, events_created)
+        ])
+
         print("\n" + "="*70)
         print(f"✅ SUCCESS: Created {total_events} calendar events!")
         print("="*70 + "\n")
-        
+
+        message = f"✅ Created {total_events} calendar events ({total_reminders} reminders + {total_study_sessions} study sessions)!"
+        if sync:
+            message = _sync_message(sync_stats, total_events)
+        if placement is not None:
+            message += _placement_message(placement)
+        if failed_events:
+            message += f" ⚠️ {len(failed_events)} events could not be created."
+
+        summary = {
+            "total_weeks": total_weeks,
+            "sessions_per_week": len(study_schedule),
+            "total_reminders": total_reminders,
+            "total_study_sessions": total_study_sessions,
+            "total_events": total_events,
+            "failed_events": len(failed_events),
+            "first_reminder": events_created[0]["reminder_date"] if events_created else None,
+            "last_study_session": events_created[-1]["study_date"] if events_created else None,
+            "timezone": timezone,
+            "plan_id": plan.plan_id,
+            "changes": sync_stats,
+            "calendar_link": "https://calendar.google.com"
+        }
+        if placement is not None:
+            summary["placement"] = _placement_summary(placement)
+
         return {
-            "status": "success",
-            "message": f"✅ Created {total_events} calendar events ({len(events_created)} reminders + {len(events_created)} study sessions)!",
+            "status": "partial" if failed_events else "success",
+            "message": message,
             "events": events_created,
+            "failed_events": failed_events,
             "schedule_preview": schedule_preview,
-            "summary": {
-                "total_weeks": total_weeks,
-                "sessions_per_week": len(study_schedule),
-                "total_reminders": len(events_created),
-                "total_study_sessions": len(events_created),
-                "total_events": total_events,
-                "first_reminder": events_created[0]["reminder_date"] if events_created else None,
-                "last_study_session": events_created[-1]["study_date"] if events_created else None,
-                "timezone": timezone,
-                "calendar_link": "https://calendar.google.com"
-            }
+            "summary": summary
         }
-        
+
     except FileNotFoundError as e:
         print(f"\n❌ ERROR: {str(e)}\n")
         return {"status": "error", "message": str(e)}
@@ -363,5 +676,127 @@ def create_study_reminders(
         return {"status": "error", "message": f"Failed to create calendar events: {str(e)}"}
 
 
+def _sync_message(stats: dict, total_events: int) -> str:
+    """Summarizes what a sync changed."""
+    return (
+        f"✅ Calendar updated: {stats['inserted']} added, {stats['updated']} changed, "
+        f"{stats['deleted']} removed, {stats['unchanged']} already up to date "
+        f"({total_events} events in the plan)!"
+    )
+
+
+def _create_recurring_reminders(service, plan, sync: bool = False, plan_events: list = None,
+                                placement=None) -> dict:
+    """
+    Creates one recurring study event and one recurring reminder per study day.
+
+    Each study day repeats weekly for plan.total_weeks occurrences (RRULE COUNT).
+    placement is the conflict check's result, if one ran (nothing moved).
+
+    Returns:
+        Same structure as create_study_reminders, with one entry per study day
+        in "events" and the expanded occurrence counts in "summary"
+    """
+    total_weeks = plan.total_weeks
+    last_week_start = plan.start + timedelta(weeks=total_weeks - 1)
+
+    events_created = []
+    event_pairs = []
+
+    for slot in plan.slots:
+        first_study = plan.start + slot.study_offset
+        last_study = last_week_start + slot.study_offset
+
+        print(f"  🔁 {slot.day}: {total_weeks} weekly sessions, "
+              f"{first_study.date().isoformat()} → {last_study.date().isoformat()}")
+
+        event_pairs.append(recurring_event_pair(plan, slot))
+        events_created.append({
+            "study_day": slot.day,
+            "recurrence": f"Weekly on {slot.day}, {total_weeks} times",
+            "occurrences": total_weeks,
+            "first_reminder_date": (plan.start + slot.reminder_offset).date().isoformat(),
+            "reminder_day": slot.reminder_day,
+            "reminder_start_time": slot.reminder_start_label,
+            "reminder_end_time": slot.reminder_end_label,
+            "first_study_date": first_study.date().isoformat(),
+            "last_study_date": last_study.date().isoformat(),
+            "study_start_time": slot.study_start_label,
+            "study_end_time": slot.study_end_label,
+            "study_duration": f"{slot.duration_hours} hours",
+            "timezone": plan.timezone,
+        })
+
+    failed_events, sync_stats = _write_event_pairs(
+        service, plan, events_created, event_pairs, ("study_day",), sync, plan_events
+    )
+
+    created = [event for event in events_created if event["reminder_event_id"] or event["study_event_id"]]
+    if not created:
+        return {
+            "status": "error",
+            "message": f"Failed to create calendar events: {failed_events[0]['error']}",
+            "failed_events": failed_events
+        }
+
+    # Occurrences the recurring events expand to
+    total_reminders = sum(event["occurrences"] for event in events_created if event["reminder_event_id"])
+    total_study_sessions = sum(event["occurrences"] for event in events_created if event["study_event_id"])
+    total_events = total_reminders + total_study_sessions
+    recurring_events = sum(
+        bool(event["reminder_event_id"]) + bool(event["study_event_id"]) for event in events_created
+    )
+
+    schedule_preview = "\n".join(
+        f"  🔁 Every {event['study_day']} ({event['first_study_date']} → {event['last_study_date']}):\n"
+        f"    • Reminder: {event['reminder_day']} {event['reminder_start_time']} - {event['reminder_end_time']}\n"
+        f"    • Study: {event['study_start_time']} - {event['study_end_time']} ({event['study_duration']})"
+        for event in events_created
+    )
+
+    print("\n" + "="*70)
+    print(f"✅ SUCCESS: Created {recurring_events} recurring events ({total_events} occurrences)!")
+    print("="*70 + "\n")
+
+    message = (
+        f"✅ Created {recurring_events} recurring calendar events covering {total_events} "
+        f"occurrences ({total_reminders} reminders + {total_study_sessions} study sessions)!"
+    )
+    if sync:
+        message = _sync_message(sync_stats, total_events)
+    if placement is not None:
+        message += _placement_message(placement)
+    if failed_events:
+        message += f" ⚠️ {len(failed_events)} events could not be created."
+
+    summary = {
+        "total_weeks": total_weeks,
+        "sessions_per_week": len(plan.slots),
+        "recurring": True,
+        "recurring_events": recurring_events,
+        "total_reminders": total_reminders,
+        "total_study_sessions": total_study_sessions,
+        "total_events": total_events,
+        "failed_events": len(failed_events),
+        "first_reminder": min(event["first_reminder_date"] for event in created),
+        "last_study_session": max(event["last_study_date"] for event in created),
+        "timezone": plan.timezone,
+        "plan_id": plan.plan_id,
+        "changes": sync_stats,
+        "calendar_link": "https://calendar.google.com"
+    }
+    if placement is not None:
+        summary["placement"] = _placement_summary(placement)
+
+    return {
+        "status": "partial" if failed_events else "success",
+        "message": message,
+        "events": events_created,
+        "failed_events": failed_events,
+        "schedule_preview": schedule_preview,
+        "summary": summary
+    }
+
+
 # Create the ADK FunctionTool
 calendar_tool = FunctionTool(create_study_reminders)
@@ -0,0 +1,525 @@
+# sub_agents/course_catalog.py
+
+"""
+Local course catalog: the first-tier search backend in front of web search.
+
+Course records from a JSONL snapshot are compiled once into an index
+directory of flat files that are memory-mapped at load time:
+
+- records.bin + record_offsets.npy: the normalized course records
+- postings_*.npy: an inverted index (CSR layout) over title, description
+  and topic tags, with the BM25 contribution of every posting precomputed
+  (title and tags count more than the description)
+- *_bits.npy: packed bitsets for the level, price and platform filters
+
+A query sums the precomputed BM25 impacts of its posting lists into one
+dense score array, masks the candidates with the filter bitsets and takes
+the top-k: milliseconds, even on a catalog of a million courses.
+
+search_agent tries the catalog first and only searches the web when too
+few local courses match; the ones that do match are merged with the web
+results. The index is loaded on a background thread at startup (or built
+offline with `python -m sub_agents.course_catalog`); until it is ready,
+searches count as catalog misses and go to the web.
+"""
+
+import asyncio
+import functools
+import json
+import mmap
+import os
+import re
+import threading
+import time
+from array import array
+
+import numpy as np
+from google.genai import types
+from sub_agents.course_records import FOUND_COURSES_KEY, validate_course_records
+from sub_agents.search_cache import PREFERENCES_KEY, REVALIDATE_KEY, normalize_preferences
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", os.path.join(_PROJECT_ROOT, "catalog", "courses.jsonl"))
+CATALOG_INDEX_DIR = os.getenv("CATALOG_INDEX_DIR", os.path.join(_PROJECT_ROOT, "catalog", "index"))
+
+# Fewer local courses matching every query term than this -> search the web
+CATALOG_MIN_RESULTS = int(os.getenv("CATALOG_MIN_RESULTS", "5"))
+
+# Where serve_catalog_search leaves its matches for CourseMerger when it
+# falls back to web search
+CATALOG_COURSES_KEY = f"{FOUND_COURSES_KEY}_catalog"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "description": 1.0}
+
+LEVEL_FILTERS = ("beginner", "intermediate", "advanced", "all levels", "unknown")
+# Price bitsets: courses priced at or below each threshold (in cents), free
+# included, plus a last row for courses with an unknown price
+PRICE_THRESHOLDS = (0, 2000, 5000, 10000, 30000)
+
+STOPWORDS = {
+    "a", "an", "and", "the", "for", "of", "to", "in", "on", "with", "by", "from", "your", "you",
+    "course", "online", "class", "tutorial", "learn", "learning", "complete", "guide", "introduction", "intro",
+}
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+
+@functools.lru_cache(maxsize=200000)
+def _fold(token: str) -> str:
+    """Folds simple plurals; "" for stopwords and one-letter tokens (except C and R)."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "is", "us")):
+        token = token[:-1]
+    if token in STOPWORDS or (len(token) == 1 and token not in ("c", "r")):
+        return ""
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Lowercases, splits on non-word characters, drops stopwords and folds simple plurals."""
+    return [token for token in map(_fold, _TOKEN_PATTERN.findall((text or "").lower())) if token]
+
+
+def build_catalog_index(snapshot_path: str = CATALOG_SNAPSHOT, index_dir: str = CATALOG_INDEX_DIR) -> dict:
+    """
+    Compiles a JSONL snapshot of course records into a catalog index directory.
+
+    Every line is validated like search results (see course_records); an
+    optional "tags" list is indexed as topic tags. Invalid lines are skipped.
+
+    Returns:
+        dict: Index metadata (courses, terms, postings, build_seconds, ...)
+    """
+    started = time.perf_counter()
+    os.makedirs(index_dir, exist_ok=True)
+    if os.path.exists(os.path.join(index_dir, "meta.json")):
+        os.remove(os.path.join(index_dir, "meta.json"))
+
+    vocabulary = {}
+    post_terms, post_docs, post_tf = array("I"), array("I"), array("f")
+    doc_lengths = array("f")
+    levels, prices, platform_ids = array("B"), array("i"), array("H")
+    platforms = {}
+    record_offsets = array("q", [0])
+
+    with open(snapshot_path, "r", encoding="utf-8") as snapshot, \
+            open(os.path.join(index_dir, "records.bin.tmp"), "wb") as store:
+        for line in snapshot:
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                continue
+            records = validate_course_records([raw])
+            if not records:
+                continue
+            record = records[0]
+            doc = len(doc_lengths)
+
+            tags = raw.get("tags") or []
+            fields = {"name": record["name"], "description": record["description"],
+                      "tags": " ".join(tags) if isinstance(tags, list) else str(tags)}
+            weighted_tf = {}
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(fields[field]):
+                    weighted_tf[token] = weighted_tf.get(token, 0.0) + weight
+                    length += weight
+            for token, tf in weighted_tf.items():
+                term = vocabulary.setdefault(token, len(vocabulary))
+                post_terms.append(term)
+                post_docs.append(doc)
+                post_tf.append(tf)
+            doc_lengths.append(length)
+
+            levels.append(LEVEL_FILTERS.index(record["level"] or "unknown"))
+            prices.append(0 if record["is_free"] else
+                          record["price_cents"] if record["price_cents"] is not None else -1)
+            platform = record["platform"].lower()
+            platform_ids.append(platforms.setdefault(platform, len(platforms)))
+
+            encoded = json.dumps(record, separators=(",", ":")).encode("utf-8")
+            store.write(encoded)
+            record_offsets.append(record_offsets[-1] + len(encoded))
+
+    count = len(doc_lengths)
+    terms = np.frombuffer(post_terms, dtype=np.uint32)
+    docs = np.frombuffer(post_docs, dtype=np.uint32)
+    tf = np.frombuffer(post_tf, dtype=np.float32)
+    lengths = np.frombuffer(doc_lengths, dtype=np.float32)
+
+    # CSR layout: postings grouped by term, doc ids ascending within a term
+    order = np.argsort(terms, kind="stable")
+    docs, tf, terms = docs[order], tf[order], terms[order]
+    df = np.bincount(terms, minlength=len(vocabulary))
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(df, out=offsets[1:])
+
+    # Precomputed BM25 impact of every posting
+    avg_length = float(lengths.mean()) if count else 1.0
+    idf = np.log1p((count - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[docs] / avg_length)
+    impacts = (idf[terms] * tf * (BM25_K1 + 1.0) / (tf + norm)).astype(np.float32)
+
+    level_codes = np.frombuffer(levels, dtype=np.uint8)
+    price_cents = np.frombuffer(prices, dtype=np.int32)
+    platform_codes = np.frombuffer(platform_ids, dtype=np.uint16)
+    level_bits = np.stack([np.packbits(level_codes == i) for i in range(len(LEVEL_FILTERS))]) \
+        if count else np.zeros((len(LEVEL_FILTERS), 0), dtype=np.uint8)
+    price_bits = np.stack(
+        [np.packbits((price_cents >= 0) & (price_cents <= t)) for t in PRICE_THRESHOLDS]
+        + [np.packbits(price_cents < 0)]
+    ) if count else np.zeros((len(PRICE_THRESHOLDS) + 1, 0), dtype=np.uint8)
+    platform_bits = np.stack([np.packbits(platform_codes == i) for i in range(len(platforms))]) \
+        if platforms else np.zeros((0, 0), dtype=np.uint8)
+
+    arrays = {
+        "record_offsets": np.frombuffer(record_offsets, dtype=np.int64),
+        "postings_offsets": offsets,
+        "postings_docs": docs,
+        "postings_impacts": impacts,
+        "price_cents": price_cents,
+        "level_bits": level_bits,
+        "price_bits": price_bits,
+        "platform_bits": platform_bits,
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(index_dir, f"{name}.npy"), values)
+    with open(os.path.join(index_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f, separators=(",", ":"))
+
+    snapshot_stat = os.stat(snapshot_path)
+    meta = {
+        "courses": count,
+        "terms": len(vocabulary),
+        "postings": int(len(docs)),
+        "platforms": sorted(platforms, key=platforms.get),
+        "snapshot_size": snapshot_stat.st_size,
+        "snapshot_mtime": snapshot_stat.st_mtime,
+        "build_seconds": round(time.perf_counter() - started, 2),
+    }
+    os.replace(os.path.join(index_dir, "records.bin.tmp"), os.path.join(index_dir, "records.bin"))
+    # meta.json goes last: its presence marks a complete index
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class CourseCatalog:
+    """Read-only, memory-mapped view of a catalog index directory. Safe to share between threads."""
+
+    def __init__(self, index_dir: str = CATALOG_INDEX_DIR):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "vocabulary.json"), encoding="utf-8") as f:
+            self.vocabulary = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.size = self.meta["courses"]
+        self.record_offsets = load("record_offsets")
+        self.postings_offsets = load("postings_offsets")
+        self.postings_docs = load("postings_docs")
+        self.postings_impacts = load("postings_impacts")
+        self.price_cents = load("price_cents")
+        self.level_bits = load("level_bits")
+        self.price_bits = load("price_bits")
+        self.platform_bits = load("platform_bits")
+        self.platforms = {name: idx for idx, name in enumerate(self.meta["platforms"])}
+
+        self._store_file = open(os.path.join(index_dir, "records.bin"), "rb")
+        self._store = mmap.mmap(self._store_file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(self._store_file.name) else b""
+
+    def get_record(self, doc: int) -> dict:
+        """Returns the normalized course record stored for a document id."""
+        start, end = int(self.record_offsets[doc]), int(self.record_offsets[doc + 1])
+        return json.loads(self._store[start:end])
+
+    def _filter_mask(self, level: str = None, max_price_cents: int = None, platforms: list = None):
+        """
+        Combines the precomputed bitsets into one boolean mask (None = no filter).
+
+        Filters only drop courses KNOWN not to match: courses with an unknown
+        level or price stay in, and the ranking stage weighs the uncertainty.
+        """
+        bits = None
+
+        def restrict(packed):
+            nonlocal bits
+            bits = packed if bits is None else np.bitwise_and(bits, packed)
+
+        if level and level in LEVEL_FILTERS[:3]:
+            allowed = [LEVEL_FILTERS.index(name) for name in (level, "all levels", "unknown")]
+            restrict(np.bitwise_or.reduce(self.level_bits[allowed], axis=0))
+
+        if max_price_cents is not None:
+            # Smallest precomputed bucket that covers the budget; the exact check follows below
+            bucket = next((i for i, t in enumerate(PRICE_THRESHOLDS) if t >= max_price_cents), None)
+            if bucket is not None:
+                restrict(np.bitwise_or(self.price_bits[bucket], self.price_bits[-1]))
+
+        if platforms:
+            codes = [self.platforms[p.lower()] for p in platforms if p.lower() in self.platforms]
+            restrict(np.bitwise_or.reduce(self.platform_bits[codes], axis=0) if codes
+                     else np.zeros(self.level_bits.shape[1], dtype=np.uint8))
+
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count=self.size).view(bool)
+
+    def search(
+        self,
+        query: str,
+        level: str = None,
+        max_price_cents: int = None,
+        free_only: bool = False,
+        platforms: list = None,
+        top_k: int = 10
+    ) -> dict:
+        """
+        BM25 search over title, description and tags with optional filters.
+
+        Returns:
+            dict: "docs", "scores" and "matched_terms" arrays for the top_k
+                documents (best first), plus "query_terms" (terms known to the
+                index) and "full_matches" (documents matching every query term)
+        """
+        if free_only:
+            max_price_cents = 0
+        terms = [self.vocabulary[t] for t in dict.fromkeys(tokenize(query)) if t in self.vocabulary]
+        empty = np.zeros(0, dtype=np.int64)
+        if not terms or not self.size:
+            return {"docs": empty, "scores": np.zeros(0), "matched_terms": empty,
+                    "query_terms": len(terms), "full_matches": 0}
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched = np.zeros(self.size, dtype=np.uint8)
+        postings = []
+        for term in terms:
+            lo, hi = self.postings_offsets[term], self.postings_offsets[term + 1]
+            docs = self.postings_docs[lo:hi]
+            # Doc ids are unique within one posting list, so fancy-index += is exact
+            scores[docs] += self.postings_impacts[lo:hi]
+            matched[docs] += 1
+            postings.append(docs)
+
+        # Candidates come from the posting lists (not a scan of the whole
+        # catalog), so a document appears once per query term it matches
+        candidates = np.concatenate(postings)
+        mask = self._filter_mask(level, max_price_cents, platforms)
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if max_price_cents is not None:
+            # Unknown prices are -1, so they pass
+            candidates = candidates[self.price_cents[candidates] <= max_price_cents]
+
+        full_matches = int(np.count_nonzero(matched[candidates] == len(terms))) // len(terms)
+        candidate_scores = scores[candidates]
+        # The best top_k * len(terms) entries hold at least top_k distinct documents
+        keep = min(top_k * len(terms), len(candidates))
+        if keep < len(candidates):
+            best = np.argpartition(-candidate_scores, keep - 1)[:keep]
+            candidates, candidate_scores = candidates[best], candidate_scores[best]
+        candidates, first = np.unique(candidates, return_index=True)
+        candidate_scores = candidate_scores[first]
+        best = np.lexsort((candidates, -candidate_scores))[:top_k]
+
+        return {
+            "docs": candidates[best],
+            "scores": candidate_scores[best],
+            "matched_terms": matched[candidates[best]],
+            "query_terms": len(terms),
+            "full_matches": full_matches,
+        }
+
+    def close(self):
+        if isinstance(self._store, mmap.mmap):
+            self._store.close()
+        self._store_file.close()
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_catalog_missing = False
+_catalog_loader = None
+_loader_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"searches": 0, "hits": 0, "partial": 0, "misses": 0, "not_loaded": 0}
+
+
+def _index_is_current(snapshot_path: str, index_dir: str) -> bool:
+    try:
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    snapshot_stat = os.stat(snapshot_path)
+    return meta.get("snapshot_size") == snapshot_stat.st_size and meta.get("snapshot_mtime") == snapshot_stat.st_mtime
+
+
+def load_catalog():
+    """
+    Loads the process-wide catalog and returns it, or None when there is no snapshot.
+
+    Blocking: the index is (re)built first if it is missing or older than
+    the snapshot, which takes minutes at a million courses. Run it at
+    startup (preload_catalog) or offline (python -m sub_agents.course_catalog).
+    """
+    global _catalog, _catalog_missing
+    with _catalog_lock:
+        if _catalog is None and not _catalog_missing:
+            if not os.path.exists(CATALOG_SNAPSHOT):
+                _catalog_missing = True
+                return None
+            if not _index_is_current(CATALOG_SNAPSHOT, CATALOG_INDEX_DIR):
+                print(f"📚 Building course catalog index from {CATALOG_SNAPSHOT}...")
+                meta = build_catalog_index(CATALOG_SNAPSHOT, CATALOG_INDEX_DIR)
+                print(f"📚 Indexed {meta['courses']} courses in {meta['build_seconds']}s")
+            _catalog = CourseCatalog(CATALOG_INDEX_DIR)
+        return _catalog
+
+
+def _load_in_background():
+    try:
+        load_catalog()
+    except Exception as e:
+        print(f"⚠️ Course catalog failed to load: {e}")
+
+
+def preload_catalog():
+    """Starts loading the catalog on a background thread (once). Returns immediately."""
+    global _catalog_loader
+    with _loader_lock:
+        if _catalog_loader is None:
+            _catalog_loader = threading.Thread(target=_load_in_background, name="catalog-load", daemon=True)
+            _catalog_loader.start()
+
+
+def get_catalog():
+    """
+    Returns the process-wide catalog, or None while it is still loading or when there is no snapshot.
+
+    Never builds or loads the index on the caller's thread; the first call
+    starts preload_catalog() if nothing has yet.
+    """
+    if _catalog is None and not _catalog_missing:
+        preload_catalog()
+    return _catalog
+
+
+def set_catalog(catalog):
+    """Replaces the process-wide catalog (e.g. a temporary one in benchmarks)."""
+    global _catalog, _catalog_missing
+    with _catalog_lock:
+        _catalog = catalog
+        _catalog_missing = catalog is None
+
+
+def get_catalog_stats() -> dict:
+    """Returns catalog searches by outcome: hits, partial matches, misses, and misses while still loading."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _count(outcome: str):
+    with _stats_lock:
+        _stats["searches"] += 1
+        _stats[outcome] += 1
+
+
+def _budget_filter(budget: str) -> tuple:
+    """Maps a budget preference to (free_only, max_price_cents)."""
+    budget = (budget or "").lower()
+    if "free" in budget:
+        return True, None
+    amounts = re.findall(r"\d+(?:\.\d+)?", budget)
+    if amounts:
+        return False, int(float(amounts[-1]) * 100)
+    return False, None
+
+
+def search_catalog(query: str, level: str = "", budget: str = "", platform: str = "", top_k: int = 8) -> dict:
+    """
+    Searches the local course catalog.
+
+    Args:
+        query: Topic to search for (e.g. "python data analysis")
+        level: "beginner", "intermediate" or "advanced" (empty for any)
+        budget: "free", "$0-50", ... (empty or "any" for no limit)
+        platform: Only courses from this platform, e.g. "Coursera" (empty for any)
+        top_k: Max courses to return (default 8)
+
+    Returns:
+        Dictionary with matching course records (best first), those of them
+        matching every query term (full_match_courses) and whether there are
+        enough of those to skip web search (enough_results)
+    """
+    catalog = get_catalog()
+    if catalog is None:
+        return {"status": "unavailable", "message": "No local course catalog.",
+                "courses": [], "full_match_courses": [], "full_matches": 0, "enough_results": False}
+
+    free_only, max_price_cents = _budget_filter(budget)
+    result = catalog.search(
+        query,
+        level=(level or "").lower() or None,
+        max_price_cents=max_price_cents,
+        free_only=free_only,
+        platforms=[platform] if platform else None,
+        top_k=top_k,
+    )
+    courses = [catalog.get_record(int(doc)) for doc in result["docs"]]
+    return {
+        "status": "success",
+        "courses": courses,
+        "full_match_courses": [course for course, matched in zip(courses, result["matched_terms"])
+                               if matched == result["query_terms"]],
+        "full_matches": result["full_matches"],
+        "enough_results": result["full_matches"] >= min(CATALOG_MIN_RESULTS, top_k),
+    }
+
+
+async def serve_catalog_search(callback_context):
+    """
+    before_agent_callback for search_agent: answers from the local catalog when it has enough matches.
+
+    Returns the catalog's course records as the agent's reply (skipping web
+    search), or None so the agent searches the web. Then the courses that
+    did match every query term go to state[CATALOG_COURSES_KEY], for
+    CourseMerger to merge with the web results. The search runs on a worker
+    thread; a catalog that hasn't finished loading counts as a miss.
+    """
+    # Matches from an earlier search must not leak into this one
+    callback_context.state[CATALOG_COURSES_KEY] = []
+    preferences = callback_context.state.get(PREFERENCES_KEY)
+    if not preferences or callback_context.state.get(REVALIDATE_KEY) or _catalog_missing:
+        return None
+
+    topic, level, budget, _ = normalize_preferences(preferences)
+    if topic == "any":
+        return None
+    if get_catalog() is None:
+        _count("not_loaded")
+        print("📚 Catalog still loading - searching the web")
+        return None
+    result = await asyncio.to_thread(search_catalog, topic, level="" if level == "any" else level,
+                                     budget="" if budget == "any" else budget)
+    if not result["enough_results"]:
+        _count("partial" if result["full_matches"] else "misses")
+        print(f"📚 Catalog: only {result['full_matches']} local matches - searching the web")
+        callback_context.state[CATALOG_COURSES_KEY] = result["full_match_courses"]
+        return None
+
+    _count("hits")
+    callback_context.state[FOUND_COURSES_KEY] = result["courses"]
+    print(f"📚 Catalog hit: {len(result['courses'])} courses")
+    return types.Content(role="model", parts=[types.Part(text=json.dumps(result["courses"]))])
+
+
+if __name__ == "__main__":
+    # Offline build, so servers start with a current index
+    load_catalog()
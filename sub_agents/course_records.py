@@ -0,0 +1,257 @@
+# sub_agents/course_records.py
+
+"""
+Structured course records shared by the search, ranking and learning path stages.
+
+search_agent's platform branches emit lists of CourseRecord (their
+output_schema); the merged list is validated, normalized and stored in
+session state under "found_courses",
+so later stages and tools read the fields directly instead of re-parsing
+a free-text block through another LLM context.
+"""
+
+import math
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pydantic import BaseModel, Field, field_validator
+
+FOUND_COURSES_KEY = "found_courses"
+
+LEVEL_NAMES = ("beginner", "intermediate", "advanced", "all levels")
+MAX_DESCRIPTION_CHARS = 240
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ("utm_", "ref", "referral", "fbclid", "gclid", "mc_", "trk", "source", "couponcode")
+
+PLACEHOLDER_HOSTS = {"example.com", "www.example.com", "localhost"}
+
+# (domain, course page path) for platforms whose course URLs have a fixed
+# shape; deeper paths (lectures, syllabus, reviews, ...) map to the course page
+COURSE_URL_PATTERNS = [
+    ("coursera.org", re.compile(r"/(?:learn|specializations|professional-certificates|projects)/[^/]+")),
+    ("udemy.com", re.compile(r"/course/[^/]+")),
+    ("edx.org", re.compile(r"/(?:course|learn/[^/]+|professional-certificate|xseries)/[^/]+")),
+    ("ocw.mit.edu", re.compile(r"/courses/[^/]+")),
+    ("khanacademy.org", re.compile(r"/[^/]+/[^/]+")),
+]
+# Query parameters that identify a YouTube video or playlist
+YOUTUBE_PARAMS = ("v", "list")
+
+FREE_WORDS = ("free", "audit", "no cost", "$0")
+UNKNOWN_PRICE_WORDS = ("check", "varies", "unknown", "n/a")
+
+
+def parse_price(value) -> float:
+    """
+    Parses a price field to US dollars.
+
+    Returns:
+        float: 0.0 for free / free to audit, the amount for "$49.99"-style
+            values, NaN when unknown ("Check course page")
+    """
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).lower()
+    if any(word in text for word in FREE_WORDS):
+        return 0.0
+    if any(word in text for word in UNKNOWN_PRICE_WORDS):
+        return math.nan
+    match = re.search(r"\d+(?:[.,]\d+)?", text)
+    return float(match.group().replace(",", "")) if match else math.nan
+
+
+def parse_duration_hours(value) -> float:
+    """
+    Parses a duration field ("40 hours", "6 weeks", "3 months") to hours.
+
+    Weeks and months assume a part-time pace of 5 hours/week. NaN when unknown.
+    """
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).lower()
+    match = re.search(r"\d+(?:\.\d+)?", text)
+    if not match:
+        return math.nan
+    amount = float(match.group())
+    if "min" in text:
+        return amount / 60.0
+    if "week" in text:
+        return amount * 5.0
+    if "month" in text:
+        return amount * 20.0
+    return amount
+
+
+class CourseRecord(BaseModel):
+    """One candidate course as found by search_agent."""
+
+    name: str = Field(description="Full course title")
+    platform: str = Field(default="", description="Coursera, Udemy, edX, YouTube, ...")
+    url: str = Field(description="Complete, specific course URL - never blank or a placeholder")
+    duration_hours: Optional[float] = Field(default=None, description="Total length in hours, null if unknown")
+    price_cents: Optional[int] = Field(default=None, description="Price in US cents, null if free or unknown")
+    is_free: bool = Field(default=False, description="True for free or free-to-audit courses")
+    level: Optional[str] = Field(default=None, description="beginner, intermediate, advanced or all levels")
+    description: str = Field(default="", description="1-2 sentence description")
+
+    @field_validator("name", "platform", mode="before")
+    @classmethod
+    def _strip(cls, value):
+        return " ".join(str(value or "").split())
+
+    @field_validator("description", mode="before")
+    @classmethod
+    def _description(cls, value):
+        text = " ".join(str(value or "").split())
+        return text if len(text) <= MAX_DESCRIPTION_CHARS else text[:MAX_DESCRIPTION_CHARS - 1].rstrip() + "…"
+
+    @field_validator("duration_hours", mode="before")
+    @classmethod
+    def _hours(cls, value):
+        hours = parse_duration_hours(value)
+        return None if math.isnan(hours) or hours <= 0 else round(hours, 1)
+
+    @field_validator("price_cents", mode="before")
+    @classmethod
+    def _cents(cls, value):
+        # Ints are cents; strings ("$49.99") and floats (49.99) are dollar amounts
+        if isinstance(value, (str, float)):
+            dollars = parse_price(value)
+            return None if math.isnan(dollars) else int(round(dollars * 100))
+        return value
+
+    @field_validator("level", mode="before")
+    @classmethod
+    def _level(cls, value):
+        text = str(value or "").lower()
+        return next((name for name in LEVEL_NAMES if name.split()[0] in text), None)
+
+    @field_validator("url", mode="before")
+    @classmethod
+    def _url(cls, value):
+        return canonical_url(str(value or ""))
+
+
+def _on_domain(host: str, domain: str) -> bool:
+    return host == domain or host.endswith("." + domain)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes a course URL so the same course always has the same URL.
+
+    Forces https, lowercases the host, drops fragments, tracking parameters
+    and trailing slashes. Known platform URLs are cut down to the course
+    page (COURSE_URL_PATTERNS, YouTube video/playlist ids). Returns "" if
+    the value isn't an http(s) URL.
+    """
+    url = url.strip()
+    if url and "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or "." not in parts.netloc:
+        return ""
+
+    host = parts.netloc.lower()
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ]
+
+    if host == "youtu.be" and path:
+        host, query, path = "www.youtube.com", [("v", path.strip("/"))], "/watch"
+    if _on_domain(host, "youtube.com"):
+        query = [(key, value) for key, value in query if key in YOUTUBE_PARAMS]
+    for domain, pattern in COURSE_URL_PATTERNS:
+        match = pattern.match(path) if _on_domain(host, domain) else None
+        if match:
+            path, query = match.group(0), []
+            break
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def course_id(url: str) -> str:
+    """
+    Id of the course page a canonical URL points to.
+
+    "https://www.coursera.org/learn/python" -> "coursera.org/learn/python",
+    with or without www.
+    """
+    parts = urlsplit(url)
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return host + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def _dedupe_key(url: str) -> str:
+    """www.example.org/x and example.org/x are the same course."""
+    return course_id(url)
+
+
+def is_specific_url(url: str) -> bool:
+    """False for blank, placeholder and bare-homepage URLs."""
+    parts = urlsplit(url)
+    return bool(url) and parts.netloc not in PLACEHOLDER_HOSTS and bool(parts.path.strip("/") or parts.query)
+
+
+def title_key(name: str) -> str:
+    """Case, punctuation and spacing don't make a different course."""
+    return " ".join(re.findall(r"[a-z0-9+#]+", name.lower()))
+
+
+def validate_course_records(raw, dedupe_titles: bool = False) -> list:
+    """
+    Validates and normalizes search output into course records.
+
+    Accepts a list of dicts (or a {"courses": [...]} dict). Records without a
+    name or a specific course URL are dropped, and duplicates of the same
+    canonical URL - or, with dedupe_titles, the same title - are merged
+    (first one wins, missing fields filled in).
+
+    Returns:
+        list: Normalized course record dicts, in search order
+    """
+    if isinstance(raw, dict):
+        raw = raw.get("courses", [])
+    if not isinstance(raw, list):
+        return []
+
+    records = {}
+    titles = {}
+    for item in raw:
+        if isinstance(item, CourseRecord):
+            item = item.model_dump()
+        if not isinstance(item, dict):
+            continue
+        try:
+            record = CourseRecord.model_validate(item).model_dump()
+        except ValueError as e:
+            print(f"⚠️ Dropping invalid course record: {e}")
+            continue
+        if record["is_free"]:
+            record["price_cents"] = None
+        elif record["price_cents"] == 0:
+            record["is_free"], record["price_cents"] = True, None
+        if not record["name"] or not is_specific_url(record["url"]):
+            continue
+
+        key = _dedupe_key(record["url"])
+        existing = records.get(key)
+        if existing is None and dedupe_titles:
+            existing = titles.get(title_key(record["name"]))
+        if existing is None:
+            records[key] = record
+            titles.setdefault(title_key(record["name"]), record)
+        else:
+            for field, value in record.items():
+                if existing[field] in (None, "") and value not in (None, ""):
+                    existing[field] = value
+
+    return list(records.values())
+
@@ -0,0 +1,296 @@
+# sub_agents/course_scoring.py
+
+"""
+Deterministic course scoring engine for CourseRanker.
+
+Scores every candidate on the same five dimensions and weights the ranking
+prompt describes (topic_fit, level_fit, budget_fit, format_fit,
+platform_reputation), computed from structured course fields with NumPy
+over all candidates at once. The result is reproducible and costs no LLM
+tokens; the ranker only writes the user-facing prose for the ranked list.
+"""
+
+import re
+
+import numpy as np
+from google.adk.tools import FunctionTool, ToolContext
+from sub_agents.course_records import FOUND_COURSES_KEY, parse_duration_hours, parse_price
+
+RANKED_COURSES_KEY = "ranked_courses"
+
+WEIGHTS = {
+    "topic_fit": 0.35,
+    "level_fit": 0.25,
+    "budget_fit": 0.20,
+    "format_fit": 0.15,
+    "platform_reputation": 0.05,
+}
+DIMENSIONS = list(WEIGHTS.keys())
+
+# General educational quality and structure of each platform (1-5)
+PLATFORM_REPUTATION = {
+    "coursera": 5,
+    "edx": 5,
+    "mit opencourseware": 5,
+    "mit ocw": 5,
+    "stanford online": 5,
+    "harvard online": 5,
+    "khan academy": 4,
+    "freecodecamp": 4,
+    "udacity": 4,
+    "datacamp": 4,
+    "codecademy": 4,
+    "pluralsight": 4,
+    "linkedin learning": 4,
+    "the odin project": 4,
+    "fast.ai": 4,
+    "kaggle learn": 4,
+    "google": 4,
+    "udemy": 3,
+    "youtube": 3,
+    "skillshare": 3,
+    "futurelearn": 3,
+}
+DEFAULT_REPUTATION = 3
+
+LEVELS = {"beginner": 0, "intermediate": 1, "advanced": 2}
+ALL_LEVELS = -2
+UNKNOWN_LEVEL = -1
+
+FORMAT_KEYWORDS = {
+    "video": ("video", "lecture", "youtube", "watch"),
+    "text": ("text", "reading", "book", "article", "written", "documentation"),
+    "interactive": ("interactive", "exercise", "hands-on", "hands on", "in-browser", "quiz", "practice"),
+    "project": ("project", "build", "portfolio", "capstone"),
+}
+
+# Budget preferences that mean cost doesn't matter (as opposed to no budget given)
+NO_BUDGET_PREFERENCE = ("any", "no preference", "doesn't matter", "does not matter", "don't care", "no limit")
+
+STOPWORDS = {
+    "a", "an", "and", "the", "for", "of", "to", "in", "on", "with", "learn", "learning",
+    "course", "courses", "online", "class", "tutorial", "intro", "introduction",
+}
+
+def parse_level(value) -> int:
+    """Maps a level string to 0/1/2, ALL_LEVELS or UNKNOWN_LEVEL."""
+    text = str(value or "").lower()
+    if "all" in text:
+        return ALL_LEVELS
+    for name, idx in LEVELS.items():
+        if name in text:
+            return idx
+    return UNKNOWN_LEVEL
+
+
+def _tokens(text: str) -> list:
+    return [t for t in re.findall(r"[a-z0-9+#.]+", (text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def _reputation(platform: str) -> int:
+    name = (platform or "").lower()
+    if name in PLATFORM_REPUTATION:
+        return PLATFORM_REPUTATION[name]
+    for key, score in PLATFORM_REPUTATION.items():
+        if key in name:
+            return score
+    return DEFAULT_REPUTATION
+
+
+def _course_field(course: dict, *names, default=None):
+    for name in names:
+        if course.get(name) not in (None, ""):
+            return course[name]
+    return default
+
+
+def _budget_fit(price: np.ndarray, budget: str) -> np.ndarray:
+    """Budget rules from the ranking prompt, vectorized over prices (NaN = unknown)."""
+    budget = (budget or "").lower().strip()
+    if budget in NO_BUDGET_PREFERENCE:
+        # Cost doesn't matter: neutral for every price, like level/format without a preference
+        return np.full(len(price), 4.0)
+    known = ~np.isnan(price)
+    safe_price = np.where(known, price, 0.0)
+    free = known & (safe_price == 0.0)
+
+    ceiling = re.search(r"\d+", budget)
+    if "free" in budget:
+        scores = np.select([free, safe_price <= 20], [5.0, 3.0], default=1.0)
+    elif ceiling:
+        limit = float(re.findall(r"\d+", budget)[-1])
+        scores = np.select([free, safe_price <= limit], [5.0, 4.0], default=1.0)
+    elif "paid" in budget or "flexible" in budget:
+        scores = np.select([free, safe_price <= 300], [5.0, 4.0], default=3.0)
+    else:
+        # No explicit budget: assume the user prefers free or low-cost courses
+        scores = np.select(
+            [free, safe_price <= 20, safe_price <= 100, safe_price <= 300],
+            [5.0, 4.0, 3.0, 2.0],
+            default=1.0,
+        )
+    return np.where(known, scores, 3.0)
+
+
+def score_courses(courses: list, preferences: dict) -> dict:
+    """
+    Scores all candidate courses on every dimension.
+
+    Args:
+        courses: List of course dicts (name/title, platform, url, description,
+            level, duration / duration_hours, price / price_cents / is_free, ...)
+        preferences: {"topic", "level", "budget", "format"} - missing keys mean "any",
+            except budget: a missing budget prefers free / low-cost courses,
+            "any" weights every price the same
+
+    Returns:
+        dict: One NumPy array per dimension (1-5) plus "overall" (0-10)
+    """
+    n = len(courses)
+    if n == 0:
+        return {name: np.zeros(0) for name in DIMENSIONS + ["overall"]}
+
+    titles = np.array([str(_course_field(c, "name", "title", default="")).lower() for c in courses])
+    texts = np.array([
+        " ".join(str(_course_field(c, key, default="")) for key in ("description", "platform", "format")).lower()
+        for c in courses
+    ])
+
+    price = np.array([
+        0.0 if c.get("is_free") else
+        c["price_cents"] / 100.0 if c.get("price_cents") is not None else
+        parse_price(_course_field(c, "price"))
+        for c in courses
+    ], dtype=float)
+    duration = np.array([
+        parse_duration_hours(_course_field(c, "duration_hours", "duration")) for c in courses
+    ], dtype=float)
+    level = np.array([parse_level(_course_field(c, "level")) for c in courses])
+    reputation = np.array([_reputation(_course_field(c, "platform", default="")) for c in courses], dtype=float)
+
+    # topic_fit: share of topic terms found in the title (full credit) or description (partial)
+    terms = _tokens(preferences.get("topic", ""))
+    if terms:
+        coverage = np.zeros((len(terms), n))
+        for row, term in enumerate(terms):
+            in_title = np.char.find(titles, term) >= 0
+            in_text = np.char.find(texts, term) >= 0
+            coverage[row] = np.where(in_title, 1.0, np.where(in_text, 0.6, 0.0))
+        topic_fit = 1.0 + 4.0 * coverage.mean(axis=0)
+    else:
+        topic_fit = np.full(n, 3.0)
+
+    # level_fit: 5 for an exact match, -2 per level of distance; unknown is neutral
+    wanted_level = parse_level(preferences.get("level") or "beginner")
+    if wanted_level < 0:
+        level_fit = np.full(n, 4.0)
+    else:
+        distance = np.abs(level - wanted_level)
+        level_fit = np.select(
+            [level == ALL_LEVELS, level == UNKNOWN_LEVEL],
+            [4.0, 3.0],
+            default=np.clip(5.0 - 2.0 * distance, 1.0, 5.0),
+        )
+
+    budget_fit = _budget_fit(price, preferences.get("budget", ""))
+
+    # format_fit: clear, not overwhelmingly long, and in the preferred style if there is one
+    length_score = np.select(
+        [np.isnan(duration), duration <= 40, duration <= 80, duration <= 150],
+        [3.0, 5.0, 4.0, 3.0],
+        default=2.0,
+    )
+    wanted_format = (preferences.get("format") or "").lower()
+    keywords = next((words for name, words in FORMAT_KEYWORDS.items() if name in wanted_format), None)
+    if keywords:
+        matches = np.zeros(n, dtype=bool)
+        for keyword in keywords:
+            matches |= np.char.find(texts, keyword) >= 0
+        style_score = np.where(matches, 5.0, 3.0)
+    else:
+        style_score = np.full(n, 4.0)
+    format_fit = (length_score + style_score) / 2.0
+
+    scores = {
+        "topic_fit": topic_fit,
+        "level_fit": level_fit,
+        "budget_fit": budget_fit,
+        "format_fit": format_fit,
+        "platform_reputation": reputation,
+    }
+    weighted = sum(WEIGHTS[name] * scores[name] for name in DIMENSIONS)
+    scores["overall"] = weighted * 2.0  # 1-5 scale to 0-10
+    return scores
+
+
+def top_k_indices(overall: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k scores, best first (ties keep input order)."""
+    top_k = max(0, min(top_k, len(overall)))
+    if top_k < len(overall):
+        candidates = np.argpartition(-overall, top_k - 1)[:top_k] if top_k else np.array([], dtype=int)
+    else:
+        candidates = np.arange(len(overall))
+    order = np.lexsort((candidates, -overall[candidates]))
+    return candidates[order]
+
+
+def rank_courses(courses: list, preferences: dict, top_k: int = 5) -> dict:
+    """
+    Ranks candidate courses with a fixed, reproducible scoring formula.
+
+    Args:
+        courses: Course records or dicts with any of: name, platform, url,
+            description, level, duration / duration_hours, price / price_cents / is_free
+        preferences: {"topic", "level", "budget", "format"}
+        top_k: How many courses to return
+
+    Returns:
+        dict: status, total_candidates and ranked_courses (best first, with scores)
+    """
+    scores = score_courses(courses, preferences)
+    ranked = []
+    for rank, idx in enumerate(top_k_indices(scores["overall"], top_k), start=1):
+        course = dict(courses[idx])
+        course["rank"] = rank
+        course["overall_score"] = round(float(scores["overall"][idx]), 2)
+        course["scores"] = {name: round(float(scores[name][idx]), 2) for name in DIMENSIONS}
+        ranked.append(course)
+
+    return {
+        "status": "success",
+        "total_candidates": len(courses),
+        "ranked_courses": ranked,
+    }
+
+
+def rank_found_courses(preferences: dict, top_k: int = 5, tool_context: ToolContext = None) -> dict:
+    """
+    Ranks the courses search_agent found for the user with a fixed, reproducible scoring formula.
+
+    Reads the candidate course records from the session (no need to pass them),
+    scores each 1-5 on topic_fit, level_fit, budget_fit, format_fit and
+    platform_reputation, combines them with weights 0.35/0.25/0.20/0.15/0.05
+    into an overall score (0-10) and returns the best ones in order.
+
+    Args:
+        preferences: User preferences, e.g.
+            {"topic": "Python programming", "level": "beginner", "budget": "free", "format": "any"}
+        top_k: How many courses to return (default 5)
+
+    Returns:
+        Dictionary with the ranked courses (best first), each with its scores
+    """
+    courses = tool_context.state.get(FOUND_COURSES_KEY) if tool_context else None
+    if not isinstance(courses, list) or not courses:
+        return {
+            "status": "error",
+            "message": "No courses were found to rank. Search again with a broader topic."
+        }
+
+    result = rank_courses(courses, preferences, top_k)
+    tool_context.state[RANKED_COURSES_KEY] = result["ranked_courses"]
+    return result
+
+
+# Create the ADK FunctionTool
+ranking_tool = FunctionTool(rank_found_courses)
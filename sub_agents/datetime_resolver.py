@@ -0,0 +1,321 @@
+# sub_agents/datetime_resolver.py
+
+"""
+Deterministic date, time and timezone resolver for calendar_agent.
+
+Turns what the user said ("this Saturday", "Dec 1", "Pacific", "8pm")
+into the start_date (YYYY-MM-DD), timezone (IANA) and reminder_time
+(HH:MM) that create_study_reminders takes. The calculation isn't left to
+the LLM. Relative dates are computed against the current time in the
+user's timezone (zoneinfo) when the tool is called, not at import. The
+start date moves forward to the first study day of the study plan if it
+doesn't fall on one, because the calendar tool requires that.
+
+Date rules (same as the calendar prompt always promised):
+- "this Saturday" / "Saturday" = the upcoming one, 1-7 days ahead
+- "next Saturday" = a week after that, 8-14 days ahead
+- "Dec 1" without a year = the next Dec 1 from today
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+from google.adk.tools import FunctionTool, ToolContext
+from sub_agents.learning_path_calculator import STUDY_PLAN_KEY
+from sub_agents.study_planner import DAY_MAP, DAY_NAMES
+
+DEFAULT_TIMEZONE = "America/Los_Angeles"
+
+TIMEZONE_ALIASES = {
+    "America/Los_Angeles": ("pacific", "pt", "pst", "pdt", "california", "los angeles", "la", "san francisco",
+                            "seattle", "portland", "vancouver", "west coast"),
+    "America/Denver": ("mountain", "mt", "mst", "mdt", "denver", "colorado", "utah", "salt lake city"),
+    "America/Phoenix": ("arizona", "phoenix"),
+    "America/Chicago": ("central", "ct", "cst", "cdt", "chicago", "texas", "dallas", "houston", "austin"),
+    "America/New_York": ("eastern", "et", "est", "edt", "new york", "nyc", "boston", "miami", "atlanta",
+                         "washington dc", "toronto", "east coast"),
+    "America/Anchorage": ("alaska", "akst", "akdt", "anchorage"),
+    "Pacific/Honolulu": ("hawaii", "hst", "honolulu"),
+    "America/Sao_Paulo": ("brazil", "sao paulo", "brt"),
+    "Europe/London": ("uk", "gmt", "bst", "london", "england", "britain", "united kingdom", "ireland", "dublin"),
+    "Europe/Paris": ("cet", "cest", "central european", "paris", "france", "berlin", "germany", "madrid",
+                     "spain", "rome", "italy", "amsterdam", "netherlands"),
+    "Asia/Kolkata": ("india", "ist", "kolkata", "mumbai", "delhi", "bangalore", "bengaluru", "chennai"),
+    "Asia/Dubai": ("dubai", "uae", "gst"),
+    "Asia/Singapore": ("singapore", "sgt"),
+    "Asia/Shanghai": ("china", "beijing", "shanghai"),
+    "Asia/Tokyo": ("japan", "jst", "tokyo"),
+    "Asia/Seoul": ("korea", "kst", "seoul"),
+    "Australia/Sydney": ("sydney", "aest", "aedt", "melbourne", "australia eastern"),
+    "Pacific/Auckland": ("new zealand", "nzst", "nzdt", "auckland"),
+    "UTC": ("utc", "z", "zulu", "universal"),
+}
+_ZONE_BY_ALIAS = {alias: zone for zone, aliases in TIMEZONE_ALIASES.items() for alias in aliases}
+
+MONTHS = {name: number for number, names in enumerate(
+    [("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"),
+     ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"),
+     ("november", "nov"), ("december", "dec")], start=1) for name in names}
+_DAY_ALIASES = {"mon": "Monday", "tue": "Tuesday", "tues": "Tuesday", "wed": "Wednesday", "thu": "Thursday",
+                "thur": "Thursday", "thurs": "Thursday", "fri": "Friday", "sat": "Saturday", "sun": "Sunday",
+                **{name.lower(): name for name in DAY_NAMES}}
+
+_DAY = r"(?P<day>" + "|".join(sorted(_DAY_ALIASES, key=len, reverse=True)) + r")\.?"
+_MONTH = r"(?P<month>" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_ORDINAL_DAY = r"(?P<dom>\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*(?P<year>\d{4}))?"
+
+_ISO_DATE = re.compile(r"^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<dom>\d{1,2})$")
+_NUMERIC_DATE = re.compile(r"^(?P<month>\d{1,2})/(?P<dom>\d{1,2})(?:/(?P<year>\d{2}|\d{4}))?$")  # US order
+_MONTH_FIRST = re.compile(rf"^(?:{_DAY},?\s+)?(?:the\s+)?{_MONTH}\s+{_ORDINAL_DAY}{_YEAR}$")
+_DAY_FIRST = re.compile(rf"^(?:{_DAY},?\s+)?(?:the\s+)?{_ORDINAL_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR}$")
+_WEEKDAY = re.compile(rf"^(?:(?P<which>this|next|coming|this coming|upcoming)\s+)?{_DAY}(?:\s+(?P<after>after next))?$")
+_IN_N = re.compile(r"^in\s+(?P<count>\d+|a|an|one|two|three|four)\s+(?P<unit>days?|weeks?)$")
+_UTC_OFFSET = re.compile(r"^(?:utc|gmt)\s*(?P<sign>[+-])\s*(?P<hours>\d{1,2})(?::?(?P<minutes>\d{2}))?$")
+_CLOCK = re.compile(r"^(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?\s*(?P<meridiem>[ap])?\.?\s*m?\.?$")
+_TIME_OF_DAY = re.compile(r"^(?P<time>.+?)\s+(?:in the |at )?(?P<part>morning|afternoon|evening|night|tonight)$")
+
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4}
+
+
+def _clean(text: str) -> str:
+    text = " ".join(str(text or "").lower().replace(",", ", ").split())
+    return re.sub(r"^(?:on|starting|start|from|beginning)\s+", "", text).rstrip(" .!?").replace(" ,", ",")
+
+
+def _upcoming(today: date, weekday: int) -> date:
+    """The next `weekday` strictly after today (1-7 days ahead)."""
+    return today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+
+
+def _make_date(year: int, month: int, dom: int) -> date:
+    try:
+        return date(year, month, dom)
+    except ValueError:
+        raise ValueError(f"There is no {dom} in month {month} of {year}") from None
+
+
+def _readable(day: date) -> str:
+    return f"{day:%A, %B} {day.day}, {day.year}"
+
+
+def parse_date(text: str, today: date) -> date:
+    """
+    Resolves a natural-language date relative to today.
+
+    Accepts today/tomorrow/day after tomorrow, "[this|next] <weekday>",
+    "this weekend", "next week", "next month", "in 3 days", "in 2 weeks",
+    "Dec 1", "December 1st, 2025", "1 December", "Saturday, January 11",
+    "12/1" (month/day) and "2025-12-01".
+
+    Raises:
+        ValueError: For anything else, or a date in the past
+    """
+    value = _clean(text)
+    if value in ("today", "tonight", "now", "right away", "asap"):
+        return today
+    if value == "tomorrow":
+        return today + timedelta(days=1)
+    if value in ("day after tomorrow", "the day after tomorrow"):
+        return today + timedelta(days=2)
+    if value in ("this weekend", "the weekend", "weekend", "this coming weekend"):
+        return today if today.weekday() >= DAY_MAP["Saturday"] else _upcoming(today, DAY_MAP["Saturday"])
+    if value == "next weekend":
+        return _upcoming(today, DAY_MAP["Saturday"]) + timedelta(days=7)
+    if value in ("next week", "this coming week"):
+        return _upcoming(today, DAY_MAP["Monday"])
+    if value == "next month":
+        return date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+    match = _IN_N.match(value)
+    if match:
+        count = _NUMBER_WORDS.get(match["count"]) or int(match["count"])
+        return today + timedelta(days=count * (7 if match["unit"].startswith("week") else 1))
+
+    match = _WEEKDAY.match(value)
+    if match:
+        resolved = _upcoming(today, DAY_MAP[_DAY_ALIASES[match["day"]]])
+        if match["which"] == "next":
+            resolved += timedelta(days=7)
+        if match["after"]:
+            resolved += timedelta(days=7)
+        return resolved
+
+    match = _ISO_DATE.match(value) or _NUMERIC_DATE.match(value)
+    if match:
+        month, dom = int(match["month"]), int(match["dom"])
+    else:
+        match = _MONTH_FIRST.match(value) or _DAY_FIRST.match(value)
+        if not match:
+            raise ValueError(f"Couldn't understand the date '{text}'. Ask for it like 'this Saturday' or 'Dec 1'")
+        month, dom = MONTHS[match["month"]], int(match["dom"])
+
+    year = match["year"]
+    if year:
+        resolved = _make_date(int(year) + (2000 if len(year) == 2 else 0), month, dom)
+    else:
+        try:
+            resolved = _make_date(today.year, month, dom)
+        except ValueError:  # Feb 29
+            resolved = None
+        if resolved is None or resolved < today:
+            resolved = _make_date(today.year + 1, month, dom)
+    if resolved < today:
+        raise ValueError(f"{_readable(resolved)} is in the past. Ask for a start date from today on")
+    day = match.groupdict().get("day")
+    if day and DAY_MAP[_DAY_ALIASES[day]] != resolved.weekday():
+        raise ValueError(f"{_readable(resolved)} is not a {_DAY_ALIASES[day]}. Ask which one the user meant")
+    return resolved
+
+
+@lru_cache(maxsize=1)
+def _zones_by_lower_name() -> dict:
+    return {name.lower(): name for name in available_timezones()}
+
+
+def parse_timezone(text: str) -> str:
+    """
+    Maps "Pacific", "EST", "London", "UTC+2", or an IANA name in any case, to an IANA timezone.
+
+    Raises:
+        ValueError: For unknown zones and non-whole-hour UTC offsets
+    """
+    value = _clean(text).removesuffix(" time").removesuffix(" timezone").removesuffix(" standard").strip()
+    value = value.removesuffix(" daylight").strip()
+    if value in _ZONE_BY_ALIAS:
+        return _ZONE_BY_ALIAS[value]
+    zone = _zones_by_lower_name().get(value.replace(" ", "_"))
+    if zone:
+        return zone
+    match = _UTC_OFFSET.match(value)
+    if match:
+        hours, minutes = int(match["hours"]), int(match["minutes"] or 0)
+        if minutes or hours > 14:
+            raise ValueError(f"Can't map '{text}' to a timezone. Ask for the user's city")
+        # POSIX-style names: Etc/GMT+8 is UTC-8
+        return "UTC" if hours == 0 else f"Etc/GMT{'-' if match['sign'] == '+' else '+'}{hours}"
+    raise ValueError(f"Unknown timezone '{text}'. Ask for a city or a zone like Pacific or Eastern")
+
+
+def parse_clock_time(text: str) -> str:
+    """
+    Converts "8pm", "6:30 PM", "20:00", "noon", "8 in the evening" to "HH:MM".
+
+    Raises:
+        ValueError: For vague ("evening") or ambiguous ("8", "8:30") times
+    """
+    value = _clean(text).replace("o'clock", "").strip()
+    if value in ("noon", "midday", "12 noon"):
+        return "12:00"
+    if value == "midnight":
+        return "00:00"
+    part = None
+    match = _TIME_OF_DAY.match(value)
+    if match:
+        value, part = match["time"].strip(), match["part"]
+    match = _CLOCK.match(value)
+    if not match:
+        raise ValueError(f"Unclear time '{text}'. Ask for an exact time like 8 PM or 6:30 PM")
+    hour, minute, meridiem = int(match["hour"]), int(match["minute"] or 0), match["meridiem"]
+    if meridiem is None and part is not None:
+        # "12 at night" is midnight and "2 at night" is 2 AM, but "11 at night" is 11 PM
+        night_am = part in ("night", "tonight") and (hour == 12 or hour <= 4)
+        meridiem = "a" if part == "morning" or night_am else "p"
+    if minute > 59 or (meridiem and not 1 <= hour <= 12) or hour > 23:
+        raise ValueError(f"Invalid time '{text}'")
+    # "8" and "8:30" could be either; "08:30" and "20:00" are 24-hour times
+    if meridiem is None and 1 <= hour <= 12 and (match["minute"] is None or not match["hour"].startswith("0")):
+        raise ValueError(f"Is '{text}' AM or PM? Ask the user")
+    if meridiem == "p" and hour != 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _normalize_days(study_days) -> list:
+    return [_DAY_ALIASES.get(str(day).strip().lower().rstrip("s"), str(day).strip().title()) for day in study_days]
+
+
+def resolve_inputs(start_date: str, timezone: str = "", reminder_time: str = "", study_days=(),
+                   now: Optional[datetime] = None) -> dict:
+    """
+    Resolves the calendar inputs; see resolve_calendar_inputs for the result.
+
+    Args:
+        now: The current time (default: now); "today" is its date in the resolved timezone
+
+    Raises:
+        ValueError: For an unclear date, timezone or time, or unknown study days
+    """
+    zone = parse_timezone(timezone) if timezone else DEFAULT_TIMEZONE
+    try:
+        today = (now.astimezone(ZoneInfo(zone)) if now is not None else datetime.now(ZoneInfo(zone))).date()
+    except ZoneInfoNotFoundError:
+        raise ValueError(f"Timezone {zone} isn't available on this server") from None
+    requested = parse_date(start_date, today)
+    reminder = parse_clock_time(reminder_time) if reminder_time else "20:00"
+    days = _normalize_days(study_days or ())
+    unknown = [day for day in days if day not in DAY_MAP]
+    if unknown:
+        raise ValueError(f"Unknown study day(s) {unknown}. Use {', '.join(DAY_NAMES)}")
+
+    start = requested
+    if days:
+        # The first session must fall on a study day
+        start = min(requested + timedelta(days=(DAY_MAP[day] - requested.weekday()) % 7) for day in days)
+    result = {
+        "start_date": start.isoformat(),
+        "start_date_readable": _readable(start),
+        "timezone": zone,
+        "reminder_time": reminder,
+        "today": today.isoformat(),
+    }
+    notes = []
+    if start != requested:
+        notes.append(f"{requested:%A, %B} {requested.day} isn't a study day; "
+                     f"the first session is {result['start_date_readable']}.")
+    if not timezone:
+        notes.append(f"No timezone given; used {zone}.")
+    if notes:
+        result["note"] = " ".join(notes)
+    return result
+
+
+def resolve_calendar_inputs(
+    start_date: str,
+    timezone: str = "",
+    reminder_time: str = "",
+    study_days: Optional[list[str]] = None,
+    tool_context: ToolContext = None
+) -> dict:
+    """
+    Converts the user's start date, timezone and reminder time to the exact
+    values create_study_reminders takes. Pass the user's own words.
+
+    Args:
+        start_date: When to start, as the user said it, e.g. "this Saturday",
+            "tomorrow", "Dec 1", "January 11"
+        timezone: The user's timezone as they said it, e.g. "Pacific", "Eastern", "London"
+        reminder_time: Reminder time as the user said it, e.g. "8pm", "6:30 PM"
+        study_days: Study days; defaults to the study plan's
+
+    Returns:
+        Dictionary with start_date (YYYY-MM-DD, moved to the first study day
+        on or after the date the user gave), start_date_readable, timezone
+        (IANA) and reminder_time (HH:MM), or status "error" with what to ask
+    """
+    if not study_days and tool_context is not None:
+        plan = tool_context.state.get(STUDY_PLAN_KEY) or {}
+        study_days = [session["day"] for session in plan.get("study_schedule", [])]
+    try:
+        return {"status": "success", **resolve_inputs(start_date, timezone, reminder_time, study_days)}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+
+# Create the ADK FunctionTool
+datetime_resolver_tool = FunctionTool(resolve_calendar_inputs)
@@ -0,0 +1,87 @@
+# sub_agents/deadline_agent.py
+
+"""
+Per-agent deadlines for ADK agents.
+
+DeadlineAgent runs one sub-agent and gives up on it once its deadline
+passes or it raises, writing fallback state instead. Inside a ParallelAgent
+this keeps one slow or failing branch from holding up (or failing) the
+whole fan-out.
+"""
+
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.utils.context_utils import Aclosing
+
+
+class DeadlineAgent(BaseAgent):
+    """Runs its only sub-agent with a deadline; on timeout or error, applies `fallback_state`."""
+
+    # Not BaseAgent.timeout: that one is only enforced by Workflow, and it fails the node
+    deadline_seconds: float
+    fallback_state: dict = {}
+
+    def __init__(self, agent: BaseAgent, deadline_seconds: float, fallback_state: dict = None, **kwargs):
+        super().__init__(
+            name=kwargs.pop("name", f"{agent.name}_with_deadline"),
+            description=kwargs.pop("description", agent.description),
+            sub_agents=[agent],
+            deadline_seconds=deadline_seconds,
+            fallback_state=fallback_state or {},
+            **kwargs,
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        agent = self.sub_agents[0]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline_seconds
+        queue = asyncio.Queue()
+
+        async def _drive():
+            # The sub-agent runs in its own task; after each event it waits
+            # until the runner has processed it, like ParallelAgent does
+            try:
+                async with Aclosing(agent.run_async(ctx)) as agen:
+                    async for event in agen:
+                        resume = asyncio.Event()
+                        await queue.put((event, resume, None))
+                        await resume.wait()
+                await queue.put((None, None, None))
+            except Exception as e:
+                await queue.put((None, None, e))
+
+        task = asyncio.create_task(_drive())
+        failure = None
+        try:
+            while True:
+                try:
+                    event, resume, error = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    failure = f"timed out after {self.deadline_seconds:.0f}s"
+                    break
+                if error is not None:
+                    failure = f"failed: {error}"
+                    break
+                if event is None:
+                    return
+                yield event
+                resume.set()
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        print(f"⚠️ {agent.name} {failure} - continuing without it")
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=dict(self.fallback_state)),
+        )
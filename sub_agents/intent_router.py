@@ -0,0 +1,374 @@
+# sub_agents/intent_router.py
+
+"""
+Local intent router for root_agent (and learning_path_generator).
+
+Every user turn used to cost a Gemini call in root_agent only to decide
+where the turn goes. classify_intent() decides that on the CPU in
+microseconds. It runs high-precision keyword/regex rules, backed by a
+small naive Bayes model trained on TRAINING_EXAMPLES at import. Its
+before_model_callback answers instead of the model:
+
+- greetings get a canned reply
+- course requests go straight to CourseFinderPipeline (never questions, and
+  with courses already shown only an explicit "find"/"search"/"show me")
+- course selections (with courses on the table) go to learning_path_generator
+- calendar confirmations go to calendar_agent
+
+Progress updates, challenges and anything unclear still go to the LLM, as
+does any turn classified below INTENT_ROUTER_MIN_CONFIDENCE. Turns continue
+through the normal ADK machinery: the router hands back the same
+transfer_to_agent call the model would have made.
+
+benchmarks/intent_router_benchmark.py measures accuracy and latency on a
+held-out labeled set, and on the set the rules were tuned on.
+get_router_stats() reports routed turns and LLM fallbacks.
+"""
+
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from google.adk.models import LlmResponse
+from google.genai import types
+from sub_agents.course_records import FOUND_COURSES_KEY
+from sub_agents.preference_extractor import REMEMBERED_PREFERENCES_KEY, extract_preferences
+
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1").lower() not in ("0", "false", "no")
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.9"))
+
+GREETING = "greeting"
+COURSE_REQUEST = "course_request"
+COURSE_SELECTION = "course_selection"
+CALENDAR_CONFIRM = "calendar_confirm"
+PROGRESS = "progress"
+CHALLENGE = "challenge"
+OTHER = "other"
+INTENTS = (GREETING, COURSE_REQUEST, COURSE_SELECTION, CALENDAR_CONFIRM, PROGRESS, CHALLENGE, OTHER)
+
+# Which intents each agent hands off locally, and to whom
+ROUTES = {
+    "root_agent": {
+        COURSE_REQUEST: "CourseFinderPipeline",
+        COURSE_SELECTION: "learning_path_generator",
+        CALENDAR_CONFIRM: "calendar_agent",
+    },
+    # After a learning path the user's next turn stays with learning_path_generator
+    "learning_path_generator": {CALENDAR_CONFIRM: "calendar_agent"},
+}
+# Agents that answer greetings themselves
+GREETING_AGENTS = {"root_agent"}
+
+GREETING_REPLIES = [
+    "Hey there! 👋 What would you like to learn today?",
+    "Hi! Great to see you! 😊 Ready to learn something new?",
+    "Hello! 👋 What are you interested in learning?",
+]
+RETURNING_GREETING_REPLIES = [
+    "Welcome back! 👋 Ready to keep learning? What would you like to work on today?",
+    "Hi again! 😊 Great to see you. Want to continue your plan or find something new to learn?",
+]
+
+# ----- rules -----
+
+_GREETING = re.compile(
+    r"^(?:hi+|hello+|hey+a?|hiya|howdy|yo|greetings|(?:good )?(?:morning|afternoon|evening)|what'?s up|sup)"
+    r"(?: there| coursebot| bot| again| everyone)?[\s!.,:)😊👋]*$"
+)
+_CALENDAR_WORDS = re.compile(r"\b(?:calendar|remind(?:er|ers)?|gcal|google cal)\b")
+_CALENDAR_ACTION = re.compile(
+    r"\b(?:add|put|schedule|set ?up|create|sync|save|book|block)\b.*\b(?:calendar|remind(?:er|ers)?|sessions?|events?)\b"
+    r"|\bremind me\b"
+)
+_AFFIRMATIVE = re.compile(
+    r"^(?:y(?:es|ep|eah|up)?|sure|ok(?:ay)?|please|absolutely|definitely|of course|sounds good|go ahead|"
+    r"do it|let'?s do (?:it|that)|yes please|please do|that would be great|perfect)"
+    r"(?:[\s,!.]+(?:please|thanks|thank you|do it|go ahead|sounds good|add it|let'?s do it))*[\s!.]*$"
+)
+_NEGATIVE = re.compile(r"\b(?:no|not|don'?t|dont|never|cancel|stop|later|without)\b")
+_SELECTION = re.compile(
+    r"\b(?:i'?ll take|i will take|i'?ll go with|i will go with|go with|let'?s (?:do|go with|start with)|"
+    r"i (?:choose|pick|want to (?:take|do|start))|i'?d like (?:to take|the)|sign me up for|start with|"
+    r"i'?m (?:going with|choosing)|enroll me in)\b"
+)
+_ORDINAL = re.compile(r"\b(?:first|second|third|fourth|fifth|last|1st|2nd|3rd|4th|5th|number [1-5]|option [1-5])\b|#\s?[1-5]\b")
+_PROGRESS = re.compile(
+    r"\b(?:completed|finished|done with|wrapped up|got through|made it through)\b.*"
+    r"\b(?:week|module|lesson|chapter|section|unit|course|part)\b"
+)
+_CHALLENGE = re.compile(
+    r"\b(?:stuck|struggling|struggle|hard|difficult|confus(?:ed|ing)|falling behind|behind schedule|overwhelmed|"
+    r"lost|frustrat(?:ed|ing)|can'?t keep up|too much|giving up|give up|no time)\b"
+)
+# Questions about the plan or the courses shown, which extract_preferences can mistake for a topic
+# ("change my study days to weekends", "how many hours is the crash course?")
+_NOT_A_REQUEST = re.compile(
+    r"\b(?:change|move|reschedule|explain|schedule|sessions?|plan|path|calendar|remind(?:er|ers)?|what(?: is|'s)|"
+    r"how (?:many|much|long)|which)\b"
+)
+# Questions are about the courses or the bot, or need the LLM to pick a search; never routed as requests
+_QUESTION = re.compile(
+    r"\?|^(?:what|which|who|whose|when|where|why|how|is|are|am|was|were|do|does|did|can|could|would|will|"
+    r"should|shall|may|might|has|have|had)\b"
+)
+# With courses already shown, only these ask for a new search
+_SEARCH_VERB = re.compile(r"\b(?:find|search|show me|look(?:ing)? for)\b")
+# Talking about several of the courses isn't picking one
+_COMPARISON = re.compile(r"\b(?:compare|comparing|difference|vs|versus|between|both|two|three|which|or)\b")
+_WORD = re.compile(r"[a-z0-9+#]+")
+_NAME_STOPWORDS = {"the", "and", "for", "from", "with", "into", "your", "to", "of", "a", "an", "in", "on", "s"}
+
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+def _names_course(message: str, course_names) -> bool:
+    """Whether the message names one of the offered courses (half its words, and at least two)."""
+    words = set(_words(message))
+    for name in course_names:
+        name_words = set(_words(name)) - _NAME_STOPWORDS
+        if name_words and len(words & name_words) >= max(min(2, len(name_words)), math.ceil(0.5 * len(name_words))):
+            return True
+    return False
+
+
+def _may_be_request(text: str, course_names) -> bool:
+    """Whether the turn may start a new course search (searching again after courses are shown is the LLM's call)."""
+    return not _QUESTION.search(text) and (not course_names or bool(_SEARCH_VERB.search(text)))
+
+
+def _rule_intent(text: str, last_reply: str, course_names) -> Optional[str]:
+    """High-precision rules; None when no rule is sure."""
+    if _GREETING.match(text):
+        return GREETING
+    if _CALENDAR_ACTION.search(text) and not _NEGATIVE.search(text):
+        return CALENDAR_CONFIRM
+    if _AFFIRMATIVE.match(text) and _CALENDAR_WORDS.search(last_reply.lower()):
+        return CALENDAR_CONFIRM
+    if _PROGRESS.search(text):
+        return PROGRESS
+    if _CHALLENGE.search(text):
+        return CHALLENGE
+    if course_names and not _NEGATIVE.search(text) and not _COMPARISON.search(text) and "?" not in text and (
+        _names_course(text, course_names) and (_SELECTION.search(text) or len(_words(text)) <= 8)
+        or _ORDINAL.search(text) and (_SELECTION.search(text) or len(_words(text)) <= 4)
+    ):
+        return COURSE_SELECTION
+    if not _NOT_A_REQUEST.search(text) and _may_be_request(text, course_names) and extract_preferences(text) is not None:
+        return COURSE_REQUEST
+    return None
+
+
+# ----- model -----
+
+# Phrasings the rules miss; the model generalizes from these. Don't copy
+# benchmark fixture turns here - the benchmark skips any that match
+TRAINING_EXAMPLES = [
+    (GREETING, "hi there"), (GREETING, "hello!"), (GREETING, "hey coursebot"), (GREETING, "good morning"),
+    (GREETING, "hey, how are you?"), (GREETING, "hi, nice to meet you"), (GREETING, "hello again"),
+    (GREETING, "howdy"), (GREETING, "hey hey"), (GREETING, "greetings!"),
+    (COURSE_REQUEST, "i want to learn python"), (COURSE_REQUEST, "can you recommend a course on data science"),
+    (COURSE_REQUEST, "find me some free javascript courses"), (COURSE_REQUEST, "looking for a beginner sql class"),
+    (COURSE_REQUEST, "any good machine learning courses?"), (COURSE_REQUEST, "teach me spanish"),
+    (COURSE_REQUEST, "i'd like to get into web development"), (COURSE_REQUEST, "suggest courses for learning guitar"),
+    (COURSE_REQUEST, "what are the best courses for excel"), (COURSE_REQUEST, "i need a course about public speaking"),
+    (COURSE_REQUEST, "show me photography tutorials"), (COURSE_REQUEST, "how can i learn to code"),
+    (COURSE_SELECTION, "i'll take the first one"), (COURSE_SELECTION, "let's go with the coursera course"),
+    (COURSE_SELECTION, "the second one looks good"), (COURSE_SELECTION, "i choose python for everybody"),
+    (COURSE_SELECTION, "sign me up for the udemy one"), (COURSE_SELECTION, "i want to do the edx course"),
+    (COURSE_SELECTION, "option 2 please"), (COURSE_SELECTION, "that harvard one sounds great, let's do it"),
+    (COURSE_SELECTION, "i'll start with the youtube course"), (COURSE_SELECTION, "the last one"),
+    (CALENDAR_CONFIRM, "yes add it to my calendar"), (CALENDAR_CONFIRM, "please set up the reminders"),
+    (CALENDAR_CONFIRM, "put the sessions in my google calendar"), (CALENDAR_CONFIRM, "yes please schedule it"),
+    (CALENDAR_CONFIRM, "create the calendar events"), (CALENDAR_CONFIRM, "sure, add the reminders"),
+    (CALENDAR_CONFIRM, "sync it with my calendar"), (CALENDAR_CONFIRM, "remind me before each session"),
+    (PROGRESS, "i finished week 1"), (PROGRESS, "just completed module 3"), (PROGRESS, "done with the first chapter"),
+    (PROGRESS, "i made it through lesson 5 today"), (PROGRESS, "week 2 is done!"), (PROGRESS, "halfway through the course now"),
+    (PROGRESS, "i passed the quiz for unit 4"), (PROGRESS, "finished all the videos this week"),
+    (CHALLENGE, "i'm stuck on recursion"), (CHALLENGE, "this is really hard"), (CHALLENGE, "i'm falling behind"),
+    (CHALLENGE, "i don't have time this week"), (CHALLENGE, "i feel lost in the lectures"),
+    (CHALLENGE, "the exercises are too difficult"), (CHALLENGE, "i keep missing my study sessions"),
+    (CHALLENGE, "i'm thinking about giving up"),
+    (OTHER, "what can you do?"), (OTHER, "how does this work"), (OTHER, "thanks!"), (OTHER, "thank you so much"),
+    (OTHER, "what did we talk about last time"), (OTHER, "how long is the python course?"),
+    (OTHER, "is the certificate worth it"), (OTHER, "can i change my study days to weekends"),
+    (OTHER, "tell me more about the second one"), (OTHER, "what's the difference between them"),
+    (OTHER, "bye"), (OTHER, "no thanks"),
+]
+
+
+def _features(text: str) -> list:
+    words = _words(text)
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over words and word pairs (add-one smoothing)."""
+
+    def __init__(self, examples: list):
+        self._counts = {intent: Counter() for intent in INTENTS}
+        documents = Counter()
+        for intent, text in examples:
+            self._counts[intent].update(_features(text))
+            documents[intent] += 1
+        self._vocabulary = set().union(*self._counts.values())
+        self._totals = {intent: sum(counts.values()) for intent, counts in self._counts.items()}
+        self._priors = {intent: math.log((documents[intent] + 1) / (len(examples) + len(INTENTS)))
+                        for intent in INTENTS}
+
+    def predict(self, text: str) -> tuple:
+        """Returns (intent, probability)."""
+        features = [f for f in _features(text) if f in self._vocabulary]
+        size = len(self._vocabulary)
+        scores = {
+            intent: self._priors[intent] + sum(
+                math.log((self._counts[intent][f] + 1) / (self._totals[intent] + size)) for f in features
+            )
+            for intent in INTENTS
+        }
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+
+_model = NaiveBayesIntentModel(TRAINING_EXAMPLES)
+
+
+class Intent(NamedTuple):
+    intent: str
+    confidence: float
+    source: str  # "rule" or "model"
+
+
+def classify_intent(message: str, last_reply: str = "", course_names=()) -> Intent:
+    """
+    Classifies a user turn without an LLM.
+
+    Args:
+        message: The user's message
+        last_reply: The assistant's previous message (a bare "yes" only
+            confirms the calendar if that offered it)
+        course_names: Names of the courses on the table, if any
+
+    Returns:
+        Intent(intent, confidence, source)
+    """
+    text = " ".join((message or "").lower().split())
+    if not text:
+        return Intent(OTHER, 1.0, "rule")
+    intent = _rule_intent(text, last_reply or "", course_names)
+    if intent is not None:
+        return Intent(intent, 1.0, "rule")
+    intent, probability = _model.predict(text)
+    # A coin toss between intents is the LLM's call
+    if probability < 0.5:
+        return Intent(OTHER, probability, "model")
+    # "Don't add it to my calendar" reads a lot like the opposite
+    if intent in (COURSE_SELECTION, CALENDAR_CONFIRM) and _NEGATIVE.search(text):
+        return Intent(OTHER, probability, "model")
+    # Without courses on the table (or a calendar offer) these can't be what the user means
+    if intent == COURSE_SELECTION and not course_names:
+        return Intent(OTHER, probability, "model")
+    if intent == CALENDAR_CONFIRM and not _CALENDAR_WORDS.search(text) and not _CALENDAR_WORDS.search(
+            (last_reply or "").lower()):
+        return Intent(OTHER, probability, "model")
+    if intent == COURSE_REQUEST and not _may_be_request(text, course_names):
+        return Intent(OTHER, probability, "model")
+    return Intent(intent, probability, "model")
+
+
+# ----- callback -----
+
+_stats_lock = threading.Lock()
+_stats = {"turns": 0, "routed": 0, "greetings_answered": 0, "llm_fallbacks": 0, "classify_seconds": 0.0}
+_routed_by_intent = Counter()
+
+
+def get_router_stats() -> dict:
+    """Returns routed turns (by intent), LLM fallbacks and the mean classification time."""
+    with _stats_lock:
+        stats = dict(_stats)
+        stats["routed_by_intent"] = dict(_routed_by_intent)
+    stats["routed_rate"] = (stats["routed"] + stats["greetings_answered"]) / stats["turns"] if stats["turns"] else 0.0
+    stats["avg_classify_us"] = stats.pop("classify_seconds") / stats["turns"] * 1e6 if stats["turns"] else 0.0
+    return stats
+
+
+def _text(content) -> str:
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _last_reply(session) -> str:
+    """The assistant's last message before the current user message."""
+    seen_user = False
+    for event in reversed(session.events):
+        if event.author == "user":
+            if seen_user:
+                break
+            seen_user = True
+            continue
+        if seen_user and event.content is not None and (text := _text(event.content)):
+            return text
+    return ""
+
+
+def _starts_turn(llm_request) -> bool:
+    """Whether this is the agent's first model call for the user's message (not a follow-up after a tool)."""
+    if not llm_request.contents:
+        return False
+    last = llm_request.contents[-1]
+    return last.role == "user" and not any(part.function_response for part in last.parts or [])
+
+
+def route_turn(callback_context, llm_request):
+    """
+    before_model_callback: answers greetings and hands confident turns to their sub-agent locally.
+
+    Returns an LlmResponse in place of the model's (a canned reply or a
+    transfer_to_agent call), or None to call the model.
+    """
+    agent = callback_context.agent_name
+    if not INTENT_ROUTER or agent not in ROUTES or not _starts_turn(llm_request):
+        return None
+
+    started = time.perf_counter()
+    message = _text(callback_context.user_content)
+    courses = callback_context.state.get(FOUND_COURSES_KEY) or []
+    result = classify_intent(
+        message,
+        last_reply=_last_reply(callback_context.session),
+        course_names=[course.get("name", "") for course in courses if isinstance(course, dict)],
+    )
+    target = ROUTES[agent].get(result.intent)
+    confident = result.confidence >= INTENT_ROUTER_MIN_CONFIDENCE
+
+    with _stats_lock:
+        _stats["turns"] += 1
+        _stats["classify_seconds"] += time.perf_counter() - started
+        if confident and result.intent == GREETING and agent in GREETING_AGENTS:
+            _stats["greetings_answered"] += 1
+        elif confident and target is not None:
+            _stats["routed"] += 1
+            _routed_by_intent[result.intent] += 1
+        else:
+            _stats["llm_fallbacks"] += 1
+            return None
+
+    if target is None:
+        returning = bool(callback_context.state.get(REMEMBERED_PREFERENCES_KEY))
+        reply = random.choice(RETURNING_GREETING_REPLIES if returning else GREETING_REPLIES)
+        print(f"⚡ Greeting answered locally ({result.source})")
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=reply)]))
+
+    print(f"⚡ Routed locally: {result.intent} → {target} ({result.source}, {result.confidence:.2f})")
+    return LlmResponse(content=types.Content(role="model", parts=[
+        types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": target}))
+    ]))
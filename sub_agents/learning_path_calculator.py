@@ -0,0 +1,172 @@
+# sub_agents/learning_path_calculator.py
+
+"""
+Deterministic learning-path calculator for learning_path_generator.
+
+Computes the timeline (weeks including one buffer week), the hours per
+session and a week-by-week skeleton from the course duration and the
+user's weekly hours, study days and start time. The LLM only fills in
+topic names. The result also carries the exact study_schedule that
+create_study_reminders takes, and is stored in session state so
+calendar_agent reads it directly instead of re-parsing the learning path
+text.
+"""
+
+import math
+import re
+
+from google.adk.tools import FunctionTool, ToolContext
+from sub_agents.study_planner import DAY_MAP, DAY_NAMES
+
+STUDY_PLAN_KEY = "study_plan"
+
+# Weeks added after the course content for review and catching up
+BUFFER_WEEKS = 1
+# Session lengths are rounded to this many hours (15 minutes)
+SESSION_STEP_HOURS = 0.25
+
+DAY_ALIASES = {
+    "mon": "Monday", "tue": "Tuesday", "tues": "Tuesday", "wed": "Wednesday", "thu": "Thursday",
+    "thur": "Thursday", "thurs": "Thursday", "fri": "Friday", "sat": "Saturday", "sun": "Sunday",
+}
+DAY_GROUPS = {"weekend": ["Saturday", "Sunday"], "weekends": ["Saturday", "Sunday"]}
+
+_TIME_PATTERN = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?\s*m?\.?$")
+
+
+def normalize_days(days) -> list:
+    """
+    Maps day names ("sat", "Saturdays", "weekends") to weekday names in week order.
+
+    Raises:
+        ValueError: For unknown or vague days ("weekdays", "flexible")
+    """
+    if isinstance(days, str):
+        days = re.split(r"\s*(?:,|&|\band\b|/)\s*", days)
+    names = []
+    for day in days:
+        key = day.strip().lower().rstrip(".")
+        if not key:
+            continue
+        if key in DAY_GROUPS:
+            names.extend(DAY_GROUPS[key])
+            continue
+        key = key[:-1] if key.endswith("s") and key[:-1].title() in DAY_MAP else key
+        name = key.title() if key.title() in DAY_MAP else DAY_ALIASES.get(key)
+        if name is None:
+            raise ValueError(f"Unknown study day '{day}'. Ask for exact days: {', '.join(DAY_NAMES)}")
+        names.append(name)
+    if not names:
+        raise ValueError("No study days given")
+    return sorted(set(names), key=DAY_MAP.get)
+
+
+def normalize_start_time(value: str) -> str:
+    """
+    Normalizes "9am", "7:30 PM", "19:30" or "noon" to "9:00 AM" style.
+
+    Raises:
+        ValueError: For vague or invalid times ("mornings", "25:00")
+    """
+    text = str(value or "").strip().lower()
+    if text == "noon":
+        text = "12pm"
+    match = _TIME_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Unclear study time '{value}'. Ask for an exact time like 9:00 AM or 7:00 PM")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if minute > 59 or (meridiem and not 1 <= hour <= 12) or (not meridiem and hour > 23):
+        raise ValueError(f"Invalid study time '{value}'")
+    if meridiem is None:
+        meridiem, hour = ("p" if hour >= 12 else "a"), (hour % 12 or 12)
+    return f"{hour}:{minute:02d} {meridiem.upper()}M"
+
+
+def calculate_timeline(total_hours: float, weekly_hours: float, days: list, start_time: str) -> dict:
+    """
+    Computes the study timeline; see calculate_learning_path for the result.
+
+    Raises:
+        ValueError: For non-positive hours, unknown days or an unclear time
+    """
+    if not total_hours or total_hours <= 0:
+        raise ValueError("Course duration must be a positive number of hours")
+    if not weekly_hours or weekly_hours <= 0:
+        raise ValueError("Weekly study hours must be a positive number")
+
+    days = normalize_days(days)
+    start_time = normalize_start_time(start_time)
+    hours_per_session = max(SESSION_STEP_HOURS, round(weekly_hours / len(days) / SESSION_STEP_HOURS) * SESSION_STEP_HOURS)
+    # The timeline follows the hours actually scheduled, so it matches the calendar
+    scheduled_weekly_hours = hours_per_session * len(days)
+    content_weeks = math.ceil(round(total_hours / scheduled_weekly_hours, 6))
+    total_weeks = content_weeks + BUFFER_WEEKS
+
+    weeks = []
+    done = 0.0
+    for week in range(1, total_weeks + 1):
+        if week <= content_weeks:
+            hours = min(scheduled_weekly_hours, total_hours - done)
+            done += hours
+            weeks.append({"week": week, "focus": "course", "course_hours": round(hours, 2),
+                          "percent_complete": round(100 * done / total_hours)})
+        else:
+            weeks.append({"week": week, "focus": "review", "course_hours": 0, "percent_complete": 100})
+
+    return {
+        "total_hours": total_hours,
+        "weekly_hours": scheduled_weekly_hours,
+        "hours_per_session": hours_per_session,
+        "sessions_per_week": len(days),
+        "content_weeks": content_weeks,
+        "total_weeks": total_weeks,
+        "study_days": days,
+        "start_time": start_time,
+        "study_schedule": [
+            {"day": day, "start_time": start_time, "duration_hours": hours_per_session} for day in days
+        ],
+        "weeks": weeks,
+    }
+
+
+def calculate_learning_path(
+    course_name: str,
+    duration_hours: float,
+    weekly_hours: float,
+    days: list[str],
+    start_time: str,
+    tool_context: ToolContext = None
+) -> dict:
+    """
+    Calculates the learning path timeline. Use its numbers exactly - don't recompute them.
+
+    Args:
+        course_name: Name of the selected course
+        duration_hours: Total course duration in hours (your estimate if unknown)
+        weekly_hours: Hours per week the user can study
+        days: Exact study days, e.g. ["Saturday", "Sunday"]
+        start_time: Exact study time, e.g. "9:00 AM"
+
+    Returns:
+        Dictionary with total_weeks (including one review week),
+        hours_per_session, a "weeks" skeleton (course hours and progress per
+        week; the last week is review) and the study_schedule for the calendar
+    """
+    try:
+        timeline = calculate_timeline(duration_hours, weekly_hours, days, start_time)
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+
+    if tool_context is not None:
+        # What create_study_reminders needs, for calendar_agent's prompt
+        tool_context.state[STUDY_PLAN_KEY] = {
+            "course_name": course_name,
+            "total_weeks": timeline["total_weeks"],
+            "hours_per_session": timeline["hours_per_session"],
+            "study_schedule": timeline["study_schedule"],
+        }
+    return {"status": "success", "course_name": course_name, **timeline}
+
+
+# Create the ADK FunctionTool
+learning_path_tool = FunctionTool(calculate_learning_path)
@@ -0,0 +1,230 @@
+# sub_agents/link_checker.py
+
+"""
+Link-health stage of CourseFinderPipeline.
+
+Runs between search_agent and ranking_agent: re-canonicalizes the found
+course URLs, checks that they still resolve and drops dead links, so the
+ranker never spends tokens on (and users never see) a broken course link.
+
+- Checks run concurrently (LINK_CHECK_CONCURRENCY) through one pooled
+  keep-alive HTTP session, with tight connect/read timeouts and a deadline
+  for the whole stage (LINK_CHECK_DEADLINE).
+- HEAD first; servers that refuse HEAD get a GET whose body is never read.
+- Results are cached per URL for LINK_CHECK_TTL seconds (LINK_CHECK_UNKNOWN_TTL
+  for inconclusive ones).
+- Only definite failures count as dead: 404/410, a redirect to a homepage or
+  an unknown host. Timeouts, rate limits and bot walls (401/403/429/5xx)
+  are "unknown" and the course is kept.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator
+
+import requests
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NameResolutionError
+from sub_agents.course_records import FOUND_COURSES_KEY, canonical_url, is_specific_url, validate_course_records
+
+LINK_CHECK_CONCURRENCY = int(os.getenv("LINK_CHECK_CONCURRENCY", "16"))
+LINK_CHECK_CONNECT_TIMEOUT = float(os.getenv("LINK_CHECK_CONNECT_TIMEOUT", "2"))
+LINK_CHECK_READ_TIMEOUT = float(os.getenv("LINK_CHECK_READ_TIMEOUT", "3"))
+# Seconds the whole stage may take; links still being checked then count as unknown
+LINK_CHECK_DEADLINE = float(os.getenv("LINK_CHECK_DEADLINE", "6"))
+LINK_CHECK_TTL = float(os.getenv("LINK_CHECK_TTL", str(6 * 3600)))
+LINK_CHECK_UNKNOWN_TTL = float(os.getenv("LINK_CHECK_UNKNOWN_TTL", "600"))
+LINK_CHECK_MAX_ENTRIES = int(os.getenv("LINK_CHECK_MAX_ENTRIES", "50000"))
+
+ALIVE = "alive"
+DEAD = "dead"
+UNKNOWN = "unknown"
+
+DEAD_STATUSES = (404, 410)
+# Servers answering HEAD with these may still serve the page to a GET
+HEAD_REFUSED_STATUSES = (403, 405, 501)
+
+USER_AGENT = "Mozilla/5.0 (compatible; course-finder/1.0)"
+
+
+class LinkChecker:
+    """
+    Thread-safe, cached URL health checker on a pooled keep-alive session.
+
+    check_url is blocking (one URL); check_many runs many checks on the
+    checker's thread pool from async code.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = LINK_CHECK_CONCURRENCY,
+        connect_timeout: float = LINK_CHECK_CONNECT_TIMEOUT,
+        read_timeout: float = LINK_CHECK_READ_TIMEOUT,
+        ttl: float = LINK_CHECK_TTL,
+        unknown_ttl: float = LINK_CHECK_UNKNOWN_TTL,
+        max_entries: int = LINK_CHECK_MAX_ENTRIES,
+        session: requests.Session = None
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.ttl = ttl
+        self.unknown_ttl = unknown_ttl
+        self.max_entries = max_entries
+        if session is None:
+            session = requests.Session()
+            # One connection pool per host, big enough for every worker thread
+            adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        self.session = session
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="link-check")
+        self._lock = threading.Lock()
+        # url -> (status, final url, expires_at)
+        self._cache = OrderedDict()
+        self._stats = {"checks": 0, "cache_hits": 0, ALIVE: 0, DEAD: 0, UNKNOWN: 0}
+
+    def _cached(self, url: str) -> tuple:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is None or entry[2] < time.monotonic():
+                return None
+            self._cache.move_to_end(url)
+            self._stats["cache_hits"] += 1
+            return entry[:2]
+
+    def _fetch(self, url: str) -> tuple:
+        """One HTTP check. Returns (status, final url)."""
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            if response.status_code in HEAD_REFUSED_STATUSES:
+                response = self.session.get(url, allow_redirects=True, timeout=self.timeout, stream=True)
+                response.close()
+        except requests.ConnectionError as e:
+            reason = getattr(e.args[0], "reason", None) if e.args else None
+            if isinstance(reason, NameResolutionError) and not isinstance(e, requests.Timeout):
+                return DEAD, url
+            return UNKNOWN, url
+        except requests.RequestException:
+            return UNKNOWN, url
+
+        final_url = canonical_url(response.url)
+        if response.status_code in DEAD_STATUSES:
+            return DEAD, final_url
+        if response.status_code >= 400:
+            return UNKNOWN, final_url
+        if not is_specific_url(final_url) and is_specific_url(canonical_url(url)):
+            # Removed courses usually redirect to the platform's homepage
+            return DEAD, final_url
+        return ALIVE, final_url
+
+    def check_url(self, url: str) -> tuple:
+        """
+        Checks one URL (blocking), from the cache when possible.
+
+        Returns:
+            tuple: (ALIVE, DEAD or UNKNOWN, final URL after redirects)
+        """
+        cached = self._cached(url)
+        if cached is not None:
+            return cached
+
+        status, final_url = self._fetch(url)
+        expires_at = time.monotonic() + (self.unknown_ttl if status == UNKNOWN else self.ttl)
+        with self._lock:
+            self._stats["checks"] += 1
+            self._stats[status] += 1
+            self._cache[url] = (status, final_url, expires_at)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return status, final_url
+
+    async def check_many(self, urls: list, deadline: float = LINK_CHECK_DEADLINE) -> dict:
+        """
+        Checks URLs concurrently.
+
+        Args:
+            urls: URLs to check (duplicates are checked once)
+            deadline: Seconds to wait; checks still running then are UNKNOWN
+                (they finish in the background and fill the cache)
+
+        Returns:
+            dict: URL -> ALIVE, DEAD or UNKNOWN
+        """
+        loop = asyncio.get_running_loop()
+        results = {}
+        futures = {}
+        for url in dict.fromkeys(urls):
+            cached = self._cached(url)
+            if cached is not None:
+                results[url] = cached[0]
+            else:
+                futures[url] = loop.run_in_executor(self._executor, self.check_url, url)
+        if futures:
+            await asyncio.wait(futures.values(), timeout=deadline)
+        for url, future in futures.items():
+            results[url] = future.result()[0] if future.done() and not future.exception() else UNKNOWN
+        return results
+
+    def get_stats(self) -> dict:
+        """Returns check/cache counters and the number of cached URLs."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_urls"] = len(self._cache)
+        return stats
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_link_checker() -> LinkChecker:
+    """Returns the process-wide link checker (created on first use)."""
+    global _checker
+    if _checker is None:
+        with _checker_lock:
+            if _checker is None:
+                _checker = LinkChecker()
+    return _checker
+
+
+def set_link_checker(checker: LinkChecker):
+    """Replaces the process-wide link checker (e.g. one pointed at a stub server)."""
+    global _checker
+    _checker = checker
+
+
+class DeadLinkFilter(BaseAgent):
+    """Drops found courses whose URL is dead (no LLM call)."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        records = validate_course_records(ctx.session.state.get(FOUND_COURSES_KEY) or [], dedupe_titles=True)
+        if not records:
+            return
+
+        started = time.perf_counter()
+        statuses = await get_link_checker().check_many([record["url"] for record in records])
+        alive = [record for record in records if statuses[record["url"]] != DEAD]
+        dead = len(records) - len(alive)
+        print(f"🔗 Checked {len(records)} course links in {time.perf_counter() - started:.2f}s"
+              + (f" - dropped {dead} dead" if dead else ""))
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={FOUND_COURSES_KEY: alive}),
+        )
+
+
+link_checker = DeadLinkFilter(
+    name="link_checker",
+    description="Drops courses with dead links before ranking",
+)
@@ -0,0 +1,212 @@
+# sub_agents/memory_cache.py
+
+"""
+Per-user cache of Memory Bank retrievals.
+
+PreloadMemoryTool queries the Memory Bank before every LLM call of every
+agent that has it. A user's memories are a handful of short facts that
+only change when this app saves new ones, so they are fetched once per
+user and then served from memory:
+
+- The first lookup for a user retrieves the memories for the current
+  message and for a broad profile query (preferences, courses, schedule)
+  together, and caches the merged set for MEMORY_CACHE_TTL seconds.
+  Later lookups - any message, any agent - rank the cached memories
+  locally, so repeated turns make no remote memory calls.
+- LRU-bounded to MEMORY_CACHE_MAX_USERS users; concurrent misses for one
+  user share a single fetch.
+- memory_writer invalidates a user's entry after saving their session.
+- With MEMORY_CACHE_PREFETCH, root_agent starts the fetch at session start.
+
+get_memory_cache_stats() reports hits, misses, remote calls and bytes held.
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from sub_agents.memory_writer import get_memory_writer
+
+MEMORY_CACHE_TTL = float(os.getenv("MEMORY_CACHE_TTL", "600"))
+MEMORY_CACHE_MAX_USERS = int(os.getenv("MEMORY_CACHE_MAX_USERS", "1000"))
+MEMORY_CACHE_MAX_RESULTS = int(os.getenv("MEMORY_CACHE_MAX_RESULTS", "20"))
+MEMORY_CACHE_PREFETCH = os.getenv("MEMORY_CACHE_PREFETCH", "1").lower() not in ("0", "false", "no")
+
+# Retrieved alongside the first message so the cached set covers what the agents ask about
+PROFILE_QUERY = "the user's learning preferences, skill level, budget, study schedule, courses and progress"
+
+
+def _memory_text(memory) -> str:
+    if memory.content is None or not memory.content.parts:
+        return ""
+    return " ".join(part.text for part in memory.content.parts if part.text)
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9+#]+", text.lower()))
+
+
+class MemoryCache:
+    """LRU + TTL cache of each user's retrieved memories."""
+
+    def __init__(
+        self,
+        ttl: float = MEMORY_CACHE_TTL,
+        max_users: int = MEMORY_CACHE_MAX_USERS,
+        max_results: int = MEMORY_CACHE_MAX_RESULTS
+    ):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.max_results = max_results
+        self._entries = OrderedDict()  # (app_name, user_id) -> (memories, fetched_at, size_bytes)
+        self._fetches = {}  # (app_name, user_id) -> task fetching them
+        self._versions = {}  # bumped on invalidation, so an older fetch isn't cached
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "remote_calls": 0, "invalidations": 0, "prefetches": 0}
+
+    def _fresh(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def _fetch(self, key: tuple, context, query: str) -> list:
+        version = self._versions.get(key, 0)
+        queries = list(dict.fromkeys(q for q in (query, PROFILE_QUERY) if q))
+        self._stats["remote_calls"] += len(queries)
+        responses = await asyncio.gather(*(context.search_memory(q) for q in queries))
+
+        memories, seen = [], set()
+        for response in responses:
+            for memory in response.memories:
+                text = _memory_text(memory)
+                if text and text not in seen:
+                    seen.add(text)
+                    memories.append(memory)
+
+        if self._versions.get(key, 0) == version:
+            size = sum(len(_memory_text(m).encode("utf-8")) + len(m.timestamp or "") for m in memories)
+            self._entries[key] = (memories, time.monotonic(), size)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return memories
+
+    def _start_fetch(self, key: tuple, context, query: str) -> asyncio.Task:
+        task = self._fetches.get(key)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._fetch(key, context, query))
+            self._fetches[key] = task
+            task.add_done_callback(lambda done: self._fetches.pop(key, None) if self._fetches.get(key) is done else None)
+        return task
+
+    def _rank(self, memories: list, query: str) -> list:
+        """Most relevant first (shared words with the query), then in retrieval order."""
+        if len(memories) <= self.max_results:
+            return memories
+        words = _words(query)
+        ranked = sorted(
+            enumerate(memories),
+            key=lambda item: (-len(words & _words(_memory_text(item[1]))), item[0]),
+        )
+        return [memory for _, memory in ranked[:self.max_results]]
+
+    async def search(self, context, query: str) -> SearchMemoryResponse:
+        """
+        Memories for the user of `context` (a ToolContext/CallbackContext), from the cache when fresh.
+
+        Raises:
+            Whatever the memory service raises on a miss
+        """
+        key = (context.session.app_name, context.user_id)
+        self._stats["lookups"] += 1
+        memories = self._fresh(key)
+        if memories is not None:
+            self._stats["hits"] += 1
+        else:
+            self._stats["misses"] += 1
+            memories = await asyncio.shield(self._start_fetch(key, context, query))
+        return SearchMemoryResponse(memories=self._rank(memories, query))
+
+    def prefetch(self, context):
+        """Starts fetching the user's memories in the background, unless cached or in flight."""
+        key = (context.session.app_name, context.user_id)
+        if self._fresh(key) is None and key not in self._fetches:
+            self._stats["prefetches"] += 1
+            task = self._start_fetch(key, context, "")
+            # A failed prefetch just means the first lookup fetches again
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    def invalidate(self, app_name: str, user_id: str):
+        """Drops the user's cached memories (after this process saved new ones)."""
+        key = (app_name, user_id)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if self._entries.pop(key, None) is not None:
+            self._stats["invalidations"] += 1
+
+    def get_stats(self) -> dict:
+        """Returns hit/miss/remote-call counters, hit rate, users and bytes held."""
+        stats = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        stats["users"] = len(self._entries)
+        stats["bytes"] = sum(entry[2] for entry in self._entries.values())
+        return stats
+
+
+_cache = MemoryCache()
+
+
+def get_memory_cache() -> MemoryCache:
+    """Returns the process-wide memory cache."""
+    return _cache
+
+
+def set_memory_cache(cache: MemoryCache):
+    """Replaces the process-wide memory cache."""
+    global _cache
+    _cache = cache
+
+
+def get_memory_cache_stats() -> dict:
+    """Returns the process-wide memory cache's stats."""
+    return _cache.get_stats()
+
+
+get_memory_writer().add_listener(lambda app_name, user_id: _cache.invalidate(app_name, user_id))
+
+
+class _CachedMemoryContext:
+    """The two ToolContext members PreloadMemoryTool uses, with search_memory going through the cache."""
+
+    def __init__(self, tool_context):
+        self._tool_context = tool_context
+        self.user_content = tool_context.user_content
+
+    async def search_memory(self, query: str) -> SearchMemoryResponse:
+        return await _cache.search(self._tool_context, query)
+
+
+class CachedPreloadMemoryTool(PreloadMemoryTool):
+    """PreloadMemoryTool that reads the user's memories through the process-wide MemoryCache."""
+
+    async def process_llm_request(self, *, tool_context, llm_request) -> None:
+        await super().process_llm_request(tool_context=_CachedMemoryContext(tool_context), llm_request=llm_request)
+
+
+def prefetch_memories(callback_context):
+    """before_agent_callback for root_agent: warms the memory cache on a session's first turn."""
+    if not MEMORY_CACHE_PREFETCH:
+        return None
+    try:
+        if len(callback_context.session.events) <= 1:
+            _cache.prefetch(callback_context)
+    except Exception as e:
+        print(f"⚠️ Memory prefetch failed: {e}")
+    return None
+
+
+preload_memory_tool = CachedPreloadMemoryTool()
@@ -0,0 +1,302 @@
+# sub_agents/memory_writer.py
+
+"""
+Write-behind Memory Bank persistence.
+
+root_agent's after_agent_callback used to await add_session_to_memory on
+every turn, re-sending the whole (growing) session and adding that latency
+to every reply. Now the callback only queues the session; a background
+worker on the event loop saves it later:
+
+- Saves are coalesced per session and debounced: a session is saved once it
+  has been quiet for MEMORY_SAVE_DEBOUNCE seconds, at the latest
+  MEMORY_SAVE_MAX_DELAY seconds after its first unsaved event, or right away
+  once MEMORY_SAVE_MAX_EVENTS events are waiting.
+- Only the events added since the last save are sent (add_events_to_memory);
+  services that can't take deltas get the whole session.
+- Failed saves are retried with exponential backoff; the events stay queued
+  until a save succeeds.
+- flush() saves everything now. MemoryFlushPlugin (registered on the app in
+  agent.py) calls it when a session ends - ADK has no session-end hook, so
+  a user's earlier sessions are flushed once they start a new one - and
+  when the server shuts down, from the runner close in the server's
+  lifespan, on the serving event loop (uvicorn runs it on SIGTERM too).
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+MEMORY_SAVE_DEBOUNCE = float(os.getenv("MEMORY_SAVE_DEBOUNCE", "20"))
+MEMORY_SAVE_MAX_DELAY = float(os.getenv("MEMORY_SAVE_MAX_DELAY", "120"))
+MEMORY_SAVE_MAX_EVENTS = int(os.getenv("MEMORY_SAVE_MAX_EVENTS", "20"))
+MEMORY_SAVE_RETRIES = int(os.getenv("MEMORY_SAVE_RETRIES", "3"))
+MEMORY_SAVE_RETRY_DELAY = float(os.getenv("MEMORY_SAVE_RETRY_DELAY", "2"))
+# Sessions whose save cursor is remembered; the oldest idle ones are forgotten
+MEMORY_SAVE_MAX_SESSIONS = int(os.getenv("MEMORY_SAVE_MAX_SESSIONS", "10000"))
+# Time the shutdown flush gets; ADK's Runner gives a plugin's close() 5s by default
+MEMORY_FLUSH_TIMEOUT = float(os.getenv("MEMORY_FLUSH_TIMEOUT", "4.5"))
+
+
+class _SessionSaves:
+    """Save state of one session."""
+
+    __slots__ = ("memory_service", "session", "saved_events", "first_pending_at", "last_event_at",
+                 "attempts", "retry_at", "saving")
+
+    def __init__(self, memory_service, session):
+        self.memory_service = memory_service
+        self.session = session
+        self.saved_events = 0  # events already in the Memory Bank
+        self.first_pending_at = None
+        self.last_event_at = None
+        self.attempts = 0
+        self.retry_at = None
+        self.saving = None  # task while a save is in flight
+
+    def unsaved(self) -> int:
+        total = len(self.session.events)
+        # A rewound session restarts from scratch
+        return total - self.saved_events if total >= self.saved_events else total
+
+
+class MemoryWriteBehind:
+    """Coalescing, debounced background saver of sessions to a memory service."""
+
+    def __init__(
+        self,
+        debounce: float = MEMORY_SAVE_DEBOUNCE,
+        max_delay: float = MEMORY_SAVE_MAX_DELAY,
+        max_events: int = MEMORY_SAVE_MAX_EVENTS,
+        max_retries: int = MEMORY_SAVE_RETRIES,
+        retry_delay: float = MEMORY_SAVE_RETRY_DELAY,
+        max_sessions: int = MEMORY_SAVE_MAX_SESSIONS
+    ):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_events = max_events
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_sessions = max_sessions
+
+        self._sessions = OrderedDict()  # (app_name, user_id, session_id) -> _SessionSaves
+        self._listeners = []
+        self._loop = None
+        self._worker = None
+        self._wakeup = None
+        self._stats = {
+            "scheduled": 0,
+            "saves": 0,
+            "events_saved": 0,
+            "full_session_saves": 0,
+            "retries": 0,
+            "failures": 0,
+        }
+
+    def add_listener(self, callback):
+        """Calls callback(app_name, user_id) after every successful save."""
+        self._listeners.append(callback)
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    def schedule(self, memory_service, session):
+        """
+        Queues a save of the session's new events. Returns immediately.
+
+        Must be called from the event loop (e.g. an agent callback).
+        """
+        key = (session.app_name, session.user_id, session.id)
+        entry = self._sessions.get(key)
+        if entry is None:
+            entry = self._sessions[key] = _SessionSaves(memory_service, session)
+        # Session services may hand out a fresh copy per invocation
+        entry.memory_service, entry.session = memory_service, session
+        self._sessions.move_to_end(key)
+        self._forget_idle_sessions()
+        if not entry.unsaved():
+            return
+
+        now = asyncio.get_running_loop().time()
+        if entry.first_pending_at is None:
+            entry.first_pending_at = now
+        entry.last_event_at = now
+        self._stats["scheduled"] += 1
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def _forget_idle_sessions(self):
+        while len(self._sessions) > self.max_sessions:
+            key, entry = next(iter(self._sessions.items()))
+            if entry.first_pending_at is not None or entry.saving is not None:
+                break
+            del self._sessions[key]
+
+    def _due_at(self, entry: _SessionSaves):
+        """Loop time the entry's save is due at, or None if nothing is waiting."""
+        if entry.saving is not None or entry.first_pending_at is None or not entry.unsaved():
+            return None
+        if entry.retry_at is not None:
+            return entry.retry_at
+        if entry.unsaved() >= self.max_events:
+            return entry.last_event_at
+        return min(entry.last_event_at + self.debounce, entry.first_pending_at + self.max_delay)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            next_due = None
+            for key, entry in list(self._sessions.items()):
+                due_at = self._due_at(entry)
+                if due_at is None:
+                    continue
+                if due_at <= now:
+                    entry.saving = loop.create_task(self._save(key, entry))
+                elif next_due is None or due_at < next_due:
+                    next_due = due_at
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if next_due is None else next_due - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _save(self, key: tuple, entry: _SessionSaves):
+        loop = asyncio.get_running_loop()
+        events = list(entry.session.events)
+        start = entry.saved_events if entry.saved_events <= len(events) else 0
+        new_events = events[start:]
+        app_name, user_id, session_id = key
+        try:
+            try:
+                await entry.memory_service.add_events_to_memory(
+                    app_name=app_name, user_id=user_id, events=new_events, session_id=session_id
+                )
+            except NotImplementedError:
+                await entry.memory_service.add_session_to_memory(entry.session)
+                self._stats["full_session_saves"] += 1
+
+            entry.saved_events = len(events)
+            entry.attempts, entry.retry_at = 0, None
+            # Events that arrived during the save wait for the next round
+            entry.first_pending_at = loop.time() if entry.unsaved() else None
+            self._stats["saves"] += 1
+            self._stats["events_saved"] += len(new_events)
+            print(f"💾 Memories saved ({len(new_events)} new events)")
+            for listener in self._listeners:
+                listener(app_name, user_id)
+        except Exception as e:
+            entry.attempts += 1
+            if entry.attempts <= self.max_retries:
+                self._stats["retries"] += 1
+                entry.retry_at = loop.time() + self.retry_delay * 2 ** (entry.attempts - 1)
+            else:
+                # Keep the events queued, but back off until the next max_delay
+                self._stats["failures"] += 1
+                entry.attempts, entry.retry_at = 0, loop.time() + self.max_delay
+            print(f"⚠️ Memory save failed (attempt {entry.attempts or self.max_retries + 1}): {e}")
+        finally:
+            entry.saving = None
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def flush(self, session_id: str = None):
+        """
+        Saves every queued session (or just session_id) now and waits for it.
+
+        Call when a session ends or before shutdown. A failed save stays
+        queued for the background retries.
+        """
+        await self._flush([key for key in self._sessions if session_id is None or key[2] == session_id])
+
+    async def _flush(self, keys: list):
+        async def flush_one(key):
+            entry = self._sessions.get(key)
+            if entry is None:
+                return
+            if entry.saving is not None:
+                await asyncio.shield(entry.saving)
+            if entry.first_pending_at is not None and entry.unsaved():
+                entry.saving = asyncio.get_running_loop().create_task(self._save(key, entry))
+                await asyncio.shield(entry.saving)
+
+        await asyncio.gather(*(flush_one(key) for key in keys))
+
+    def ended_sessions(self, app_name: str, user_id: str, session_id: str) -> list:
+        """
+        Keys of the user's other sessions with queued events, when session_id
+        is one this writer hasn't seen yet (the user started a new session).
+        """
+        if (app_name, user_id, session_id) in self._sessions:
+            return []
+        return [key for key, entry in self._sessions.items()
+                if key[:2] == (app_name, user_id) and entry.first_pending_at is not None and entry.unsaved()]
+
+    async def end_sessions(self, keys: list):
+        """Saves the given sessions now and forgets the ones fully saved."""
+        await self._flush(keys)
+        for key in keys:
+            entry = self._sessions.get(key)
+            if entry is not None and entry.saving is None and not entry.unsaved():
+                del self._sessions[key]
+
+    def pending_sessions(self) -> int:
+        return sum(1 for entry in self._sessions.values() if entry.first_pending_at is not None and entry.unsaved())
+
+    def get_stats(self) -> dict:
+        """Returns save/retry/failure counters and the number of sessions waiting."""
+        stats = dict(self._stats)
+        stats["pending_sessions"] = self.pending_sessions()
+        return stats
+
+
+_writer = MemoryWriteBehind()
+
+
+def get_memory_writer() -> MemoryWriteBehind:
+    """Returns the process-wide memory writer."""
+    return _writer
+
+
+def set_memory_writer(writer: MemoryWriteBehind):
+    """Replaces the process-wide memory writer (e.g. one with short delays in benchmarks)."""
+    global _writer
+    _writer = writer
+
+
+
+class MemoryFlushPlugin(BasePlugin):
+    """Flushes a user's queued memories when their session ends, and everything on shutdown."""
+
+    def __init__(self, name: str = "memory_flush", timeout: float = MEMORY_FLUSH_TIMEOUT):
+        super().__init__(name=name)
+        self.timeout = timeout
+        self._ending = set()  # end_sessions tasks still running
+
+    async def before_run_callback(self, *, invocation_context):
+        session = invocation_context.session
+        writer = get_memory_writer()
+        ended = writer.ended_sessions(session.app_name, session.user_id, session.id)
+        if ended:
+            # In the background, so the first reply of the new session isn't delayed
+            task = asyncio.get_running_loop().create_task(writer.end_sessions(ended))
+            self._ending.add(task)
+            task.add_done_callback(self._ending.discard)
+        return None
+
+    async def close(self):
+        """Called by Runner.close() on the serving loop, e.g. in the server's shutdown lifespan."""
+        writer = get_memory_writer()
+        try:
+            await asyncio.wait_for(writer.flush(), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Memory save on shutdown timed out, {writer.pending_sessions()} sessions not saved")
+        except Exception as e:
+            print(f"⚠️ Memory save on shutdown failed: {e}")
@@ -0,0 +1,182 @@
+# sub_agents/plan_registry.py
+
+"""
+Persistent registry of the study plans put on each user's calendar.
+
+create_study_reminders records every plan it writes here. That covers the
+arguments it was created with and, for each session, its times and the IDs
+of its reminder and study events. calendar_plans can then cancel or
+reschedule a plan with batched deletes and patches on exactly the events
+involved, without listing or re-creating the calendar.
+
+A recurring series is one entry: its first session's times, plus how many
+weekly sessions it has. A single session is an entry with one session.
+Entry times are naive wall-clock times in the plan's timezone, like
+study_planner's.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sub_agents.calendar_quota import calendar_user
+from sub_agents.study_planner import make_plan_id
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAN_REGISTRY_PATH = os.getenv("PLAN_REGISTRY_PATH", os.path.join(_PROJECT_ROOT, "plan_registry.sqlite3"))
+
+ACTIVE = "active"
+CANCELLED = "cancelled"
+
+# params: create_study_reminders' arguments (total_weeks, study_schedule,
+# start_date, reminder_time, timezone, recurring), plus "slot_changes":
+# [[day, session], ...] applied since (see study_planner.replace_slot)
+PlanRecord = namedtuple("PlanRecord", ["plan_id", "course_name", "params", "status", "entries", "updated_at"])
+
+# One session, or a weekly series of `occurrences` sessions starting in `week`
+PlanEntry = namedtuple("PlanEntry", [
+    "week", "slot", "occurrences", "study_start", "study_end",
+    "reminder_start", "reminder_end", "reminder_event_id", "study_event_id",
+])
+
+_TIME_FIELDS = ("study_start", "study_end", "reminder_start", "reminder_end")
+
+
+def _entry_row(user_id: str, plan_id: str, entry: PlanEntry) -> tuple:
+    return (user_id, plan_id, entry.week, entry.slot, entry.occurrences,
+            *(getattr(entry, field).isoformat() for field in _TIME_FIELDS),
+            entry.reminder_event_id, entry.study_event_id)
+
+
+def _row_entry(row: tuple) -> PlanEntry:
+    week, slot, occurrences, *times, reminder_event_id, study_event_id = row
+    return PlanEntry(week, slot, occurrences, *(datetime.fromisoformat(value) for value in times),
+                     reminder_event_id, study_event_id)
+
+
+class PlanRegistry:
+    """Thread-safe SQLite store of plans and their calendar event IDs, per user."""
+
+    def __init__(self, path: str = PLAN_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " user_id TEXT NOT NULL, plan_id TEXT NOT NULL, course_name TEXT NOT NULL,"
+                " params TEXT NOT NULL, status TEXT NOT NULL, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (user_id, plan_id))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plan_entries ("
+                " user_id TEXT NOT NULL, plan_id TEXT NOT NULL, week INTEGER NOT NULL, slot TEXT NOT NULL,"
+                " occurrences INTEGER NOT NULL, study_start TEXT NOT NULL, study_end TEXT NOT NULL,"
+                " reminder_start TEXT NOT NULL, reminder_end TEXT NOT NULL,"
+                " reminder_event_id TEXT, study_event_id TEXT,"
+                " PRIMARY KEY (user_id, plan_id, week, slot))"
+            )
+        return self._db
+
+    def save_plan(self, plan_id: str, course_name: str, params: dict, entries: list,
+                  status: str = ACTIVE, user_id: str = None):
+        """Stores a plan, replacing its previous entries (user_id defaults to calendar_quota.calendar_user)."""
+        user_id = user_id or calendar_user.get()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, plan_id, course_name, json.dumps(params), status, time.time())
+                )
+                db.execute("DELETE FROM plan_entries WHERE user_id = ? AND plan_id = ?", (user_id, plan_id))
+                db.executemany(
+                    "INSERT OR REPLACE INTO plan_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_entry_row(user_id, plan_id, entry) for entry in entries]
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def get_plan(self, plan_id: str, user_id: str = None):
+        """Returns the PlanRecord (entries in chronological order), or None if the plan isn't registered."""
+        user_id = user_id or calendar_user.get()
+        with self._lock:
+            db = self._connection()
+            plan = db.execute(
+                "SELECT course_name, params, status, updated_at FROM plans WHERE user_id = ? AND plan_id = ?",
+                (user_id, plan_id)
+            ).fetchone()
+            if plan is None:
+                return None
+            rows = db.execute(
+                "SELECT week, slot, occurrences, study_start, study_end, reminder_start, reminder_end,"
+                " reminder_event_id, study_event_id FROM plan_entries WHERE user_id = ? AND plan_id = ?"
+                " ORDER BY study_start",
+                (user_id, plan_id)
+            ).fetchall()
+        course_name, params, status, updated_at = plan
+        return PlanRecord(plan_id, course_name, json.loads(params), status, [_row_entry(row) for row in rows], updated_at)
+
+    def current_plan_id(self, course_name: str, user_id: str = None) -> str:
+        """
+        The ID a plan for course_name has now: the first generation of
+        make_plan_id that isn't cancelled. Cancelled plans keep their past
+        sessions under the old ID, out of reach of the new plan's calendar sync.
+        """
+        user_id = user_id or calendar_user.get()
+        generation = 1
+        with self._lock:
+            db = self._connection()
+            while True:
+                plan_id = make_plan_id(course_name, generation)
+                row = db.execute("SELECT status FROM plans WHERE user_id = ? AND plan_id = ?",
+                                 (user_id, plan_id)).fetchone()
+                if row is None or row[0] != CANCELLED:
+                    return plan_id
+                generation += 1
+
+    def list_plans(self, user_id: str = None) -> list:
+        """Returns [{"plan_id", "course_name", "status", "updated_at"}] of a user's plans, newest first."""
+        user_id = user_id or calendar_user.get()
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT plan_id, course_name, status, updated_at FROM plans WHERE user_id = ? ORDER BY updated_at DESC",
+                (user_id,)
+            ).fetchall()
+        return [dict(zip(("plan_id", "course_name", "status", "updated_at"), row)) for row in rows]
+
+    def delete_plan(self, plan_id: str, user_id: str = None):
+        user_id = user_id or calendar_user.get()
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM plan_entries WHERE user_id = ? AND plan_id = ?", (user_id, plan_id))
+            db.execute("DELETE FROM plans WHERE user_id = ? AND plan_id = ?", (user_id, plan_id))
+
+
+_registry = PlanRegistry()
+
+
+def get_plan_registry() -> PlanRegistry:
+    """Returns the process-wide plan registry."""
+    return _registry
+
+
+def set_plan_registry(registry: PlanRegistry):
+    """Replaces the process-wide plan registry (e.g. a temporary one in benchmarks)."""
+    global _registry
+    _registry = registry
@@ -1,4 +1,6 @@
 from google.adk.agents import LlmAgent
+from sub_agents.memory_cache import preload_memory_tool
+from sub_agents.preference_extractor import record_llm_preferences, serve_fast_path_preferences
 
 preference_collector = LlmAgent(
     name="PreferenceCollector",
@@ -33,5 +35,9 @@ preference_collector = LlmAgent(
     - Current request overrides memory (if user says "free" now, use that)
     - This helps verify memory is being used
     """,
-    output_key="user_preferences"
+    tools=[preload_memory_tool],
+    output_key="user_preferences",
+    # Clear-cut requests are extracted locally; only ambiguous ones reach the LLM
+    before_agent_callback=serve_fast_path_preferences,
+    after_agent_callback=record_llm_preferences,
 )
\ No newline at end of file
@@ -0,0 +1,268 @@
+# sub_agents/preference_extractor.py
+
+"""
+Rule-based fast path for preference_collector.
+
+Most course requests ("find me free beginner Python courses") state their
+preferences in plain keywords, so a full Gemini call to rewrite them as
+"Looking for: X, Level: Y, Budget: Z, Format: W" is wasted latency. Here a
+local extractor finds the topic and the level, budget and format keywords,
+fills unstated fields from the user's remembered preferences (user-scoped
+state, kept across sessions) and, when confident, answers for the agent
+from its before_agent_callback. Ambiguous requests - no clear topic,
+conflicting keywords, references to earlier turns - still go to the LLM.
+
+get_preference_stats() reports the fast-path hit rate and the LLM latency
+it saved.
+"""
+
+import re
+import threading
+import time
+from typing import Optional
+
+from google.genai import types
+from pydantic import BaseModel
+from sub_agents.search_cache import PREFERENCES_KEY
+
+# User-scoped state: ADK keeps "user:" keys across all of the user's sessions
+REMEMBERED_PREFERENCES_KEY = "user:learning_preferences"
+REMEMBERED_FIELDS = ("level", "budget", "format")
+# Start time of an LLM fallback run, for record_llm_preferences; temp: state ends with the invocation
+LLM_RUN_STARTED_KEY = "temp:preference_llm_started"
+
+MAX_TOPIC_WORDS = 6
+
+LEVEL_KEYWORDS = {
+    "beginner": ("beginner", "beginners", "novice", "newbie", "new to", "from scratch", "no experience",
+                 "introductory", "intro to", "introduction to", "basics", "basic", "getting started", "starter"),
+    "intermediate": ("intermediate", "some experience", "next level"),
+    "advanced": ("advanced", "expert", "experts", "in-depth", "in depth", "mastery", "senior"),
+}
+FORMAT_KEYWORDS = {
+    "video": ("video", "videos", "youtube", "lectures", "watch"),
+    "interactive": ("interactive", "hands-on", "hands on", "exercises", "projects", "practice"),
+    "text-based": ("text-based", "text based", "reading", "books", "book", "articles", "written"),
+}
+FREE_PHRASES = ("free", "no cost", "no money", "zero budget", "without paying", "$0")
+PAID_PHRASES = ("paid", "premium")
+# "under $50", "less than 100 dollars", "$20-50", "budget of $30"
+_AMOUNT = r"\$?\s*(\d+(?:\.\d+)?)\s*(?:dollars|usd|bucks|\$)?"
+_BUDGET_RANGE = re.compile(r"\$\s*(\d+)\s*(?:-|to)\s*\$?\s*(\d+)")
+_BUDGET_CEILING = re.compile(rf"(?:under|below|less than|up to|max(?:imum)?|at most|cheaper than|budget(?: of| is)?)\s+{_AMOUNT}")
+
+# Course-request phrasings; the named group is the topic
+_TOPIC_PATTERNS = [
+    re.compile(r"\b(?:courses?|class(?:es)?|tutorials?|training|bootcamps?|lessons?)\s+(?:on|about|for|in|covering|to learn)\s+(?P<topic>.+)"),
+    re.compile(r"\b(?:learn(?:ing)?|study(?:ing)?|teach me|get into|get started with|pick up|master)\s+(?:about\s+|how to\s+)?(?P<topic>.+)"),
+    re.compile(r"(?:^|\b(?:find|show|recommend|suggest|search|get|need|want|looking for)(?:\s+me)?\s+)(?P<topic>.+?)\s+(?:courses?|class(?:es)?|tutorials?|training|bootcamps?|lessons?)\b"),
+]
+# Words that make a request depend on earlier turns or on a comparison
+_AMBIGUOUS = re.compile(
+    r"\b(?:that|those|these|it|them|more|another|other|similar|same|again|instead|except|but|not|than|"
+    r"which|vs|versus|or|either|compare|difference)\b"
+)
+_FILLER = {
+    "a", "an", "the", "some", "good", "great", "best", "top", "any", "me", "my", "please", "course", "courses",
+    "online", "class", "classes", "tutorial", "tutorials", "to", "for", "on", "about", "in", "with", "of",
+    "level", "budget", "format", "style", "find", "show", "recommend", "suggest", "i", "want", "would", "like",
+    "can", "you", "could", "help", "learn", "learning", "how", "do", "really", "just", "quick", "nice",
+}
+# "... for learning photography" but "machine learning"
+_TRAILING_FILLER = _FILLER - {"learn", "learning"}
+_TOPIC_WORD = re.compile(r"[a-z0-9+#.]+(?:-[a-z0-9+#.]+)*")
+
+
+class Preferences(BaseModel):
+    """Structured preferences; str(preferences) is preference_collector's one-line format."""
+
+    topic: str
+    level: str = "beginner"
+    budget: str = "any"
+    format: str = "any"
+    # Fields filled from the user's remembered preferences
+    remembered: list[str] = []
+
+    def __str__(self) -> str:
+        def field(name: str) -> str:
+            return getattr(self, name) + (" (remembered)" if name in self.remembered else "")
+
+        return (f"Looking for: {self.topic}, Level: {field('level')}, "
+                f"Budget: {field('budget')}, Format: {field('format')}")
+
+
+def _find_keyword(text: str, keywords: dict) -> tuple:
+    """Returns (value, matched phrases); value is None if no or conflicting matches."""
+    found = {}
+    for value, phrases in keywords.items():
+        for phrase in phrases:
+            if re.search(rf"(?<![\w$]){re.escape(phrase)}(?!\w)", text):
+                found.setdefault(value, []).append(phrase)
+    if len(found) != 1:
+        return ("conflict" if found else None), [p for phrases in found.values() for p in phrases]
+    value, phrases = next(iter(found.items()))
+    return value, phrases
+
+
+def _find_budget(text: str) -> tuple:
+    """Returns (budget, matched phrases); budget is None if unstated, "conflict" if contradictory."""
+    budgets, phrases = [], []
+    match = _BUDGET_RANGE.search(text)
+    if match:
+        budgets.append(f"${match.group(1)}-{match.group(2)}")
+        phrases.append(match.group(0))
+    else:
+        match = _BUDGET_CEILING.search(text)
+        if match:
+            budgets.append(f"under ${match.group(1)}")
+            phrases.append(match.group(0))
+    for value, words in (("free", FREE_PHRASES), ("paid", PAID_PHRASES)):
+        hits = [w for w in words if re.search(rf"(?<![\w$]){re.escape(w)}(?!\w)", text)]
+        if hits:
+            budgets.append(value)
+            phrases.extend(hits)
+    if len(budgets) > 1:
+        return "conflict", phrases
+    return (budgets[0] if budgets else None), phrases
+
+
+def _clean_topic(topic: str, removed: list) -> str:
+    for phrase in sorted(removed, key=len, reverse=True):
+        topic = re.sub(rf"(?<![\w$]){re.escape(phrase)}(?!\w)", " ", topic)
+    # Cut trailing clauses ("..., I have 5 hours a week")
+    topic = re.split(r"[,;!?]|\.(?:\s|$)|\b(?:so|because|since|as|i|i'm|im|with my|for my|for work)\b", topic)[0]
+    words = _TOPIC_WORD.findall(topic)
+    # Only at the edges: "machine learning" keeps its "learning"
+    while words and words[0] in _FILLER:
+        words.pop(0)
+    while words and words[-1] in _TRAILING_FILLER:
+        words.pop()
+    return " ".join(words).strip(" .")
+
+
+def _original_case(topic: str, text: str) -> str:
+    """Takes the topic's spelling from the user's message when it appears there verbatim."""
+    match = re.search(re.escape(topic).replace(r"\ ", r"\s+"), text, re.IGNORECASE)
+    if match and not match.group(0).islower():
+        return match.group(0)
+    return topic[:1].upper() + topic[1:]
+
+
+def extract_preferences(message: str, remembered: dict = None) -> Optional[Preferences]:
+    """
+    Extracts preferences from a course request, without an LLM.
+
+    Args:
+        message: The user's message
+        remembered: The user's remembered level/budget/format, used for
+            fields the message doesn't state
+
+    Returns:
+        Preferences, or None if the message is ambiguous (let the LLM decide)
+    """
+    text = " ".join((message or "").lower().split())
+    if not text or len(text) > 300 or _AMBIGUOUS.search(text):
+        return None
+
+    level, level_phrases = _find_keyword(text, LEVEL_KEYWORDS)
+    format_, format_phrases = _find_keyword(text, FORMAT_KEYWORDS)
+    budget, budget_phrases = _find_budget(text)
+    if "conflict" in (level, format_, budget):
+        return None
+
+    topic = None
+    for pattern in _TOPIC_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            topic = _clean_topic(match.group("topic"), level_phrases + format_phrases + budget_phrases)
+            if topic:
+                break
+    if not topic or len(topic.split()) > MAX_TOPIC_WORDS:
+        return None
+
+    stated = {"level": level, "budget": budget, "format": format_}
+    preferences = Preferences(topic=_original_case(topic, message))
+    for name in REMEMBERED_FIELDS:
+        if stated[name]:
+            setattr(preferences, name, stated[name])
+        elif (remembered or {}).get(name):
+            setattr(preferences, name, remembered[name])
+            preferences.remembered.append(name)
+    return preferences
+
+
+def stated_preferences(message: str) -> dict:
+    """Level/budget/format the message states explicitly (unambiguously), for remembering."""
+    text = " ".join((message or "").lower().split())
+    stated = {
+        "level": _find_keyword(text, LEVEL_KEYWORDS)[0],
+        "budget": _find_budget(text)[0],
+        "format": _find_keyword(text, FORMAT_KEYWORDS)[0],
+    }
+    return {name: value for name, value in stated.items() if value and value != "conflict"}
+
+
+_stats_lock = threading.Lock()
+_stats = {"runs": 0, "fast_path_hits": 0, "llm_fallbacks": 0, "latency_saved_seconds": 0.0}
+_llm_seconds = None  # moving average of an LLM preference_collector run
+
+
+def get_preference_stats() -> dict:
+    """Returns fast-path hit rate and the LLM latency saved by hits."""
+    with _stats_lock:
+        stats = dict(_stats)
+        stats["avg_llm_seconds"] = _llm_seconds
+    stats["hit_rate"] = stats["fast_path_hits"] / stats["runs"] if stats["runs"] else 0.0
+    return stats
+
+
+def _message_text(callback_context) -> str:
+    content = callback_context.user_content
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def serve_fast_path_preferences(callback_context):
+    """
+    before_agent_callback for preference_collector: extracts preferences locally when confident.
+
+    Also remembers the level/budget/format the user states. Returns the
+    one-line preferences as the agent's reply (skipping the LLM call), or
+    None so the agent runs.
+    """
+    started = time.perf_counter()
+    message = _message_text(callback_context)
+    remembered = dict(callback_context.state.get(REMEMBERED_PREFERENCES_KEY) or {})
+    stated = stated_preferences(message)
+    if stated and {**remembered, **stated} != remembered:
+        callback_context.state[REMEMBERED_PREFERENCES_KEY] = {**remembered, **stated}
+
+    preferences = extract_preferences(message, remembered)
+    with _stats_lock:
+        _stats["runs"] += 1
+        if preferences is None:
+            _stats["llm_fallbacks"] += 1
+            callback_context.state[LLM_RUN_STARTED_KEY] = started
+            return None
+        _stats["fast_path_hits"] += 1
+        saved = max(0.0, (_llm_seconds or 0.0) - (time.perf_counter() - started))
+        _stats["latency_saved_seconds"] += saved
+
+    line = str(preferences)
+    callback_context.state[PREFERENCES_KEY] = line
+    print(f"⚡ Preferences (fast path, ~{saved:.2f}s saved): {line}")
+    return types.Content(role="model", parts=[types.Part(text=line)])
+
+
+def record_llm_preferences(callback_context):
+    """after_agent_callback for preference_collector: times LLM fallbacks for the latency-saved estimate."""
+    global _llm_seconds
+    started = callback_context.state.get(LLM_RUN_STARTED_KEY)
+    if started is None:
+        return None
+    callback_context.state[LLM_RUN_STARTED_KEY] = None
+    seconds = time.perf_counter() - started
+    with _stats_lock:
+        _llm_seconds = seconds if _llm_seconds is None else 0.8 * _llm_seconds + 0.2 * seconds
+    return None
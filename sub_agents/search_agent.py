@@ -1,107 +1,176 @@
-from google.adk.agents import LlmAgent
-from google.adk.tools import google_search 
+"""
+Course search stage of CourseFinderPipeline.
 
-search_agent = LlmAgent(
-    name="search_agent",
-    model="gemini-2.0-flash",
-    description="Searches for online courses using web search",
-    instruction="""
-    You are a course search specialist. Your job is to find online courses that match user preferences.
-    
-    INPUT: You receive search criteria from preference_collector:
+The local catalog and the search cache answer first (before_agent_callback).
+Otherwise one search branch per provider runs in parallel, each with its
+own deadline, and CourseMerger combines their records and the catalog's
+few matches - deduplicated by canonical URL and title - into
+state["found_courses"]. Search time is close
+to the slowest branch instead of the sum of all searches. Courses found
+without their page URL are resolved in one batched resolve_course_urls call
+per branch, not one extra search each.
+"""
+
+import json
+import os
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools.google_search_tool import GoogleSearchTool
+from google.genai import types
+from sub_agents.course_catalog import CATALOG_COURSES_KEY, preload_catalog, serve_catalog_search
+from sub_agents.course_records import FOUND_COURSES_KEY, CourseRecord, validate_course_records
+from sub_agents.deadline_agent import DeadlineAgent
+from sub_agents.search_cache import serve_cached_search, store_search_results
+from sub_agents.url_resolver import remember_course_urls, url_resolver_tool
+
+# Seconds each provider branch may take before the merge goes on without it
+SEARCH_BRANCH_TIMEOUT = float(os.getenv("SEARCH_BRANCH_TIMEOUT", "20"))
+
+# (key, platform name, search filter)
+PLATFORM_BRANCHES = [
+    ("coursera", "Coursera", "site:coursera.org"),
+    ("edx", "edX", "site:edx.org"),
+    ("udemy", "Udemy", "site:udemy.com"),
+    ("youtube_ocw", "YouTube or MIT OpenCourseWare", "site:youtube.com OR site:ocw.mit.edu"),
+]
+
+BRANCH_INSTRUCTION = """
+    You are a course search specialist for __PLATFORM__. Your job is to find online courses
+    on __PLATFORM__ that match the user's preferences.
+
+    INPUT: Search criteria from preference_collector:
+    {user_preferences}
     - Topic/skill (e.g., "Python programming")
     - Level (e.g., "beginner", "intermediate", "advanced")
     - Budget (e.g., "free", "paid", "$0-50")
     - Format (e.g., "video", "interactive", "text-based")
-    
-    YOUR TASK: Search for courses and extract COMPLETE information for each.
-    
+
     SEARCH STRATEGY:
-    1. Create a focused search query:
-       - Include: topic + "online course" + level (if specified)
-       - Examples:
-         • "Python programming online course beginner"
-         • "machine learning intermediate course"
-         • "digital marketing course free"
-    
+    1. Create ONE focused search query limited to __PLATFORM__:
+       - Include: topic + "course" + level (if specified) + __SITE_FILTER__
+       - Example: "Python programming course beginner __SITE_FILTER__"
+
     2. Use the google_search tool to find courses
-    
-    3. From the search results, extract for EACH course:
+
+    3. From the search results, extract 2-4 of the best matching courses, with for EACH:
        ✅ Course name (full title)
-       ✅ Platform (Coursera, Udemy, edX, YouTube, etc.)
+       ✅ Platform (__PLATFORM__)
        ✅ URL (CRITICAL: MUST be a complete, working URL)
-       ✅ Duration (hours/weeks if available)
-       ✅ Price (free, $X, or "Check course page")
+       ✅ Duration (hours if available)
+       ✅ Price (free, $X, or unknown)
        ✅ Level (beginner/intermediate/advanced if mentioned)
        ✅ Brief description (1-2 sentences)
-    
-    CRITICAL - URL EXTRACTION RULES:
-    ══════════════════════════════════════════════════════════
-    🔴 NEVER leave URL blank or empty
-    🔴 NEVER use placeholder URLs like "https://example.com"
-    🔴 NEVER use generic URLs like "https://coursera.org" (need specific course URL)
-    
-    ✅ ALWAYS extract the EXACT URL from search results
-    ✅ URLs must be complete: https://www.coursera.org/learn/python
-    ✅ If search result has a URL, COPY IT EXACTLY
-    ✅ If search result doesn't show URL, use web_search again with course name to find it
-    
-    EXAMPLES OF GOOD URLs:
-    ✅ https://www.coursera.org/specializations/python
-    ✅ https://www.udemy.com/course/complete-python-bootcamp/
-    ✅ https://www.edx.org/course/introduction-to-python
-    ✅ https://www.youtube.com/watch?v=abc123xyz (for YouTube courses)
-    ✅ https://ocw.mit.edu/courses/electrical-engineering-and-computer-science/
-    
-    EXAMPLES OF BAD URLs (DON'T DO THIS):
-    ❌ "" (empty)
-    ❌ "Check course page"
-    ❌ "https://coursera.org" (too general)
-    ❌ "N/A"
-    ══════════════════════════════════════════════════════════
-    
-    HANDLING MISSING INFORMATION:
-    - If duration is not in results: Put "Check course page" (not blank)
-    - If price is not clear: Put "Check course page" (not blank)
-    - If URL is not in results: DO ANOTHER SEARCH for "[Course Name] [Platform]" to find it
-    
+
+    CRITICAL - URL RULES:
+    🔴 NEVER leave URL blank or use placeholders like "https://example.com"
+    🔴 NEVER use generic URLs like "https://coursera.org" (need the specific course URL)
+    🔴 NEVER run a separate search per course to find its URL
+    ✅ COPY the EXACT URL from the search results
+    ✅ Collect ALL courses whose URL is missing or generic and call resolve_course_urls
+       ONCE with all of them (name, platform and whatever else you know). Use the
+       courses it returns. For its "unresolved" courses you may run ONE more
+       google_search combining their titles; if a URL is still missing, leave that
+       course out
+
+    Be quick: other platforms are searched at the same time, and results that take
+    too long are dropped.
+
     OUTPUT FORMAT:
-    Return a structured list with ALL fields for each course:
-    
-    Course 1:
-    - Name: [Full course title]
-    - Platform: [Coursera/Udemy/edX/etc.]
-    - URL: [COMPLETE URL - NEVER BLANK]
-    - Duration: [X hours/weeks or "Check course page"]
-    - Price: [Free/$X or "Check course page"]
-    - Level: [beginner/intermediate/advanced]
-    - Description: [Brief 1-2 sentence description]
-    
-    Course 2:
-    ...
-    
-    QUALITY CHECKS BEFORE RETURNING:
-    ✅ Every course has a URL (not blank, not placeholder)
-    ✅ URLs are complete and specific to each course
-    ✅ All required fields are filled
-    ✅ Found at least 5-8 courses
-    
-    If you find a course but can't get its URL from initial search:
-    → Run ANOTHER web_search: "[exact course name] [platform name]"
-    → Extract the specific course URL from those results
-    → NEVER return a course without a URL
-    
-    EXAMPLE WORKFLOW:
-    1. Search: "Python programming online course beginner"
-    2. Find: "Python for Everybody - Coursera"
-    3. Result shows title but unclear URL?
-    4. → Search again: "Python for Everybody Coursera"
-    5. → Extract exact URL: https://www.coursera.org/specializations/python
-    6. → Include in results with complete information
-    
-    Remember: The ranking_agent and user NEED working URLs to access courses!
-    A course without a URL is useless! 🔗
-    """,
-    tools=[google_search],
-    output_key="found_courses"
-)
\ No newline at end of file
+    Return ONLY a JSON list of course records - one object per course, no extra text:
+
+    [
+      {
+        "name": "Python for Everybody",
+        "platform": "Coursera",
+        "url": "https://www.coursera.org/specializations/python",
+        "duration_hours": 40,
+        "price_cents": null,
+        "is_free": true,
+        "level": "beginner",
+        "description": "Gentle introduction to programming with Python, no prior experience needed."
+      }
+    ]
+
+    FIELD RULES:
+    - duration_hours: total hours as a number (convert weeks at ~5 hours/week), or null
+    - price_cents: price in US cents (e.g. $49.99 → 4999), or null if free or unknown
+    - is_free: true for free and free-to-audit courses
+    - level: "beginner", "intermediate", "advanced", "all levels", or null
+    - description: 1-2 short sentences
+
+    If __PLATFORM__ has no matching course, return [].
+    """
+
+
+def _branch_key(key: str) -> str:
+    return f"{FOUND_COURSES_KEY}_{key}"
+
+
+def _platform_search_agent(key: str, platform: str, site_filter: str) -> BaseAgent:
+    branch = LlmAgent(
+        name=f"{key}_search",
+        model="gemini-2.0-flash",
+        description=f"Searches {platform} for online courses",
+        instruction=BRANCH_INSTRUCTION.replace("__PLATFORM__", platform).replace("__SITE_FILTER__", site_filter),
+        tools=[GoogleSearchTool(bypass_multi_tools_limit=True), url_resolver_tool],
+        output_schema=list[CourseRecord],
+        output_key=_branch_key(key),
+    )
+    return DeadlineAgent(
+        branch,
+        deadline_seconds=SEARCH_BRANCH_TIMEOUT,
+        fallback_state={_branch_key(key): []},
+        name=f"{key}_search_with_deadline",
+    )
+
+
+class CourseMerger(BaseAgent):
+    """Merges the course records of several state keys into state["found_courses"] (no LLM call)."""
+
+    source_keys: list
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        branches = [ctx.session.state.get(key) or [] for key in self.source_keys]
+        # Interleave the branches so every provider is represented near the top
+        interleaved = [
+            branch[i] for i in range(max((len(b) for b in branches), default=0))
+            for branch in branches if i < len(branch)
+        ]
+        records = validate_course_records(interleaved, dedupe_titles=True)
+        remember_course_urls(records)
+        print(f"🔎 {len(records)} course records from {sum(1 for b in branches if b)}/{len(branches)} sources")
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(records))]),
+            actions=EventActions(state_delta={FOUND_COURSES_KEY: records}),
+        )
+
+
+search_agent = SequentialAgent(
+    name="search_agent",
+    description="Searches for online courses on several platforms in parallel",
+    sub_agents=[
+        ParallelAgent(
+            name="PlatformSearch",
+            description="Searches every course platform at the same time",
+            sub_agents=[_platform_search_agent(*branch) for branch in PLATFORM_BRANCHES],
+        ),
+        CourseMerger(
+            name="CourseMerger",
+            description="Merges and deduplicates the catalog's and the platforms' course records",
+            # Catalog matches first: they are known to match every query term
+            source_keys=[CATALOG_COURSES_KEY] + [_branch_key(key) for key, _, _ in PLATFORM_BRANCHES],
+        ),
+    ],
+    before_agent_callback=[serve_catalog_search, serve_cached_search],
+    after_agent_callback=store_search_results,
+)
+
+# Load the local catalog index on a background thread while the server starts
+preload_catalog()
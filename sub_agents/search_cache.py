@@ -0,0 +1,340 @@
+# sub_agents/search_cache.py
+
+"""
+Two-tier cache of search results, keyed by normalized user preferences.
+
+Most users ask for the same few topic/level/budget/format combinations, so
+search_agent's course records are cached:
+
+- An in-process LRU tier (fast, per worker) in front of a SQLite tier on
+  disk (shared by workers on the host, survives restarts).
+- Entries are fresh for SEARCH_CACHE_TTL seconds. For SEARCH_CACHE_STALE_TTL
+  more they are still served, but a background search refreshes them
+  (stale-while-revalidate). Older entries count as misses.
+
+On a hit, search_agent's before_agent_callback fills state["found_courses"]
+and the agent (and its google_search calls) is skipped entirely.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from google.genai import types
+from sub_agents.course_records import FOUND_COURSES_KEY
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_CACHE_STALE_TTL = float(os.getenv("SEARCH_CACHE_STALE_TTL", str(6 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_CACHE_MAX_DISK_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_DISK_ENTRIES", "50000"))
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(_PROJECT_ROOT, "search_cache.sqlite3"))
+
+PREFERENCES_KEY = "user_preferences"
+# Set in the state of background refresh sessions so they bypass the cache
+REVALIDATE_KEY = "search_cache_revalidate"
+# [cache key, start time] of a search that missed the cache, for store_search_results.
+# temp: state only lives for the invocation, so a search that never finishes leaves nothing behind
+PENDING_SEARCH_KEY = "temp:search_cache_pending"
+
+FRESH = "fresh"
+STALE = "stale"
+
+PREFERENCE_FIELDS = ("topic", "level", "budget", "format")
+_FIELD_LABELS = {"looking for": "topic", "topic": "topic", "level": "level", "budget": "budget", "format": "format"}
+_LABEL_PATTERN = re.compile(r"(looking for|topic|level|budget|format)\s*:", re.IGNORECASE)
+_FILLER_WORDS = {"a", "an", "the", "to", "how", "course", "courses", "online", "class", "classes", "tutorial", "tutorials"}
+_ANY_VALUES = {"", "any", "none", "not specified", "unknown", "no preference"}
+
+
+def normalize_preferences(preferences) -> tuple:
+    """
+    Normalizes user preferences into a (topic, level, budget, format) cache key.
+
+    Accepts preference_collector's one-line output ("Looking for: Python
+    programming, Level: beginner, Budget: free (remembered), Format: any")
+    or a dict with those keys. Case, punctuation, "(remembered)" notes and
+    filler words such as "course" or "online" don't change the key;
+    unspecified fields become "any".
+    """
+    if isinstance(preferences, dict):
+        fields = {name: str(preferences.get(name) or "") for name in PREFERENCE_FIELDS}
+    else:
+        text = str(preferences or "")
+        fields = dict.fromkeys(PREFERENCE_FIELDS, "")
+        matches = list(_LABEL_PATTERN.finditer(text))
+        for match, following in zip(matches, matches[1:] + [None]):
+            end = following.start() if following else len(text)
+            fields[_FIELD_LABELS[match.group(1).lower()]] = text[match.end():end]
+
+    key = []
+    for name in PREFERENCE_FIELDS:
+        value = re.sub(r"\(.*?\)|\[.*?\]", " ", fields[name].lower())
+        words = re.findall(r"[a-z0-9+#$]+(?:[.-][a-z0-9]+)*", value)
+        if name == "topic":
+            words = [word for word in words if word not in _FILLER_WORDS]
+        value = " ".join(words)
+        key.append("any" if value in _ANY_VALUES else value)
+    return tuple(key)
+
+
+class SearchCache:
+    """Thread-safe LRU memory tier + SQLite disk tier with TTL and stale-while-revalidate."""
+
+    def __init__(
+        self,
+        path: str = SEARCH_CACHE_PATH,
+        ttl: float = SEARCH_CACHE_TTL,
+        stale_ttl: float = SEARCH_CACHE_STALE_TTL,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        max_disk_entries: int = SEARCH_CACHE_MAX_DISK_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (records, stored_at, search_seconds)
+        self._db = None
+        self._search_seconds = None  # moving average of a real search, for entries without their own
+        self._stats = {
+            "lookups": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "revalidations": 0,
+            "latency_saved_seconds": 0.0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " key TEXT PRIMARY KEY, records TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, last_used REAL NOT NULL, search_seconds REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS search_cache_last_used ON search_cache (last_used)")
+        return self._db
+
+    @staticmethod
+    def _db_key(key: tuple) -> str:
+        return json.dumps(list(key))
+
+    def _remember(self, key: tuple, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: tuple):
+        """
+        Looks up cached records.
+
+        Returns:
+            tuple: (records, FRESH or STALE), or (None, None) on a miss
+        """
+        now = time.time()
+        with self._lock:
+            self._stats["lookups"] += 1
+            entry = self._memory.get(key)
+            tier = "memory_hits"
+
+            if entry is None and self._connection() is not None:
+                row = self._db.execute(
+                    "SELECT records, stored_at, search_seconds FROM search_cache WHERE key = ?",
+                    (self._db_key(key),)
+                ).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1], row[2])
+                    tier = "disk_hits"
+
+            age = now - entry[1] if entry is not None else None
+            if entry is None or age > self.ttl + self.stale_ttl:
+                self._stats["misses"] += 1
+                return None, None
+
+            records, _, search_seconds = entry
+            self._remember(key, entry)
+            if tier == "disk_hits":
+                self._db.execute(
+                    "UPDATE search_cache SET last_used = ? WHERE key = ?", (now, self._db_key(key))
+                )
+
+            self._stats[tier] += 1
+            saved = search_seconds if search_seconds is not None else self._search_seconds
+            if saved is not None:
+                self._stats["latency_saved_seconds"] += saved
+            if age > self.ttl:
+                self._stats["stale_hits"] += 1
+                return records, STALE
+            return records, FRESH
+
+    def put(self, key: tuple, records: list, search_seconds: float = None):
+        """Stores records in both tiers; `search_seconds` is how long the real search took."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, (records, now, search_seconds))
+            self._stats["stores"] += 1
+            if search_seconds is not None:
+                if self._search_seconds is None:
+                    self._search_seconds = search_seconds
+                else:
+                    self._search_seconds = 0.8 * self._search_seconds + 0.2 * search_seconds
+
+            if self._connection() is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, records, stored_at, last_used, search_seconds)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (self._db_key(key), json.dumps(records), now, now, search_seconds),
+                )
+                # LRU eviction on disk, in bulk so it runs rarely
+                count = self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+                if count > self.max_disk_entries:
+                    excess = count - int(self.max_disk_entries * 0.9)
+                    self._db.execute(
+                        "DELETE FROM search_cache WHERE key IN"
+                        " (SELECT key FROM search_cache ORDER BY last_used LIMIT ?)", (excess,)
+                    )
+                    self._stats["evictions"] += excess
+
+    def invalidate(self, key: tuple = None):
+        """Drops one key, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+            if self._connection() is not None:
+                if key is None:
+                    self._db.execute("DELETE FROM search_cache")
+                else:
+                    self._db.execute("DELETE FROM search_cache WHERE key = ?", (self._db_key(key),))
+
+    def count_revalidation(self):
+        with self._lock:
+            self._stats["revalidations"] += 1
+
+    def get_stats(self) -> dict:
+        """Returns hit/miss counters, hit rate and the search latency saved by hits."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["avg_search_seconds"] = self._search_seconds
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        stats["hit_rate"] = hits / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+
+_cache = SearchCache()
+
+# Keys with a background refresh in flight, and the tasks doing it
+_revalidating = set()
+_background_tasks = set()
+
+
+def get_search_cache() -> SearchCache:
+    """Returns the process-wide search cache."""
+    return _cache
+
+
+def set_search_cache(cache: SearchCache):
+    """Replaces the process-wide search cache (e.g. a temporary one in benchmarks)."""
+    global _cache
+    _cache = cache
+
+
+def get_search_cache_stats() -> dict:
+    """Returns the process-wide search cache's stats."""
+    return _cache.get_stats()
+
+
+async def _revalidate(agent, key: tuple, preferences: str):
+    """Runs the search agent in a throwaway session to refresh a stale entry."""
+    from google.adk.runners import InMemoryRunner
+
+    try:
+        runner = InMemoryRunner(agent=agent.clone(), app_name="search_cache_revalidate")
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name,
+            user_id="search-cache",
+            state={PREFERENCES_KEY: preferences, REVALIDATE_KEY: True},
+        )
+        message = types.Content(role="user", parts=[types.Part(text=preferences)])
+        async for _ in runner.run_async(user_id="search-cache", session_id=session.id, new_message=message):
+            pass
+        _cache.count_revalidation()
+    except Exception as e:
+        print(f"⚠️ Search cache refresh failed: {e}")
+    finally:
+        _revalidating.discard(key)
+
+
+def serve_cached_search(callback_context):
+    """
+    before_agent_callback for search_agent: answers from the cache when possible.
+
+    Returns the cached records as the agent's reply (which skips the agent) on
+    a hit; returns None on a miss so the search runs and store_search_results
+    caches its result.
+    """
+    if callback_context.state.get(REVALIDATE_KEY):
+        key = normalize_preferences(callback_context.state.get(PREFERENCES_KEY))
+        callback_context.state[PENDING_SEARCH_KEY] = [list(key), time.perf_counter()]
+        return None
+
+    preferences = callback_context.state.get(PREFERENCES_KEY)
+    if not preferences:
+        return None
+
+    key = normalize_preferences(preferences)
+    records, freshness = _cache.get(key)
+    if records is None:
+        callback_context.state[PENDING_SEARCH_KEY] = [list(key), time.perf_counter()]
+        return None
+
+    if freshness == STALE and key not in _revalidating:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            _revalidating.add(key)
+            agent = callback_context._invocation_context.agent
+            task = loop.create_task(_revalidate(agent, key, str(preferences)))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+    callback_context.state[FOUND_COURSES_KEY] = records
+    print(f"⚡ Search cache {freshness} hit: {len(records)} courses")
+    return types.Content(role="model", parts=[types.Part(text=json.dumps(records))])
+
+
+def store_search_results(callback_context):
+    """after_agent_callback for search_agent: caches the validated course records."""
+    pending = callback_context.state.get(PENDING_SEARCH_KEY)
+    records = callback_context.state.get(FOUND_COURSES_KEY)
+    if not pending or not records:
+        return None
+
+    callback_context.state[PENDING_SEARCH_KEY] = None
+    key, started = pending
+    _cache.put(tuple(key), records, search_seconds=time.perf_counter() - started)
+    return None
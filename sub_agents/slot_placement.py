@@ -0,0 +1,164 @@
+# sub_agents/slot_placement.py
+
+"""
+Free/busy-aware placement of study sessions (pure: no I/O, no API calls).
+
+create_study_reminders(avoid_conflicts=True) asks Calendar once for the
+user's busy time over the whole plan window. It loads the answer into a
+BusyIndex: merged, sorted interval arrays searched with bisect. Each
+session that collides with something then moves to the nearest free start
+within PLACEMENT_WINDOW_HOURS of its planned time, on the same day and on
+a PLACEMENT_STEP_MINUTES grid. Sessions with no free time in that window
+keep their time and are reported as unresolved.
+
+Cost:
+- building the index: O(m log m) for m busy intervals
+- placing n sessions: O(n log m), plus the few intervals inside each
+  session's window
+
+A year-long plan against thousands of existing events takes milliseconds.
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import timedelta
+
+PLACEMENT_WINDOW_HOURS = float(os.getenv("CALENDAR_PLACEMENT_WINDOW_HOURS", "2"))
+PLACEMENT_STEP_MINUTES = int(os.getenv("CALENDAR_PLACEMENT_STEP_MINUTES", "15"))
+
+# occurrences: the plan's Occurrences, moved where needed (same order)
+# moved_from: original study start of each moved occurrence, by index
+# unresolved: indexes of occurrences that still overlap busy time
+Placement = namedtuple("Placement", ["occurrences", "moved_from", "unresolved", "busy_intervals"])
+
+
+def _merge(intervals) -> list:
+    """Sorts (start, end) pairs and merges overlapping or touching ones."""
+    merged = []
+    for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _subtract(busy: list, free: list) -> list:
+    """Removes the merged `free` intervals from the merged `busy` intervals (one sweep)."""
+    result = []
+    j = 0
+    for start, end in busy:
+        while j < len(free) and free[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(free) and free[k][0] < end:
+            if free[k][0] > start:
+                result.append([start, free[k][0]])
+            start = max(start, free[k][1])
+            k += 1
+        if start < end:
+            result.append([start, end])
+    return result
+
+
+class BusyIndex:
+    """
+    Busy time as two parallel sorted arrays of non-overlapping intervals.
+
+    Args:
+        busy: (start, end) datetime pairs, in any order, overlapping or not
+        exclude: (start, end) pairs to treat as free, e.g. the plan's own
+            events when it is placed again. Busy time that overlaps them is
+            freed too, since free/busy can't tell whose it is.
+    """
+
+    def __init__(self, busy, exclude=()):
+        merged = _merge(busy)
+        if exclude:
+            merged = _subtract(merged, _merge(exclude))
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def is_free(self, start, end) -> bool:
+        # Only the last interval starting before `end` can overlap
+        i = bisect_left(self.starts, end) - 1
+        return i < 0 or self.ends[i] <= start
+
+    def overlapping(self, start, end) -> range:
+        """Indexes of the intervals overlapping [start, end)."""
+        return range(bisect_right(self.ends, start), bisect_left(self.starts, end))
+
+    def nearest_free(self, start, duration: timedelta, window: timedelta, step: timedelta,
+                     earliest=None, latest=None):
+        """
+        Returns the free start nearest to `start` (ties go later), or None.
+
+        Candidates lie on a `step` grid through `start`, within ±window,
+        and keep the whole session between earliest and latest.
+        """
+        if self.is_free(start, start + duration):
+            return start
+        low, high = start - window, start + window
+        if earliest is not None:
+            low = max(low, earliest)
+        if latest is not None:
+            high = min(high, latest - duration)
+
+        # The nearest free start is right after some busy interval ends, or
+        # right before some busy interval starts; only those near start matter
+        candidates = set()
+        for i in self.overlapping(low, high + duration):
+            candidates.add(start - ((start - self.ends[i]) // step) * step)  # ceil to the grid
+            candidates.add(start + ((self.starts[i] - duration - start) // step) * step)  # floor to the grid
+        for candidate in sorted(candidates, key=lambda c: (abs(c - start), c < start)):
+            if low <= candidate <= high and self.is_free(candidate, candidate + duration):
+                return candidate
+        return None
+
+
+def place_occurrences(occurrences, busy: BusyIndex, window_hours: float = PLACEMENT_WINDOW_HOURS,
+                      step_minutes: int = PLACEMENT_STEP_MINUTES) -> Placement:
+    """
+    Moves every occurrence that overlaps busy time to the nearest free start on the same day.
+
+    A moved session keeps its length. Its reminder still starts the day
+    before and now ends one hour before the new start.
+
+    Args:
+        occurrences: Occurrences from study_planner.iter_occurrences
+        busy: The user's busy time in the plan's wall-clock time
+        window_hours: How far a session may move, earlier or later
+        step_minutes: Grid for the new start times
+
+    Returns:
+        Placement
+    """
+    window = timedelta(hours=window_hours)
+    step = timedelta(minutes=step_minutes)
+    placed = []
+    moved_from = {}
+    unresolved = []
+
+    for idx, occurrence in enumerate(occurrences):
+        duration = occurrence.study_end - occurrence.study_start
+        day = occurrence.study_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = busy.nearest_free(occurrence.study_start, duration, window, step,
+                                  earliest=day, latest=day + timedelta(days=1))
+        if start is None:
+            unresolved.append(idx)
+        elif start != occurrence.study_start:
+            shift = start - occurrence.study_start
+            moved_from[idx] = occurrence.study_start
+            occurrence = occurrence._replace(
+                study_start=start,
+                study_end=start + duration,
+                reminder_end=occurrence.reminder_end + shift,
+            )
+        placed.append(occurrence)
+
+    return Placement(placed, moved_from, unresolved, len(busy))
@@ -0,0 +1,305 @@
+# sub_agents/study_planner.py
+
+"""
+Pure study-plan expansion engine (no I/O, no API calls, no prints).
+
+build_plan() parses every input string exactly once into a StudyPlan;
+iter_occurrences() then expands it into compact Occurrence tuples using only
+timedelta additions. The calendar tool and any other output sink (previews,
+sync, benchmarks) consume these occurrences instead of redoing date math.
+"""
+
+import hashlib
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Day name to number mapping (Monday=0, Sunday=6)
+DAY_MAP = {
+    "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3,
+    "Friday": 4, "Saturday": 5, "Sunday": 6
+}
+DAY_NAMES = list(DAY_MAP.keys())
+
+DEFAULT_REMINDER_TIME = (20, 0)
+
+# Any midnight works; labels only use the time-of-day part
+_LABEL_ANCHOR = datetime(2000, 1, 10)
+
+# One weekly study slot, with everything that is the same every week precomputed.
+# Offsets are relative to midnight of the plan's start date (week 1).
+StudySlot = namedtuple("StudySlot", [
+    "day",                   # "Saturday"
+    "start_time",            # original string, e.g. "9:00 AM"
+    "duration_hours",        # 2.75
+    "study_offset",          # timedelta to the first study session start
+    "study_duration",        # timedelta
+    "reminder_offset",       # timedelta to the first reminder start
+    "reminder_end_offset",   # timedelta to the first reminder end
+    "reminder_day",          # "Friday"
+    "study_start_label",     # "09:00 AM"
+    "study_end_label",       # "11:45 AM"
+    "reminder_start_label",  # "08:00 PM"
+    "reminder_end_label",    # "08:00 AM"
+])
+
+StudyPlan = namedtuple("StudyPlan", [
+    "plan_id",      # stable ID tagged on every calendar event of this plan
+    "course_name",
+    "total_weeks",
+    "start",        # datetime, midnight of the first study day
+    "timezone",     # IANA name; datetimes are wall-clock times in this zone
+    "slots",        # tuple of StudySlot in chronological order within a week
+])
+
+# One concrete session; `slot` indexes into StudyPlan.slots
+Occurrence = namedtuple("Occurrence", [
+    "week", "slot", "study_start", "study_end", "reminder_start", "reminder_end"
+])
+
+
+def parse_time(time_str: str) -> tuple:
+    """
+    Parse time string like "9:00 AM", "11 AM", "19:30" to (hour, minute)
+
+    Args:
+        time_str: Time string in various formats
+
+    Returns:
+        tuple: (hour, minute) in 24-hour format
+    """
+    try:
+        time_clean = time_str.upper().replace(" ", "")
+
+        if "AM" in time_clean or "PM" in time_clean:
+            # 12-hour format
+            time_part = time_clean.replace("AM", "").replace("PM", "")
+            if ":" in time_part:
+                hour, minute = map(int, time_part.split(":"))
+            else:
+                hour = int(time_part)
+                minute = 0
+
+            # Convert to 24-hour
+            if "PM" in time_clean and hour != 12:
+                hour += 12
+            elif "AM" in time_clean and hour == 12:
+                hour = 0
+        else:
+            # 24-hour format
+            if ":" in time_clean:
+                hour, minute = map(int, time_clean.split(":"))
+            else:
+                hour = int(time_clean)
+                minute = 0
+
+        return (hour, minute)
+    except:
+        # Default to 9 AM if parsing fails
+        return (9, 0)
+
+
+def parse_reminder_time(reminder_time: str) -> tuple:
+    """Parse "HH:MM" (24-hour) to (hour, minute), defaulting to 8 PM if invalid."""
+    try:
+        hour, minute = map(int, reminder_time.split(":"))
+        if 0 <= hour <= 23 and 0 <= minute <= 59:
+            return (hour, minute)
+    except (AttributeError, ValueError):
+        pass
+    return DEFAULT_REMINDER_TIME
+
+
+def make_plan_id(course_name: str, generation: int = 1) -> str:
+    """
+    Derives a stable plan ID from the course name.
+
+    Re-planning the same course (e.g. after changing the pace) yields the same
+    ID, which is what lets calendar sync find and update the earlier events.
+    A cancelled plan keeps its ID (and its past sessions); planning the course
+    again starts the next generation (see plan_registry.current_plan_id).
+    """
+    normalized = re.sub(r"[^a-z0-9]+", " ", course_name.lower()).strip()
+    plan_id = "plan-" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+    return plan_id if generation == 1 else f"{plan_id}-{generation}"
+
+
+def _label(offset: timedelta) -> str:
+    """Formats the time-of-day part of an offset like "09:00 AM"."""
+    return (_LABEL_ANCHOR + offset).strftime("%I:%M %p")
+
+
+def _build_slot(session: dict, start: datetime, reminder_clock: timedelta) -> StudySlot:
+    """Parses one {"day", "start_time", "duration_hours"} session into a StudySlot of a plan starting at `start`."""
+    day = session["day"]
+    if day not in DAY_MAP:
+        raise ValueError(f"Unknown study day '{day}'. Use one of: {DAY_NAMES}")
+
+    days_ahead = (DAY_MAP[day] - start.weekday()) % 7
+    study_hour, study_minute = parse_time(session["start_time"])
+    duration_hours = session["duration_hours"]
+
+    study_offset = timedelta(days=days_ahead, hours=study_hour, minutes=study_minute)
+    study_duration = timedelta(hours=duration_hours)
+    reminder_offset = timedelta(days=days_ahead - 1) + reminder_clock
+    reminder_end_offset = study_offset - timedelta(hours=1)
+
+    return StudySlot(
+        day=day,
+        start_time=session["start_time"],
+        duration_hours=duration_hours,
+        study_offset=study_offset,
+        study_duration=study_duration,
+        reminder_offset=reminder_offset,
+        reminder_end_offset=reminder_end_offset,
+        reminder_day=DAY_NAMES[(DAY_MAP[day] - 1) % 7],
+        study_start_label=_label(study_offset),
+        study_end_label=_label(study_offset + study_duration),
+        reminder_start_label=_label(reminder_clock),
+        reminder_end_label=_label(reminder_end_offset),
+    )
+
+
+def build_plan(
+    course_name: str,
+    total_weeks: int,
+    study_schedule: list,
+    start_date: str,
+    reminder_time: str = "20:00",
+    timezone: str = "America/Los_Angeles",
+    plan_id: str = None
+) -> StudyPlan:
+    """
+    Parses a study schedule once into a StudyPlan.
+
+    Every study day repeats weekly for total_weeks weeks. Week 1 starts on
+    start_date, which must fall on one of the schedule's days; the other
+    days' first sessions are their next occurrence after start_date. A day
+    has at most one session: events and plan entries are keyed by day.
+
+    Args:
+        course_name: Name of the course
+        total_weeks: How many weeks the course will take
+        study_schedule: List of {"day", "start_time", "duration_hours"} dicts
+        start_date: Date of the FIRST study session (YYYY-MM-DD format)
+        reminder_time: Reminder time the day before (HH:MM, default 8 PM)
+        timezone: IANA timezone
+        plan_id: Plan ID to use (default: derived from course_name)
+
+    Returns:
+        StudyPlan
+
+    Raises:
+        ValueError: If start_date or a day name is invalid, a day appears
+            twice, or start_date's weekday is not in the schedule
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    start_day_name = DAY_NAMES[start.weekday()]
+    schedule_days = [session["day"] for session in study_schedule]
+
+    repeated = sorted({day for day in schedule_days if schedule_days.count(day) > 1})
+    if repeated:
+        raise ValueError(
+            f"The schedule has more than one session on {', '.join(repeated)}. "
+            f"Use one session per study day (combine them into one longer session)."
+        )
+    if start_day_name not in schedule_days:
+        raise ValueError(
+            f"Start date is {start_day_name}, but schedule doesn't include {start_day_name}. "
+            f"Schedule has: {schedule_days}"
+        )
+
+    reminder_hour, reminder_minute = parse_reminder_time(reminder_time)
+    reminder_clock = timedelta(hours=reminder_hour, minutes=reminder_minute)
+
+    slots = [_build_slot(session, start, reminder_clock) for session in study_schedule]
+    slots.sort(key=lambda slot: slot.study_offset)
+
+    return StudyPlan(
+        plan_id=plan_id or make_plan_id(course_name),
+        course_name=course_name,
+        total_weeks=total_weeks,
+        start=start,
+        timezone=timezone,
+        slots=tuple(slots),
+    )
+
+
+def replace_slot(plan: StudyPlan, day: str, session: dict, reminder_time: str = "20:00") -> StudyPlan:
+    """
+    Returns the plan with its `day` slot replaced by `session`.
+
+    Week 1 still starts on plan.start, even when `day` was the start day.
+    The new slot's sessions fall in the same plan weeks as the old ones.
+
+    Raises:
+        ValueError: If the plan has no `day` slot, or session["day"] is
+            another day that already has one
+    """
+    days = [slot.day for slot in plan.slots]
+    if day not in days:
+        raise ValueError(f"The plan has no {day} sessions. Study days: {days}")
+    if session["day"] != day and session["day"] in days:
+        raise ValueError(f"The plan already has {session['day']} sessions. Study days: {days}")
+
+    reminder_hour, reminder_minute = parse_reminder_time(reminder_time)
+    slot = _build_slot(session, plan.start, timedelta(hours=reminder_hour, minutes=reminder_minute))
+    slots = [slot if existing.day == day else existing for existing in plan.slots]
+    return plan._replace(slots=tuple(sorted(slots, key=lambda s: s.study_offset)))
+
+
+def iter_occurrences(plan: StudyPlan):
+    """
+    Yields every Occurrence of the plan in chronological order.
+
+    Only timedelta additions happen per occurrence; nothing is parsed or formatted.
+    """
+    week = timedelta(weeks=1)
+    week_start = plan.start
+    indexed_slots = list(enumerate(plan.slots))
+
+    for week_num in range(1, plan.total_weeks + 1):
+        for idx, slot in indexed_slots:
+            study_start = week_start + slot.study_offset
+            yield Occurrence(
+                week_num,
+                idx,
+                study_start,
+                study_start + slot.study_duration,
+                week_start + slot.reminder_offset,
+                week_start + slot.reminder_end_offset,
+            )
+        week_start += week
+
+
+def week_occurrence(plan: StudyPlan, week: int, slot_idx: int) -> Occurrence:
+    """Returns the Occurrence of plan.slots[slot_idx] in plan week `week` (1-based)."""
+    slot = plan.slots[slot_idx]
+    week_start = plan.start + timedelta(weeks=week - 1)
+    study_start = week_start + slot.study_offset
+    return Occurrence(
+        week,
+        slot_idx,
+        study_start,
+        study_start + slot.study_duration,
+        week_start + slot.reminder_offset,
+        week_start + slot.reminder_end_offset,
+    )
+
+
+def expand_plan(
+    course_name: str,
+    total_weeks: int,
+    study_schedule: list,
+    start_date: str,
+    reminder_time: str = "20:00",
+    timezone: str = "America/Los_Angeles"
+) -> tuple:
+    """
+    Convenience wrapper: build_plan() + the full occurrence list.
+
+    Returns:
+        tuple: (StudyPlan, list of Occurrence)
+    """
+    plan = build_plan(course_name, total_weeks, study_schedule, start_date, reminder_time, timezone)
+    return plan, list(iter_occurrences(plan))
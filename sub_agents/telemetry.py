@@ -0,0 +1,536 @@
+# sub_agents/telemetry.py
+
+"""
+Per-agent latency and token telemetry.
+
+instrument_agent_tree(root_agent) chains timing callbacks in front of every
+agent's own before/after agent, model and tool callbacks. Each time an agent
+runs, one record is kept for that agent and invocation. It holds:
+
+- wall time, and the outcome: "ok", "callback" (answered by a
+  before_agent_callback such as a cache hit), "transferred" (handed the
+  turn to another agent; ADK skips the after callback then), or
+  "incomplete" (raised or was abandoned)
+- model calls, model time, and prompt/output/cached token counts
+- local answers: model calls a before_model_callback answered instead
+  (e.g. the intent router)
+- tool calls by tool, tool time and tool errors
+- retries: a model call made after a model error, or a tool called again
+  after it failed
+
+When the outermost agent finishes, an invocation summary follows the
+agent records. Records are appended to TELEMETRY_JSONL, if set, in
+batches. Running totals are exported in Prometheus text format:
+render_prometheus(), the TELEMETRY_PROMETHEUS_FILE textfile (rewritten on
+every flush) and, with TELEMETRY_PROMETHEUS_PORT, a /metrics endpoint.
+
+Each callback costs a dict lookup and a clock read, so telemetry stays on
+(TELEMETRY_ENABLED=0 turns it off).
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from inspect import isawaitable
+
+from google.adk.agents import LlmAgent
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1").lower() not in ("0", "false", "no")
+TELEMETRY_JSONL = os.getenv("TELEMETRY_JSONL", "")
+TELEMETRY_PROMETHEUS_FILE = os.getenv("TELEMETRY_PROMETHEUS_FILE", "")
+TELEMETRY_PROMETHEUS_PORT = int(os.getenv("TELEMETRY_PROMETHEUS_PORT", "0"))
+# Records are written once this many are buffered, or this long after the last write
+TELEMETRY_FLUSH_RECORDS = int(os.getenv("TELEMETRY_FLUSH_RECORDS", "100"))
+TELEMETRY_FLUSH_SECONDS = float(os.getenv("TELEMETRY_FLUSH_SECONDS", "10"))
+# Open spans kept for agents that raised; the oldest are closed as incomplete
+TELEMETRY_MAX_OPEN_SPANS = int(os.getenv("TELEMETRY_MAX_OPEN_SPANS", "10000"))
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _Span:
+    """One agent run within one invocation."""
+
+    __slots__ = ("agent", "parent", "invocation_id", "session_id", "started_at", "started", "model_calls",
+                 "model_seconds", "model_started", "model_failed", "prompt_tokens", "output_tokens",
+                 "cached_tokens", "model_errors", "tool_calls", "tool_seconds", "tool_started", "tool_errors",
+                 "failed_tools", "retries", "local_answers")
+
+    def __init__(self, agent: str, parent: str, invocation_id: str, session_id: str):
+        self.agent = agent
+        self.parent = parent
+        self.invocation_id = invocation_id
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.model_calls = 0
+        self.model_seconds = 0.0
+        self.model_started = None
+        self.model_failed = False
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.model_errors = 0
+        self.tool_calls = {}
+        self.tool_seconds = 0.0
+        self.tool_started = {}  # function_call_id -> start; parallel calls overlap
+        self.tool_errors = 0
+        self.failed_tools = set()
+        self.retries = 0
+        self.local_answers = 0  # model calls a before_model callback answered instead
+
+    def record(self, outcome: str) -> dict:
+        return {
+            "type": "agent",
+            "ts": round(self.started_at, 3),
+            "invocation_id": self.invocation_id,
+            "session_id": self.session_id,
+            "agent": self.agent,
+            "parent": self.parent,
+            "outcome": outcome,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "model_calls": self.model_calls,
+            "model_ms": round(self.model_seconds * 1000, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "model_errors": self.model_errors,
+            "tool_calls": dict(self.tool_calls),
+            "tool_ms": round(self.tool_seconds * 1000, 1),
+            "tool_errors": self.tool_errors,
+            "retries": self.retries,
+            "local_answers": self.local_answers,
+        }
+
+
+class _Invocation:
+    __slots__ = ("session_id", "started_at", "started", "depth", "handoffs", "records")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.depth = 0  # open agents
+        self.handoffs = 0  # transfers whose target agent hasn't started yet
+        self.records = []
+
+
+def _labels(**labels) -> str:
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _is_tool_error(response) -> bool:
+    # The repo's tools report failures as {"status": "error", ...}
+    return isinstance(response, dict) and response.get("status") == "error"
+
+
+class AgentTelemetry:
+    """Collects per-agent spans, keeps Prometheus totals and writes JSONL records."""
+
+    def __init__(
+        self,
+        jsonl_path: str = TELEMETRY_JSONL,
+        prometheus_path: str = TELEMETRY_PROMETHEUS_FILE,
+        flush_records: int = TELEMETRY_FLUSH_RECORDS,
+        flush_seconds: float = TELEMETRY_FLUSH_SECONDS,
+        max_open_spans: int = TELEMETRY_MAX_OPEN_SPANS
+    ):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self.max_open_spans = max_open_spans
+
+        self._lock = threading.Lock()
+        self._spans = OrderedDict()  # (invocation_id, agent) -> _Span
+        self._invocations = {}  # invocation_id -> _Invocation
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._listeners = []
+        # Prometheus totals: metric -> {label tuple -> value}
+        self._counters = {}
+        self._histograms = {}  # agent -> [bucket counts..., sum, count]
+
+    def add_listener(self, callback):
+        """Calls callback(record) for every agent and invocation record (e.g. the benchmarks)."""
+        self._listeners.append(callback)
+
+    # ----- spans -----
+
+    def start_agent(self, callback_context, agent: str, parent: str):
+        invocation_id = callback_context.invocation_id
+        session_id = callback_context.session.id
+        span = _Span(agent, parent, invocation_id, session_id)
+        with self._lock:
+            invocation = self._invocations.get(invocation_id)
+            if invocation is None:
+                invocation = self._invocations[invocation_id] = _Invocation(session_id)
+            if invocation.handoffs:
+                # The target of a transfer takes the transferring agent's place
+                invocation.handoffs -= 1
+            else:
+                invocation.depth += 1
+            self._spans[(invocation_id, agent)] = span
+            while len(self._spans) > self.max_open_spans:
+                _, oldest = self._spans.popitem(last=False)
+                self._finish(oldest, "incomplete")
+
+    def end_agent(self, callback_context, agent: str, outcome: str = "ok"):
+        with self._lock:
+            span = self._spans.pop((callback_context.invocation_id, agent), None)
+            if span is not None:
+                self._finish(span, outcome)
+        self._maybe_flush()
+
+    def _finish(self, span: _Span, outcome: str, close_invocation: bool = True):
+        """Records a closed span; closes the invocation with its outermost agent. Holds the lock."""
+        record = span.record(outcome)
+        self._emit(record)
+
+        seconds = record["duration_ms"] / 1000
+        self._count("agent_runs_total", (span.agent, outcome))
+        self._count("agent_model_calls_total", (span.agent,), span.model_calls)
+        self._count("agent_prompt_tokens_total", (span.agent,), span.prompt_tokens)
+        self._count("agent_output_tokens_total", (span.agent,), span.output_tokens)
+        self._count("agent_cached_tokens_total", (span.agent,), span.cached_tokens)
+        self._count("agent_model_errors_total", (span.agent,), span.model_errors)
+        self._count("agent_model_seconds_total", (span.agent,), span.model_seconds)
+        self._count("agent_tool_errors_total", (span.agent,), span.tool_errors)
+        self._count("agent_tool_seconds_total", (span.agent,), span.tool_seconds)
+        self._count("agent_retries_total", (span.agent,), span.retries)
+        self._count("agent_local_answers_total", (span.agent,), span.local_answers)
+        for tool, calls in span.tool_calls.items():
+            self._count("agent_tool_calls_total", (span.agent, tool), calls)
+        histogram = self._histograms.setdefault(span.agent, [0] * (len(DURATION_BUCKETS) + 2))
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+        invocation = self._invocations.get(span.invocation_id)
+        if invocation is None:
+            return
+        invocation.records.append(record)
+        if not close_invocation:
+            return
+        if outcome == "transferred":
+            invocation.handoffs += 1
+            return
+        invocation.depth -= 1
+        if invocation.depth > 0:
+            return
+        # Sub-agents that raised never got their after callback
+        for key in [key for key in self._spans if key[0] == span.invocation_id]:
+            self._finish(self._spans.pop(key), "incomplete", close_invocation=False)
+        del self._invocations[span.invocation_id]
+        records = invocation.records
+        self._emit({
+            "type": "invocation",
+            "ts": round(invocation.started_at, 3),
+            "invocation_id": span.invocation_id,
+            "session_id": invocation.session_id,
+            "duration_ms": round((time.perf_counter() - invocation.started) * 1000, 1),
+            "agents": [r["agent"] for r in records],
+            "model_calls": sum(r["model_calls"] for r in records),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+            "output_tokens": sum(r["output_tokens"] for r in records),
+            "tool_calls": sum(sum(r["tool_calls"].values()) for r in records),
+            "retries": sum(r["retries"] for r in records),
+        })
+        self._count("invocations_total", ())
+
+    def _span(self, callback_context, agent: str):
+        return self._spans.get((callback_context.invocation_id, agent))
+
+    def start_model(self, callback_context, agent: str):
+        span = self._span(callback_context, agent)
+        if span is None:
+            return
+        if span.model_failed:
+            span.retries += 1
+            span.model_failed = False
+        span.model_calls += 1
+        span.model_started = time.perf_counter()
+
+    def skip_model(self, callback_context, agent: str):
+        """Takes back start_model when a before_model callback answered instead of the model."""
+        span = self._span(callback_context, agent)
+        if span is None:
+            return
+        span.model_calls -= 1
+        span.model_started = None
+        span.local_answers += 1
+
+    def end_model(self, callback_context, agent: str, llm_response=None, error=None):
+        span = self._span(callback_context, agent)
+        if span is None:
+            return
+        if llm_response is not None and llm_response.partial:
+            return
+        if span.model_started is not None:
+            span.model_seconds += time.perf_counter() - span.model_started
+            span.model_started = None
+        usage = llm_response.usage_metadata if llm_response is not None else None
+        if usage is not None:
+            span.prompt_tokens += usage.prompt_token_count or 0
+            span.output_tokens += (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+            span.cached_tokens += usage.cached_content_token_count or 0
+        if error is not None or (llm_response is not None and llm_response.error_code):
+            span.model_errors += 1
+            span.model_failed = True
+
+    def start_tool(self, tool_context, agent: str, tool: str):
+        span = self._span(tool_context, agent)
+        if span is None:
+            return
+        if tool in span.failed_tools:
+            span.retries += 1
+            span.failed_tools.discard(tool)
+        span.tool_calls[tool] = span.tool_calls.get(tool, 0) + 1
+        span.tool_started[tool_context.function_call_id] = time.perf_counter()
+
+    def end_tool(self, tool_context, agent: str, tool: str, failed: bool):
+        span = self._span(tool_context, agent)
+        if span is None:
+            return
+        started = span.tool_started.pop(tool_context.function_call_id, None)
+        if started is not None:
+            span.tool_seconds += time.perf_counter() - started
+        if failed:
+            span.tool_errors += 1
+            span.failed_tools.add(tool)
+
+    # ----- export -----
+
+    def _count(self, metric: str, labels: tuple, value: float = 1):
+        series = self._counters.setdefault(metric, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def _emit(self, record: dict):
+        if self.jsonl_path:
+            self._buffer.append(record)
+        for listener in self._listeners:
+            listener(record)
+
+    def _maybe_flush(self):
+        if len(self._buffer) >= self.flush_records or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Appends buffered records to the JSONL file and rewrites the Prometheus file."""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        try:
+            if records:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+            if self.prometheus_path:
+                # Atomic, so a textfile collector never reads half a file
+                tmp_path = f"{self.prometheus_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.render_prometheus())
+                os.replace(tmp_path, self.prometheus_path)
+        except OSError as e:
+            print(f"⚠️ Telemetry export failed: {e}")
+
+    def render_prometheus(self) -> str:
+        """Returns the running totals in Prometheus text exposition format."""
+        label_names = {"agent_runs_total": ("agent", "outcome"), "agent_tool_calls_total": ("agent", "tool"),
+                       "invocations_total": ()}
+        lines = []
+        with self._lock:
+            for metric, series in sorted(self._counters.items()):
+                names = label_names.get(metric, ("agent",))
+                lines.append(f"# TYPE course_recommender_{metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"course_recommender_{metric}{_labels(**dict(zip(names, labels))) if names else ''} {value:g}")
+            if self._histograms:
+                lines.append("# TYPE course_recommender_agent_duration_seconds histogram")
+            for agent, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(DURATION_BUCKETS, histogram):
+                    lines.append(f"course_recommender_agent_duration_seconds_bucket{_labels(agent=agent, le=bound)} {count}")
+                lines.append(f"course_recommender_agent_duration_seconds_bucket{_labels(agent=agent, le='+Inf')} {histogram[-1]}")
+                lines.append(f"course_recommender_agent_duration_seconds_sum{_labels(agent=agent)} {histogram[-2]:g}")
+                lines.append(f"course_recommender_agent_duration_seconds_count{_labels(agent=agent)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def get_stats(self) -> dict:
+        """Returns per-agent runs, mean duration, model calls, tokens, tool calls and retries."""
+        with self._lock:
+            stats = {}
+            for agent, histogram in self._histograms.items():
+                stats[agent] = {
+                    "runs": histogram[-1],
+                    "avg_seconds": histogram[-2] / histogram[-1] if histogram[-1] else 0.0,
+                    **{metric[len("agent_"):-len("_total")]: sum(v for k, v in series.items() if k[0] == agent)
+                       for metric, series in self._counters.items()
+                       if metric.startswith("agent_") and metric != "agent_runs_total"},
+                }
+            return stats
+
+
+_telemetry = AgentTelemetry()
+
+
+def get_telemetry() -> AgentTelemetry:
+    """Returns the process-wide telemetry collector."""
+    return _telemetry
+
+
+def set_telemetry(telemetry: AgentTelemetry):
+    """Replaces the process-wide telemetry collector (agents look it up on every callback)."""
+    global _telemetry
+    _telemetry = telemetry
+
+
+@atexit.register
+def _flush_on_exit():
+    if _telemetry.jsonl_path or _telemetry.prometheus_path:
+        _telemetry.flush()
+
+
+# ===== Callbacks =====
+
+async def _run_chain(callbacks: list, **kwargs):
+    """Runs callbacks like ADK does: in order, until one returns something."""
+    for callback in callbacks:
+        result = callback(**kwargs)
+        if isawaitable(result):
+            result = await result
+        if result is not None:
+            return result
+    return None
+
+
+def _as_list(callback) -> list:
+    if callback is None:
+        return []
+    return list(callback) if isinstance(callback, list) else [callback]
+
+
+def _instrument_agent(agent, parent: str):
+    name = agent.name
+    before_agent = _as_list(agent.before_agent_callback)
+    after_agent = _as_list(agent.after_agent_callback)
+
+    async def before_agent_callback(callback_context):
+        _telemetry.start_agent(callback_context, name, parent)
+        try:
+            content = await _run_chain(before_agent, callback_context=callback_context)
+        except Exception:
+            _telemetry.end_agent(callback_context, name, "incomplete")
+            raise
+        if content:
+            # The agent itself won't run, and neither will its after callbacks
+            _telemetry.end_agent(callback_context, name, "callback")
+        return content
+
+    async def after_agent_callback(callback_context):
+        try:
+            return await _run_chain(after_agent, callback_context=callback_context)
+        finally:
+            _telemetry.end_agent(callback_context, name)
+
+    agent.before_agent_callback = before_agent_callback
+    agent.after_agent_callback = after_agent_callback
+    if not isinstance(agent, LlmAgent):
+        return
+
+    before_model = _as_list(agent.before_model_callback)
+    after_model = _as_list(agent.after_model_callback)
+    on_model_error = _as_list(agent.on_model_error_callback)
+    before_tool = _as_list(agent.before_tool_callback)
+    after_tool = _as_list(agent.after_tool_callback)
+    on_tool_error = _as_list(agent.on_tool_error_callback)
+
+    async def before_model_callback(callback_context, llm_request):
+        _telemetry.start_model(callback_context, name)
+        response = await _run_chain(before_model, callback_context=callback_context, llm_request=llm_request)
+        if response is not None:
+            # ADK skips the model and the after_model callbacks
+            _telemetry.skip_model(callback_context, name)
+        return response
+
+    async def after_model_callback(callback_context, llm_response):
+        _telemetry.end_model(callback_context, name, llm_response=llm_response)
+        return await _run_chain(after_model, callback_context=callback_context, llm_response=llm_response)
+
+    async def on_model_error_callback(callback_context, llm_request, error):
+        _telemetry.end_model(callback_context, name, error=error)
+        return await _run_chain(on_model_error, callback_context=callback_context, llm_request=llm_request,
+                                error=error)
+
+    async def before_tool_callback(tool, args, tool_context):
+        _telemetry.start_tool(tool_context, name, tool.name)
+        return await _run_chain(before_tool, tool=tool, args=args, tool_context=tool_context)
+
+    async def after_tool_callback(tool, args, tool_context, tool_response):
+        _telemetry.end_tool(tool_context, name, tool.name, _is_tool_error(tool_response))
+        result = await _run_chain(after_tool, tool=tool, args=args, tool_context=tool_context,
+                                  tool_response=tool_response)
+        if tool.name == "transfer_to_agent":
+            _telemetry.end_agent(tool_context, name, "transferred")
+        return result
+
+    async def on_tool_error_callback(tool, args, tool_context, error):
+        _telemetry.end_tool(tool_context, name, tool.name, True)
+        return await _run_chain(on_tool_error, tool=tool, args=args, tool_context=tool_context, error=error)
+
+    agent.before_model_callback = before_model_callback
+    agent.after_model_callback = after_model_callback
+    agent.on_model_error_callback = on_model_error_callback
+    agent.before_tool_callback = before_tool_callback
+    agent.after_tool_callback = after_tool_callback
+    agent.on_tool_error_callback = on_tool_error_callback
+
+
+def instrument_agent_tree(root_agent, parent: str = None):
+    """
+    Adds telemetry to root_agent and all of its sub-agents, keeping their own callbacks.
+
+    Call once, after the tree is built. A no-op when TELEMETRY_ENABLED is off.
+    """
+    if not TELEMETRY_ENABLED:
+        return root_agent
+    _instrument_agent(root_agent, parent)
+    for sub_agent in root_agent.sub_agents:
+        instrument_agent_tree(sub_agent, root_agent.name)
+    return root_agent
+
+
+# ===== Prometheus endpoint =====
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _telemetry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = TELEMETRY_PROMETHEUS_PORT) -> ThreadingHTTPServer:
+    """Serves /metrics on `port` from a daemon thread."""
+    server = ThreadingHTTPServer(("", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="telemetry-metrics", daemon=True).start()
+    print(f"📈 Telemetry metrics on :{server.server_address[1]}/metrics")
+    return server
+
+
+if TELEMETRY_ENABLED and TELEMETRY_PROMETHEUS_PORT:
+    start_metrics_server()
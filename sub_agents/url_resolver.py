@@ -0,0 +1,295 @@
+# sub_agents/url_resolver.py
+
+"""
+Batched URL resolution for course records.
+
+Web search results often name a course without linking its page. Instead of
+one follow-up google_search per course (N+1 model round trips), the search
+branches hand every incomplete record to resolve_course_urls in one call,
+which tries, cheapest first:
+
+1. Title cache - URLs already seen for the same title (and platform)
+2. Local catalog - an exact title match in course_catalog
+3. Slug heuristics - the platform's course URL built from the title
+   (e.g. coursera.org/learn/<slug>), kept only if link_checker finds the page
+4. Web lookup - the remaining titles OR-ed into a few Custom Search
+   queries (needs GOOGLE_SEARCH_API_KEY and GOOGLE_SEARCH_ENGINE_ID)
+
+Catalog lookups, slug probes and web lookups run concurrently on a bounded
+thread pool (URL_RESOLVE_CONCURRENCY), off the event loop; the network ones
+each with a socket timeout.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import httplib2
+from google.adk.tools import FunctionTool
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from sub_agents.course_catalog import get_catalog
+from sub_agents.course_records import canonical_url, is_specific_url, title_key, validate_course_records
+from sub_agents.link_checker import ALIVE, get_link_checker
+
+URL_RESOLVE_CONCURRENCY = int(os.getenv("URL_RESOLVE_CONCURRENCY", "8"))
+URL_RESOLVE_TIMEOUT = float(os.getenv("URL_RESOLVE_TIMEOUT", "8"))
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", "10000"))
+
+# Custom Search JSON API credentials; without them step 4 is skipped
+GOOGLE_SEARCH_API_KEY = os.getenv("GOOGLE_SEARCH_API_KEY")
+GOOGLE_SEARCH_ENGINE_ID = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
+
+# Titles per combined web query (one query returns at most 10 results)
+TITLES_PER_QUERY = 4
+
+# Platform key -> course page URL pattern
+SLUG_PATTERNS = {
+    "coursera": "https://www.coursera.org/learn/{slug}",
+    "udemy": "https://www.udemy.com/course/{slug}",
+}
+
+# Platform key -> domain its course pages live on
+PLATFORM_DOMAINS = {
+    "coursera": "coursera.org",
+    "edx": "edx.org",
+    "udemy": "udemy.com",
+    "youtube": "youtube.com",
+    "mit": "ocw.mit.edu",
+    "khan": "khanacademy.org",
+    "freecodecamp": "freecodecamp.org",
+    "linkedin": "linkedin.com",
+    "pluralsight": "pluralsight.com",
+    "skillshare": "skillshare.com",
+    "datacamp": "datacamp.com",
+    "codecademy": "codecademy.com",
+}
+
+_executor = ThreadPoolExecutor(max_workers=URL_RESOLVE_CONCURRENCY, thread_name_prefix="url-resolve")
+
+
+def _platform_key(platform: str) -> str:
+    """"MIT OpenCourseWare" -> "mit", "edX" -> "edx"."""
+    words = re.findall(r"[a-z0-9]+", (platform or "").lower())
+    return words[0] if words else ""
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower().replace("&", " and ")).strip("-")
+
+
+def _on_platform(url: str, platform: str) -> bool:
+    """True if url is on the platform's domain (or the platform is unknown)."""
+    domain = PLATFORM_DOMAINS.get(_platform_key(platform))
+    host = urlsplit(url).netloc
+    return domain is None or host == domain or host.endswith("." + domain)
+
+
+class TitleUrlCache:
+    """Thread-safe LRU of normalized course title -> (platform key, URL)."""
+
+    def __init__(self, max_entries: int = URL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str, platform: str = "") -> str:
+        """Returns the URL cached for name, or None (also if it's from another platform)."""
+        with self._lock:
+            entry = self._entries.get(title_key(name))
+            if entry is None:
+                return None
+            self._entries.move_to_end(title_key(name))
+        cached_platform, url = entry
+        if _platform_key(platform) and cached_platform and cached_platform != _platform_key(platform):
+            return None
+        return url
+
+    def put(self, name: str, platform: str, url: str):
+        key = title_key(name)
+        if not key or not is_specific_url(url):
+            return
+        with self._lock:
+            self._entries[key] = (_platform_key(platform), url)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_title_cache = TitleUrlCache()
+
+
+def remember_course_urls(records: list):
+    """Adds records that have a specific URL to the title cache."""
+    for record in records:
+        _title_cache.put(record.get("name") or "", record.get("platform") or "", record.get("url") or "")
+
+
+def _from_catalog(name: str, platform: str) -> str:
+    """URL of the catalog course with exactly this title, or None."""
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    key = title_key(name)
+    for doc in catalog.search(name, top_k=5)["docs"]:
+        record = catalog.get_record(int(doc))
+        same_platform = not _platform_key(platform) or _platform_key(record.get("platform")) == _platform_key(platform)
+        if title_key(record.get("name") or "") == key and same_platform:
+            return record.get("url")
+    return None
+
+
+def _probe_slug(name: str, platform: str) -> str:
+    """Builds the platform's URL for the title; returns it if the page exists."""
+    pattern = SLUG_PATTERNS.get(_platform_key(platform))
+    slug = _slug(name)
+    if pattern is None or not slug:
+        return None
+    status, final_url = get_link_checker().check_url(pattern.format(slug=slug))
+    # Platforms redirect unknown courses to search or home pages
+    return final_url if status == ALIVE and slug in final_url else None
+
+
+_search_local = threading.local()
+
+
+def _search_service():
+    """Custom Search service for this thread (httplib2 connections aren't thread-safe)."""
+    service = getattr(_search_local, "service", None)
+    if service is None:
+        service = build_from_document(
+            json.loads(get_static_doc("customsearch", "v1")),
+            developerKey=GOOGLE_SEARCH_API_KEY,
+            http=httplib2.Http(timeout=URL_RESOLVE_TIMEOUT),
+        )
+        _search_local.service = service
+    return service
+
+
+def _web_lookup(courses: list) -> dict:
+    """
+    One Custom Search query for several titles.
+
+    Returns:
+        dict: Index into courses -> URL, for the titles found
+    """
+    query = " OR ".join(f'"{course["name"]}"' for course in courses) + " course"
+    try:
+        response = _search_service().cse().list(q=query, cx=GOOGLE_SEARCH_ENGINE_ID, num=10).execute()
+    except Exception as e:
+        print(f"⚠️ URL lookup failed: {e}")
+        return {}
+
+    found = {}
+    for item in response.get("items", []):
+        url = canonical_url(item.get("link") or "")
+        title = title_key(item.get("title") or "")
+        if not is_specific_url(url):
+            continue
+        for i, course in enumerate(courses):
+            # Result titles look like "<course title> | Coursera"
+            if i not in found and title.startswith(title_key(course["name"])) and _on_platform(url, course.get("platform")):
+                found[i] = url
+                break
+    return found
+
+
+async def resolve_course_urls(courses: list[dict]) -> dict:
+    """
+    Finds the URLs of several courses at once. Call this ONCE with every course
+    whose URL is missing or generic - instead of searching for each course.
+
+    Args:
+        courses: Course records with at least "name" and "platform"
+            (other fields are kept as they are)
+
+    Returns:
+        Dictionary with the courses that now have a specific URL ("courses"),
+        how each URL was found ("resolved_by") and the names of courses
+        whose URL could not be found ("unresolved")
+    """
+    loop = asyncio.get_running_loop()
+    resolved_by = {"given": 0, "cache": 0, "catalog": 0, "slug": 0, "web": 0}
+    pending = []
+    filled = []
+
+    for course in courses:
+        if not isinstance(course, dict) or not (course.get("name") or "").strip():
+            continue
+        course = dict(course)
+        url = canonical_url(str(course.get("url") or ""))
+        if is_specific_url(url):
+            source = "given"
+        else:
+            url, source = _title_cache.get(course["name"], course.get("platform")), "cache"
+        if url is None:
+            pending.append(course)
+            continue
+        course["url"] = url
+        filled.append(course)
+        resolved_by[source] += 1
+
+    if pending:
+        matches = await asyncio.gather(*(
+            loop.run_in_executor(_executor, _from_catalog, course["name"], course.get("platform"))
+            for course in pending
+        ))
+        remaining = []
+        for course, url in zip(pending, matches):
+            if url is None:
+                remaining.append(course)
+            else:
+                course["url"] = url
+                filled.append(course)
+                resolved_by["catalog"] += 1
+        pending = remaining
+
+    if pending:
+        probes = await asyncio.gather(*(
+            loop.run_in_executor(_executor, _probe_slug, course["name"], course.get("platform"))
+            for course in pending
+        ))
+        remaining = []
+        for course, url in zip(pending, probes):
+            if url is None:
+                remaining.append(course)
+            else:
+                course["url"] = url
+                filled.append(course)
+                resolved_by["slug"] += 1
+        pending = remaining
+
+    if pending and GOOGLE_SEARCH_API_KEY and GOOGLE_SEARCH_ENGINE_ID:
+        chunks = [pending[i:i + TITLES_PER_QUERY] for i in range(0, len(pending), TITLES_PER_QUERY)]
+        lookups = await asyncio.gather(*(loop.run_in_executor(_executor, _web_lookup, chunk) for chunk in chunks))
+        remaining = []
+        for chunk, found in zip(chunks, lookups):
+            for i, course in enumerate(chunk):
+                if i in found:
+                    course["url"] = found[i]
+                    filled.append(course)
+                    resolved_by["web"] += 1
+                else:
+                    remaining.append(course)
+        pending = remaining
+
+    records = validate_course_records(filled)
+    remember_course_urls(records)
+    return {
+        "status": "success",
+        "courses": records,
+        "resolved_by": {source: count for source, count in resolved_by.items() if count},
+        "unresolved": [course["name"] for course in pending],
+    }
+
+
+# Create the ADK FunctionTool
+url_resolver_tool = FunctionTool(resolve_course_urls)